@@ -1,9 +1,57 @@
+import colorsys
+import fnmatch
+import hashlib
+import os
+import re
+import time
+
+import numpy as np
+
 import maya.cmds as cmds
+import maya.api.OpenMaya as om
 
 '''
 Script to colour all the mesh inside a selected group.
+
+colour_mesh() asks for one colour and applies it to the whole group.
+colour_by_rules() colours the group in one pass from a list of rules instead,
+giving different parts distinct colours that come out the same every time:
+
+    colour_by_rules([
+        {'type': 'name', 'pattern': '*wheel*', 'colour': (0.1, 0.1, 0.1)},
+        {'type': 'name', 'regex': '^body_', 'colour': (1.0, 0.2, 0.2)},
+        {'type': 'material'},   # One colour per material.
+        {'type': 'child'},      # One colour per top level child of the group.
+        {'type': 'hash'},       # Colour from the shape's name.
+    ])
+
+The first rule that matches a shape picks its colour. Rules without a 'colour'
+pick one from a stable hash of what they matched on.
+
+Colours can be applied two ways (the 'backend' argument):
+    'override' - turns on the drawing overrides of every shape (the default).
+    'layer'    - puts the shapes into one display layer per colour, so the shape
+                 overrides are left alone and recolouring is one edit on the
+                 layer (see recolour_layer()). migrate_overrides_to_layers()
+                 moves shapes that already have overrides onto layers.
+
+Before colouring, the previous colour state of the shapes is captured in a
+ColourSnapshot, and restore_colours() puts it back, only touching the shapes
+that changed. Pass snapshot='name' to keep it on disk to restore in a later
+session, e.g. colour_mesh(snapshot='before_review'), then
+restore_colours('before_review').
 '''
 
+BACKENDS = ('override', 'layer')
+LAYER_PREFIX = 'colour_'
+SNAPSHOT_DIR = os.path.join(os.path.expanduser('~'), 'maya', 'groupMeshColour', 'snapshots')
+
+# Snapshot taken before the last colour change.
+last_snapshot = None
+
+# How far apart two colours can be and still share a colour layer.
+COLOUR_TOLERANCE = 1e-4
+
 ###################
 # Helper Function #
 ###################
@@ -20,27 +68,619 @@ def get_colour_editor():
     cmds.colorEditor()
     if cmds.colorEditor(query=True, result=True):
         rgb_values = cmds.colorEditor(query=True, rgb=True)
-        print 'RGB = ' + str(rgb_values)
+        print('RGB = ' + str(rgb_values))
     else:
-        print 'Colour editor was closed'
+        print('Colour editor was closed')
         return None
 
     return rgb_values
 
 
+def unique_shapes(shapes):
+    """
+    Drops the extra paths of instanced shapes, so each shape node is only
+    coloured once no matter how many times it is instanced.
+    :param shapes: list of shape DAG paths.
+    :return: list of shape paths, one per shape node, in the original order.
+    """
+    sel_list = om.MSelectionList()
+    for shape in shapes:
+        sel_list.add(shape)
+
+    seen = set()
+    unique = []
+    for i, shape in enumerate(shapes):
+        uuid = om.MFnDependencyNode(sel_list.getDependNode(i)).uuid().asString()
+        if uuid not in seen:
+            seen.add(uuid)
+            unique.append(shape)
+
+    return unique
+
+
+def enable_overrides(shapes):
+    """
+    Switches drawing overrides on for the shapes that have them off. The plugs
+    are read through the API and every change goes through one MDGModifier,
+    which is much quicker than a getAttr and setAttr per shape.
+    Maya's undo doesn't see the modifier, so undoing the colour leaves the
+    overrides on but drawing in the default colour.
+    :param shapes: list of shape DAG paths.
+    :return: number of shapes that were switched on.
+    """
+    sel_list = om.MSelectionList()
+    for shape in shapes:
+        sel_list.add(shape)
+
+    modifier = om.MDGModifier()
+    switched = 0
+    for i in range(sel_list.length()):
+        plug = om.MFnDependencyNode(sel_list.getDependNode(i)).findPlug("overrideEnabled", False)
+        if not plug.asBool():
+            modifier.newPlugValueBool(plug, True)
+            switched += 1
+    if switched:
+        modifier.doIt()
+
+    return switched
+
+
+def apply_colours(buckets, backend='override'):
+    """
+    Colours shapes that have been bucketed by colour, with one call per colour,
+    all in one undo chunk.
+    :param buckets: dictionary of {(r, g, b): [shape, ...]}
+    :param backend: 'override' to colour the shapes' drawing overrides, or
+                    'layer' to put them in a display layer per colour.
+    :return: number of shapes coloured.
+    """
+    if backend not in BACKENDS:
+        raise ValueError("Unknown colour backend: %s" % backend)
+
+    shapes = [shape for bucket in buckets.values() for shape in bucket]
+    if not shapes:
+        return 0
+
+    start = time.time()
+    cmds.undoInfo(openChunk=True, chunkName="colour_mesh")
+    cmds.refresh(suspend=True)
+    try:
+        if backend == 'layer':
+            for colour, bucket in buckets.items():
+                if bucket:
+                    cmds.editDisplayLayerMembers(get_colour_layer(colour), bucket, noRecurse=True)
+        else:
+            # Make sure drawing overrides are on for each shape.
+            enable_overrides(shapes)
+            for colour, bucket in buckets.items():
+                if bucket:
+                    cmds.color(bucket, rgb=colour)
+    finally:
+        cmds.refresh(suspend=False)
+        cmds.undoInfo(closeChunk=True)
+
+    seconds = time.time() - start
+    print("Coloured %d shapes with %d colours in %.2fs (%.0f shapes/s)"
+          % (len(shapes), len(buckets), seconds, len(shapes) / seconds if seconds else 0.0))
+
+    return len(shapes)
+
+
+####################
+# Display Layers   #
+####################
+
+def layer_name(colour):
+    """
+    :return: name of the display layer for a colour, e.g. 'colour_ff8000_layer'
+    """
+    return "%s%02x%02x%02x_layer" % ((LAYER_PREFIX,) + tuple(int(round(channel * 255)) for channel in colour))
+
+
+def layer_colour(layer):
+    """
+    :return: the RGB colour a display layer draws its members with: (float, float, float)
+    """
+    return tuple(cmds.getAttr(layer + ".overrideColorRGB")[0])
+
+
+def find_colour_layer(colour, skip=None):
+    """
+    Finds the colour layer drawing with a colour. layer_name() rounds to 8 bits,
+    so the layer's stored colour is compared, not just its name.
+    :param colour: RGB values: [float, float, float]
+    :param skip: name of a layer to leave out.
+    :return: name of the display layer, or None.
+    """
+    name = layer_name(colour)
+    # The layer named for the colour first, then any other colour layer (e.g. name_layer1).
+    layers = [name] if cmds.objExists(name) else []
+    layers += [layer for layer in cmds.ls(LAYER_PREFIX + "*", type="displayLayer") or [] if layer != name]
+    for layer in layers:
+        if layer == skip or not cmds.objectType(layer, isType="displayLayer"):
+            continue
+        if not cmds.getAttr(layer + ".overrideRGBColors"):
+            continue
+        if all(abs(a - b) <= COLOUR_TOLERANCE for a, b in zip(layer_colour(layer), colour)):
+            return layer
+
+    return None
+
+
+def get_colour_layer(colour):
+    """
+    Gets the display layer for a colour, creating it the first time.
+    :param colour: RGB values: [float, float, float]
+    :return: name of the display layer.
+    """
+    layer = find_colour_layer(colour)
+    if layer is None:
+        # Maya numbers the name if a layer of a slightly different colour already has it.
+        layer = cmds.createDisplayLayer(name=layer_name(colour), empty=True, noRecurse=True)
+        cmds.setAttr(layer + ".overrideRGBColors", 1)
+        cmds.setAttr(layer + ".overrideColorRGB", *colour)
+
+    return layer
+
+
+def recolour_layer(layer, colour):
+    """
+    Recolours every shape in a colour layer by editing the layer, and renames
+    the layer to match its new colour. If there's already a layer of the new
+    colour, the members are moved into it and this layer is deleted, so there
+    is only ever one layer per colour.
+    :param layer: name of the display layer.
+    :param colour: RGB values: [float, float, float]
+    :return: name of the layer the shapes are now in.
+    """
+    existing = find_colour_layer(colour, skip=layer) if layer.startswith(LAYER_PREFIX) else None
+    if existing is not None:
+        members = cmds.editDisplayLayerMembers(layer, query=True, fullNames=True) or []
+        if members:
+            cmds.editDisplayLayerMembers(existing, members, noRecurse=True)
+        cmds.delete(layer)
+        return existing
+
+    cmds.setAttr(layer + ".overrideRGBColors", 1)
+    cmds.setAttr(layer + ".overrideColorRGB", *colour)
+
+    name = layer_name(colour)
+    if layer.startswith(LAYER_PREFIX) and not cmds.objExists(name):
+        layer = cmds.rename(layer, name)
+
+    return layer
+
+
+def override_colours(shapes):
+    """
+    Reads the override colour of every shape that has its own drawing
+    overrides on. Index colours are turned into their RGB values.
+    :param shapes: list of shape DAG paths.
+    :return: dictionary of {(r, g, b): [shape, ...]}
+    """
+    sel_list = om.MSelectionList()
+    for shape in shapes:
+        sel_list.add(shape)
+
+    buckets = {}
+    for i, shape in enumerate(shapes):
+        node_fn = om.MFnDependencyNode(sel_list.getDependNode(i))
+        if not node_fn.findPlug("overrideEnabled", False).asBool():
+            continue
+        # Shapes already in a display layer get their overrides from the layer.
+        if node_fn.findPlug("drawOverride", False).isDestination:
+            continue
+
+        if node_fn.findPlug("overrideRGBColors", False).asBool():
+            rgb_plug = node_fn.findPlug("overrideColorRGB", False)
+            colour = tuple(round(rgb_plug.child(c).asFloat(), 4) for c in range(3))
+        else:
+            index = node_fn.findPlug("overrideColor", False).asInt()
+            # Index 0 is 'use default', there is no colour to keep.
+            if not index:
+                continue
+            colour = tuple(round(c, 4) for c in cmds.colorIndex(index, query=True))
+
+        buckets.setdefault(colour, []).append(shape)
+
+    return buckets
+
+
+def migrate_overrides_to_layers(shapes=None):
+    """
+    Moves shapes from per shape override colours onto colour display layers.
+    The shapes' own overrides are switched off, so they no longer add to the
+    file, and the layers take over their colour.
+    :param shapes: shapes to migrate, defaults to every mesh and nurbsSurface
+                   in the selection (or the scene if nothing is selected).
+    :return: dictionary of {layer: number of shapes moved onto it}
+    """
+    if shapes is None:
+        roots = cmds.ls(sl=True, long=True)
+        if roots:
+            shapes = cmds.ls(roots, dag=True, long=True, type=['mesh', 'nurbsSurface'])
+        else:
+            shapes = cmds.ls(long=True, type=['mesh', 'nurbsSurface'])
+    shapes = unique_shapes(shapes or [])
+
+    buckets = override_colours(shapes)
+    moved = {}
+
+    cmds.undoInfo(openChunk=True, chunkName="migrate_overrides_to_layers")
+    cmds.refresh(suspend=True)
+    try:
+        for colour, bucket in buckets.items():
+            for shape in bucket:
+                cmds.setAttr("%s.overrideRGBColors" % shape, 0)
+                cmds.setAttr("%s.overrideColor" % shape, 0)
+                cmds.setAttr("%s.overrideEnabled" % shape, 0)
+            layer = get_colour_layer(colour)
+            cmds.editDisplayLayerMembers(layer, bucket, noRecurse=True)
+            moved[layer] = len(bucket)
+    finally:
+        cmds.refresh(suspend=False)
+        cmds.undoInfo(closeChunk=True)
+
+    print("Moved %d shapes onto %d colour layers." % (sum(moved.values()), len(moved)))
+
+    return moved
+
+
+####################
+# Snapshots        #
+####################
+
+class ColourSnapshot(object):
+    """
+    The colour state of a set of shapes, kept as one array per attribute
+    rather than a dictionary per shape. Shapes are stored by uuid so a saved
+    snapshot still finds them after they are renamed or the scene is reopened.
+    """
+    def __init__(self, uuids, enabled, rgb_enabled, index, rgb, layers):
+        self.uuids = np.asarray(uuids, dtype=np.str_)
+        self.enabled = np.asarray(enabled, dtype=bool)
+        self.rgb_enabled = np.asarray(rgb_enabled, dtype=bool)
+        self.index = np.asarray(index, dtype=np.int16)
+        self.rgb = np.asarray(rgb, dtype=np.float32).reshape(-1, 3)
+        self.layers = np.asarray(layers, dtype=np.str_)
+        # Node names at capture time, only filled in by capture().
+        self.names = []
+
+    def __len__(self):
+        return len(self.uuids)
+
+    @classmethod
+    def capture(cls, shapes):
+        """
+        Reads the colour state of shapes through the API in one pass.
+        :param shapes: list of shape DAG paths or uuid strings.
+        :return: ColourSnapshot of the shapes that exist.
+        """
+        nodes = _depend_nodes(shapes)
+        count = len(nodes)
+        uuids = []
+        names = []
+        enabled = np.zeros(count, dtype=bool)
+        rgb_enabled = np.zeros(count, dtype=bool)
+        index = np.zeros(count, dtype=np.int16)
+        rgb = np.zeros((count, 3), dtype=np.float32)
+        layers = []
+
+        for i, node in enumerate(nodes):
+            node_fn = om.MFnDependencyNode(node)
+            uuids.append(node_fn.uuid().asString())
+            names.append(node_fn.uniqueName())
+            enabled[i] = node_fn.findPlug("overrideEnabled", False).asBool()
+            rgb_enabled[i] = node_fn.findPlug("overrideRGBColors", False).asBool()
+            index[i] = node_fn.findPlug("overrideColor", False).asInt()
+            rgb_plug = node_fn.findPlug("overrideColorRGB", False)
+            rgb[i] = [rgb_plug.child(c).asFloat() for c in range(3)]
+
+            draw_override = node_fn.findPlug("drawOverride", False)
+            if draw_override.isDestination:
+                layers.append(om.MFnDependencyNode(draw_override.source().node()).name())
+            else:
+                layers.append("")
+
+        snapshot = cls(uuids, enabled, rgb_enabled, index, rgb, layers)
+        snapshot.names = names
+        return snapshot
+
+    def save(self, name, directory=None):
+        """
+        Saves the snapshot to disk.
+        :param name: name to save the snapshot under.
+        :param directory: folder to save in, defaults to SNAPSHOT_DIR.
+        :return: path of the saved file.
+        """
+        directory = directory or SNAPSHOT_DIR
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        path = os.path.join(directory, name + ".npz")
+        np.savez_compressed(path, uuids=self.uuids, enabled=self.enabled, rgb_enabled=self.rgb_enabled,
+                            index=self.index, rgb=self.rgb, layers=self.layers)
+        return path
+
+    @classmethod
+    def load(cls, name, directory=None):
+        """
+        Loads a snapshot saved with save().
+        :param name: name the snapshot was saved under.
+        :param directory: folder it was saved in, defaults to SNAPSHOT_DIR.
+        :return: ColourSnapshot
+        """
+        path = os.path.join(directory or SNAPSHOT_DIR, name + ".npz")
+        data = np.load(path)
+        return cls(data["uuids"], data["enabled"], data["rgb_enabled"], data["index"], data["rgb"],
+                   data["layers"])
+
+
+def _depend_nodes(shapes):
+    """
+    Gets the MObject of every shape that exists, by path or by uuid.
+    """
+    nodes = []
+    for shape in shapes:
+        sel_list = om.MSelectionList()
+        try:
+            if "|" in shape or not re.match(r"^[0-9A-F]{8}-", shape):
+                sel_list.add(shape)
+            else:
+                sel_list.add(om.MUuid(shape))
+        except (RuntimeError, ValueError):
+            # Deleted since the snapshot was taken.
+            continue
+        nodes.append(sel_list.getDependNode(0))
+
+    return nodes
+
+
+def list_snapshots(directory=None):
+    """
+    :return: names of the snapshots saved on disk.
+    """
+    directory = directory or SNAPSHOT_DIR
+    if not os.path.isdir(directory):
+        return []
+    return sorted(name[:-4] for name in os.listdir(directory) if name.endswith(".npz"))
+
+
+def take_snapshot(shapes, name=None):
+    """
+    Captures the colour state of shapes before they are coloured, keeps it as
+    the last snapshot and optionally saves it.
+    :param shapes: list of shape DAG paths.
+    :param name: name to save the snapshot to disk under, or None.
+    :return: ColourSnapshot
+    """
+    global last_snapshot
+    last_snapshot = ColourSnapshot.capture(shapes)
+    if name:
+        last_snapshot.save(name)
+
+    return last_snapshot
+
+
+def restore_colours(snapshot=None):
+    """
+    Puts shapes back to the colour state in a snapshot. Only the shapes, and
+    the attributes, that differ from the snapshot are written.
+    :param snapshot: ColourSnapshot, the name of a saved snapshot, or None for
+                     the snapshot taken before the last colour change.
+    :return: number of shapes restored.
+    """
+    if snapshot is None:
+        snapshot = last_snapshot
+    elif not isinstance(snapshot, ColourSnapshot):
+        snapshot = ColourSnapshot.load(snapshot)
+
+    if snapshot is None or not len(snapshot):
+        cmds.warning("No colour snapshot to restore.")
+        return 0
+
+    current = ColourSnapshot.capture(list(snapshot.uuids))
+    # Line the snapshot up with the shapes that still exist.
+    rows = dict((uuid, i) for i, uuid in enumerate(snapshot.uuids.tolist()))
+    keep = np.array([rows[uuid] for uuid in current.uuids.tolist()], dtype=np.int64)
+    if not keep.size:
+        cmds.warning("None of the shapes in the snapshot exist any more.")
+        return 0
+    saved = ColourSnapshot(snapshot.uuids[keep], snapshot.enabled[keep], snapshot.rgb_enabled[keep],
+                           snapshot.index[keep], snapshot.rgb[keep], snapshot.layers[keep])
+
+    layer_changed = saved.layers != current.layers
+    # Overrides can only be set on shapes outside a layer.
+    unlayered = saved.layers == ""
+    enabled_changed = unlayered & (saved.enabled != current.enabled)
+    rgb_enabled_changed = unlayered & (saved.rgb_enabled != current.rgb_enabled)
+    index_changed = unlayered & (saved.index != current.index)
+    rgb_changed = unlayered & np.any(np.abs(saved.rgb - current.rgb) > 1e-6, axis=1)
+    changed = layer_changed | enabled_changed | rgb_enabled_changed | index_changed | rgb_changed
+
+    names = current.names
+
+    cmds.undoInfo(openChunk=True, chunkName="restore_colours")
+    cmds.refresh(suspend=True)
+    try:
+        # Take shapes out of (or move them between) layers in one call per layer.
+        layer_buckets = {}
+        for i in np.flatnonzero(layer_changed):
+            layer_buckets.setdefault(saved.layers[i] or "defaultLayer", []).append(names[i])
+        for layer, bucket in layer_buckets.items():
+            if layer != "defaultLayer" and not cmds.objExists(layer):
+                layer = cmds.createDisplayLayer(name=layer, empty=True, noRecurse=True)
+            cmds.editDisplayLayerMembers(layer, bucket, noRecurse=True)
+
+        for i in np.flatnonzero(index_changed):
+            cmds.setAttr("%s.overrideColor" % names[i], int(saved.index[i]))
+        for i in np.flatnonzero(rgb_changed):
+            cmds.setAttr("%s.overrideColorRGB" % names[i], *saved.rgb[i].tolist())
+        for i in np.flatnonzero(rgb_enabled_changed):
+            cmds.setAttr("%s.overrideRGBColors" % names[i], bool(saved.rgb_enabled[i]))
+        for i in np.flatnonzero(enabled_changed):
+            cmds.setAttr("%s.overrideEnabled" % names[i], bool(saved.enabled[i]))
+    finally:
+        cmds.refresh(suspend=False)
+        cmds.undoInfo(closeChunk=True)
+
+    restored = int(np.count_nonzero(changed))
+    print("Restored %d of %d shapes." % (restored, len(saved)))
+
+    return restored
+
+
+####################
+# Colour Rules     #
+####################
+
+def colour_from_key(key):
+    """
+    Picks a bright colour from a stable hash of a string, so the same key always
+    gets the same colour, in any session.
+    :param key: string to pick a colour for.
+    :return: RGB values: (float, float, float)
+    """
+    digest = hashlib.md5(key.encode("utf-8")).digest()
+    hue = (ord(digest[0:1]) * 256 + ord(digest[1:2])) / 65536.0
+    saturation = 0.55 + 0.4 * ord(digest[2:3]) / 255.0
+    value = 0.75 + 0.25 * ord(digest[3:4]) / 255.0
+
+    return tuple(round(channel, 4) for channel in colorsys.hsv_to_rgb(hue, saturation, value))
+
+
+def short_name(path):
+    """
+    :return: the transform name of a shape path, e.g. '|car|wheel|wheelShape' -> 'wheel'
+    """
+    parts = path.split("|")
+    return parts[-2] if len(parts) > 2 else parts[-1]
+
+
+def material_map(shapes):
+    """
+    Finds the material of every shape with one query per shading group rather
+    than one per shape.
+    :param shapes: list of shape DAG paths.
+    :return: dictionary of {shape: material name}
+    """
+    wanted = set(shapes)
+    materials = {}
+    for shading_group in cmds.ls(type="shadingEngine") or []:
+        material = cmds.listConnections(shading_group + ".surfaceShader") or [shading_group]
+        members = cmds.ls(cmds.sets(shading_group, query=True) or [], long=True, objectsOnly=True) or []
+
+        # Members can be transforms when assigned at object level.
+        transforms = cmds.ls(members, type="transform", long=True) or []
+        if transforms:
+            members += cmds.listRelatives(transforms, shapes=True, fullPath=True) or []
+
+        for member in members:
+            if member in wanted:
+                materials.setdefault(member, material[0])
+
+    return materials
+
+
+def compile_rules(rules):
+    """
+    Turns rule dictionaries into matching functions, once, before the shapes
+    are walked.
+    :param rules: list of rule dictionaries, see the notes at the top.
+    :return: list of functions taking (shape, context) and returning a
+             colour, or None if the rule doesn't match.
+    """
+    compiled = []
+    for rule in rules:
+        rule_type = rule.get("type")
+        colour = tuple(rule["colour"]) if rule.get("colour") else None
+
+        if rule_type == "name":
+            if "regex" in rule:
+                pattern = re.compile(rule["regex"])
+            else:
+                pattern = re.compile(fnmatch.translate(rule["pattern"]))
+            key = rule.get("regex") or rule.get("pattern")
+            compiled.append(_name_rule(pattern, colour or colour_from_key(key)))
+        elif rule_type == "child":
+            compiled.append(_child_rule(colour))
+        elif rule_type == "material":
+            compiled.append(_material_rule(colour))
+        elif rule_type == "hash":
+            compiled.append(lambda shape, context: colour_from_key(short_name(shape)))
+        else:
+            raise ValueError("Unknown colour rule type: %s" % rule_type)
+
+    return compiled
+
+
+def _name_rule(pattern, colour):
+    def match(shape, context):
+        if pattern.search(short_name(shape)):
+            return colour
+    return match
+
+
+def _child_rule(colour):
+    def match(shape, context):
+        for root in context["roots"]:
+            if shape.startswith(root + "|"):
+                child = shape[len(root) + 1:].split("|")[0]
+                return colour or colour_from_key(child)
+    return match
+
+
+def _material_rule(colour):
+    def match(shape, context):
+        material = context["materials"].get(shape)
+        if material:
+            return colour or colour_from_key(material)
+    return match
+
+
+def bucket_by_rules(shapes, rules, roots=()):
+    """
+    Matches every shape against the rules in one pass and buckets the shapes
+    by the colour they got. Shapes no rule matches are left out.
+    :param shapes: list of shape DAG paths.
+    :param rules: list of rule dictionaries, see the notes at the top.
+    :param roots: long names of the selected groups, used by 'child' rules.
+    :return: dictionary of {(r, g, b): [shape, ...]}
+    """
+    compiled = compile_rules(rules)
+    context = {"roots": list(roots), "materials": {}}
+    # Only look up materials if a rule needs them.
+    if any(rule.get("type") == "material" for rule in rules):
+        context["materials"] = material_map(shapes)
+
+    buckets = {}
+    for shape in shapes:
+        for rule in compiled:
+            colour = rule(shape, context)
+            if colour is not None:
+                buckets.setdefault(colour, []).append(shape)
+                break
+
+    return buckets
+
+
 #################
 # Main Function #
 #################
 
-def colour_mesh():
+def colour_mesh(backend='override', snapshot=None):
     """
     Colours all the mesh and nurbsSurface object's wireframes in a selected
     group.
+    :param backend: 'override' or 'layer', see the notes at the top.
+    :param snapshot: name to save the colours from before the change under.
     :return: N/A
     """
     # Get mesh inside the selected group.
-    sel_group = cmds.ls(sl=True, dag=True, type=['mesh','nurbsSurface'])
-    print(sel_group)
+    sel_group = cmds.ls(sl=True, dag=True, long=True, type=['mesh','nurbsSurface'])
+    # Instances share one shape node, colouring it once colours every copy.
+    sel_group = unique_shapes(sel_group)
+    print("%d shapes found in group." % len(sel_group))
 
     # If there are no mesh or nurbsSurface in the group.
     if not sel_group:
@@ -49,22 +689,33 @@ def colour_mesh():
 
     colour = get_colour_editor()
 
-    try:
-        # Set the colours of each of the mesh in selected group.
-        for mesh in sel_group:
-            # Make sure drawing overrides are on for each mesh.
-            cmds.setAttr("%s.overrideEnabled" % mesh, 1)
-            cmds.color(mesh, rgb=colour)
-        # If colour editor was exited out of, do no try to change colour of mesh
-        # Exit without error.
-        if colour is None:
-            return
-    except TypeError:
-        pass
-
+    # If colour editor was exited out of, do no try to change colour of mesh
+    # Exit without error.
+    if colour is None:
+        return
 
+    take_snapshot(sel_group, snapshot)
+    apply_colours({tuple(colour): sel_group}, backend)
 
 
+def colour_by_rules(rules, backend='override', snapshot=None):
+    """
+    Colours all the mesh and nurbsSurface object's wireframes in the selected
+    group(s) by rules, without opening a colour editor.
+    :param rules: list of rule dictionaries, see the notes at the top.
+    :param backend: 'override' or 'layer', see the notes at the top.
+    :param snapshot: name to save the colours from before the change under.
+    :return: dictionary of {(r, g, b): [shape, ...]} that was applied.
+    """
+    roots = cmds.ls(sl=True, long=True) or []
+    shapes = unique_shapes(cmds.ls(roots, dag=True, long=True, type=['mesh', 'nurbsSurface']) or [])
 
+    if not shapes:
+        cmds.warning("No mesh or nurbsSurface found in group.")
+        return {}
 
+    buckets = bucket_by_rules(shapes, rules, roots)
+    take_snapshot(shapes, snapshot)
+    apply_colours(buckets, backend)
 
+    return buckets
@@ -0,0 +1,426 @@
+import hashlib
+import re
+from collections import OrderedDict
+
+import numpy as np
+
+"""
+Mesh topology helpers that work on the bulk face arrays of a mesh instead of
+walking faces one by one.
+
+A mesh is described by two flat arrays (the same layout MFnMesh.getVertices()
+returns):
+    faceCounts   - number of vertices on each face.
+    faceConnects - vertex ids of every face, one face after another.
+
+auditMesh() runs a set of topology checks (triangles, ngons, lamina faces,
+zero area faces, non-manifold edges and isolated vertices) in one pass over
+those arrays, only building the extra arrays the chosen checks need.
+
+Nothing in here imports maya, so it can be used (and tested) with an
+InMemoryMeshSource outside of a Maya session.
+"""
+
+# Face classes returned by classifyFaces().
+TRI = 3
+QUAD = 4
+NGON = 5
+
+# Index part of a component name, e.g. the '10:99' of 'pCube1.f[10:99]'.
+COMPONENT_INDEX = re.compile(r"\[(\*|\d+)(?::(\d+))?\]$")
+
+
+################
+# Mesh Sources #
+################
+
+class MeshSource(object):
+    """
+    Interface for anything that can hand over the topology arrays of a mesh.
+    Subclass it and implement getTopology().
+    """
+    def __init__(self, name):
+        self.name = name
+
+    def getTopology(self):
+        """
+        Reads the topology of the mesh in one go.
+        :return: (faceCounts, faceConnects) as 1D int arrays.
+        """
+        raise NotImplementedError
+
+    def getPoints(self):
+        """
+        Reads the vertex positions of the mesh in one go.
+        :return: (vertexCount, 3) float array.
+        """
+        raise NotImplementedError
+
+    def getVertexCount(self):
+        """
+        :return: number of vertices on the mesh.
+        """
+        return len(self.getPoints())
+
+
+class InMemoryMeshSource(MeshSource):
+    """
+    Mesh source holding its arrays in memory. Handy for tests and for data that
+    was already read from disk.
+    """
+    def __init__(self, name, faceCounts, faceConnects=None, points=None):
+        super(InMemoryMeshSource, self).__init__(name)
+        self.faceCounts = np.asarray(faceCounts, dtype=np.int32)
+        if faceConnects is None:
+            faceConnects = np.arange(self.faceCounts.sum(), dtype=np.int32)
+        self.faceConnects = np.asarray(faceConnects, dtype=np.int32)
+        self.points = None if points is None else np.asarray(points, dtype=np.float64).reshape(-1, 3)
+
+    def getTopology(self):
+        return self.faceCounts, self.faceConnects
+
+    def getPoints(self):
+        if self.points is None:
+            raise ValueError("No points were given for %s." % self.name)
+        return self.points
+
+    def getVertexCount(self):
+        if self.points is None:
+            return int(self.faceConnects.max()) + 1 if self.faceConnects.size else 0
+        return len(self.points)
+
+
+####################
+# Face Classifying #
+####################
+
+def classifyFaces(faceCounts):
+    """
+    Classifies every face of a mesh in one pass.
+    :param faceCounts: number of vertices on each face.
+    :return: int array with TRI, QUAD or NGON for each face.
+    """
+    faceCounts = np.asarray(faceCounts)
+    return np.clip(faceCounts, TRI, NGON)
+
+
+def findNgonIndices(faceCounts):
+    """
+    Finds the faces that have more than 4 vertices (more than 2 triangles).
+    :param faceCounts: number of vertices on each face.
+    :return: sorted array of ngon face indices.
+    """
+    return np.flatnonzero(classifyFaces(faceCounts) == NGON)
+
+
+def compactRanges(indices):
+    """
+    Compacts sorted indices into inclusive (start, end) ranges.
+    e.g. [1, 2, 3, 7, 9, 10] -> [(1, 3), (7, 7), (9, 10)]
+    :param indices: sorted 1D array of unique indices.
+    :return: list of (start, end) tuples.
+    """
+    indices = np.asarray(indices)
+    if not indices.size:
+        return []
+
+    # A new range starts wherever the step to the previous index isn't 1.
+    breaks = np.flatnonzero(np.diff(indices) != 1) + 1
+    starts = indices[np.concatenate(([0], breaks))]
+    ends = indices[np.concatenate((breaks - 1, [indices.size - 1]))]
+
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+def componentNames(meshName, ranges, component="f"):
+    """
+    Turns index ranges into compacted component names.
+    e.g. ('pCube1', [(10, 99), (120, 120)]) -> ['pCube1.f[10:99]', 'pCube1.f[120]']
+    :param meshName: name of the mesh the components belong to.
+    :param ranges: list of (start, end) tuples from compactRanges().
+    :param component: component type, 'f' for faces.
+    :return: list of component names.
+    """
+    names = []
+    for start, end in ranges:
+        if start == end:
+            names.append("%s.%s[%d]" % (meshName, component, start))
+        else:
+            names.append("%s.%s[%d:%d]" % (meshName, component, start, end))
+
+    return names
+
+
+def componentIndices(names):
+    """
+    Turns component names back into indices, the reverse of componentNames().
+    e.g. ['pCube1.f[10:12]', 'pCube1.f[20]'] -> [10, 11, 12, 20]
+    :param names: list of component names.
+    :return: sorted array of unique indices, or None if a name covers every
+             component (e.g. 'pCube1.f[*]').
+    """
+    chunks = []
+    for name in names:
+        match = COMPONENT_INDEX.search(name)
+        if match is None:
+            raise ValueError("%s is not a component name." % name)
+        start, end = match.groups()
+        if start == "*":
+            return None
+        chunks.append(np.arange(int(start), int(end if end is not None else start) + 1))
+
+    if not chunks:
+        return np.zeros(0, dtype=np.int64)
+    return np.unique(np.concatenate(chunks))
+
+
+def restrictRanges(ranges, indices):
+    """
+    Keeps the parts of some index ranges that fall on the given indices.
+    e.g. ([(0, 4), (9, 9)], [3, 4, 5, 9]) -> [(3, 4), (9, 9)]
+    :param ranges: list of (start, end) tuples from compactRanges().
+    :param indices: sorted 1D array of unique indices.
+    :return: list of (start, end) tuples.
+    """
+    indices = np.asarray(indices)
+    if not ranges or not indices.size:
+        return []
+
+    starts, ends = np.asarray(ranges).T
+    # Last range starting at or before each index, the index is in it if it
+    # doesn't go past the range's end.
+    slots = np.searchsorted(starts, indices, side="right") - 1
+    inside = (slots >= 0) & (indices <= ends[np.maximum(slots, 0)])
+
+    return compactRanges(indices[inside])
+
+
+def findNgons(source, faceIndices=None):
+    """
+    Finds the ngons of a mesh source.
+    :param source: MeshSource to read the topology from.
+    :param faceIndices: sorted face indices to look through, defaults to every face.
+    :return: list of (start, end) ngon face ranges.
+    """
+    faceCounts, _ = source.getTopology()
+    ngonRanges = compactRanges(findNgonIndices(faceCounts))
+    if faceIndices is not None:
+        ngonRanges = restrictRanges(ngonRanges, faceIndices)
+
+    return ngonRanges
+
+
+def topologyHash(faceCounts, faceConnects):
+    """
+    Fast hash of a mesh's topology. Meshes with the same face counts and face
+    connects get the same hash, any change to either gives a new one.
+    :param faceCounts: number of vertices on each face.
+    :param faceConnects: vertex ids of every face.
+    :return: hex digest string.
+    """
+    faceCounts = np.ascontiguousarray(faceCounts, dtype=np.int32)
+    faceConnects = np.ascontiguousarray(faceConnects, dtype=np.int32)
+
+    digest = hashlib.sha1(np.array([faceCounts.size, faceConnects.size], dtype=np.int64).tobytes())
+    digest.update(faceCounts.tobytes())
+    digest.update(faceConnects.tobytes())
+
+    return digest.hexdigest()
+
+
+def dedupeTopologies(items):
+    """
+    Groups meshes that share the same topology, so an analysis can run once
+    per unique topology and its result be handed to every copy.
+    :param items: iterable of (name, faceCounts, faceConnects) tuples.
+    :return: (uniqueItems, copies) where uniqueItems is a list of
+             (name, faceCounts, faceConnects) with one entry per topology, and
+             copies is an OrderedDict of {uniqueName: [names with that topology]}.
+    """
+    uniqueItems = []
+    copies = OrderedDict()
+    representatives = {}
+
+    for name, faceCounts, faceConnects in items:
+        key = topologyHash(faceCounts, faceConnects)
+        if key not in representatives:
+            representatives[key] = name
+            uniqueItems.append((name, faceCounts, faceConnects))
+            copies[name] = []
+        copies[representatives[key]].append(name)
+
+    return uniqueItems, copies
+
+
+####################
+# Topology Audit   #
+####################
+
+# All the checks auditMesh() knows about, cheapest first.
+CHECKS = ("triangles", "ngons", "isolatedVertices", "nonManifoldEdges", "lamina", "zeroArea")
+
+
+class MeshArrays(object):
+    """
+    Arrays shared between the audit checks. Each one is only built the first
+    time a check asks for it.
+    """
+    def __init__(self, source):
+        self.source = source
+        self.faceCounts, self.faceConnects = source.getTopology()
+        self.faceCounts = np.asarray(self.faceCounts)
+        self.faceConnects = np.asarray(self.faceConnects)
+        self._cache = {}
+
+    def _cached(self, key, build):
+        if key not in self._cache:
+            self._cache[key] = build()
+        return self._cache[key]
+
+    @property
+    def faceOffsets(self):
+        """Index into faceConnects where each face starts."""
+        return self._cached("faceOffsets", lambda: np.concatenate(([0], np.cumsum(self.faceCounts)[:-1])))
+
+    @property
+    def faceIds(self):
+        """Face id of every entry in faceConnects."""
+        return self._cached("faceIds", lambda: np.repeat(np.arange(self.faceCounts.size), self.faceCounts))
+
+    @property
+    def nextConnects(self):
+        """Index of the next face vertex of every entry, wrapping round each face."""
+        def build():
+            nextIndex = np.arange(1, self.faceConnects.size + 1)
+            faceEnds = self.faceOffsets + self.faceCounts - 1
+            nextIndex[faceEnds] = self.faceOffsets
+            return nextIndex
+        return self._cached("nextConnects", build)
+
+    @property
+    def edgeKeys(self):
+        """One key per face edge, the same for both faces sharing the edge."""
+        def build():
+            start = self.faceConnects.astype(np.int64)
+            end = start[self.nextConnects]
+            return np.minimum(start, end) * self.vertexCount + np.maximum(start, end)
+        return self._cached("edgeKeys", build)
+
+    @property
+    def vertexCount(self):
+        return self._cached("vertexCount", self.source.getVertexCount)
+
+    @property
+    def points(self):
+        return self._cached("points", lambda: np.asarray(self.source.getPoints(), dtype=np.float64))
+
+
+def _checkTriangles(arrays, **kwargs):
+    return np.flatnonzero(arrays.faceCounts == 3)
+
+
+def _checkNgons(arrays, **kwargs):
+    return findNgonIndices(arrays.faceCounts)
+
+
+def _checkIsolatedVertices(arrays, **kwargs):
+    uses = np.bincount(arrays.faceConnects, minlength=arrays.vertexCount)
+    return np.flatnonzero(uses == 0)
+
+
+def _checkNonManifoldEdges(arrays, **kwargs):
+    keys, uses = np.unique(arrays.edgeKeys, return_counts=True)
+    keys = keys[uses > 2]
+    # Hand back vertex pairs, edge ids are only known to Maya.
+    return np.column_stack((keys // arrays.vertexCount, keys % arrays.vertexCount))
+
+
+def _checkLamina(arrays, **kwargs):
+    # Sort the vertices of every face so faces made of the same vertices line up.
+    faceIds = arrays.faceIds.astype(np.int64)
+    order = np.argsort(faceIds * arrays.vertexCount + arrays.faceConnects, kind="stable")
+    sortedConnects = arrays.faceConnects[order].astype(np.uint64)
+    offsets = arrays.faceOffsets
+
+    # Cheap signature per face, faces can only be lamina if their signatures
+    # match. Overflow just wraps round, which is fine for a hash.
+    with np.errstate(over="ignore"):
+        signature = (arrays.faceCounts.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15) +
+                     np.add.reduceat(sortedConnects, offsets) * np.uint64(0xBF58476D1CE4E5B9) +
+                     np.add.reduceat(sortedConnects * sortedConnects, offsets) * np.uint64(0x94D049BB133111EB) +
+                     sortedConnects[offsets])
+    _, inverse, uses = np.unique(signature, return_inverse=True, return_counts=True)
+
+    # Confirm the few candidates vertex by vertex.
+    lamina = set()
+    seen = {}
+    for face in np.flatnonzero(uses[inverse] > 1):
+        start = offsets[face]
+        key = tuple(sortedConnects[start:start + arrays.faceCounts[face]].tolist())
+        if key in seen:
+            lamina.update((seen[key], face))
+        else:
+            seen[key] = face
+
+    return np.array(sorted(lamina), dtype=np.int64)
+
+
+def _checkZeroArea(arrays, areaTolerance=1e-9, **kwargs):
+    points = arrays.points
+    current = points[arrays.faceConnects]
+    following = points[arrays.faceConnects[arrays.nextConnects]]
+    # Summing the cross products round a face gives twice its vector area.
+    vectorAreas = np.add.reduceat(np.cross(current, following), arrays.faceOffsets, axis=0)
+    areas = 0.5 * np.sqrt(np.einsum("ij,ij->i", vectorAreas, vectorAreas))
+    return np.flatnonzero(areas <= areaTolerance)
+
+
+_CHECK_FUNCTIONS = {"triangles": _checkTriangles,
+                    "ngons": _checkNgons,
+                    "isolatedVertices": _checkIsolatedVertices,
+                    "nonManifoldEdges": _checkNonManifoldEdges,
+                    "lamina": _checkLamina,
+                    "zeroArea": _checkZeroArea}
+
+
+def auditMesh(source, checks=None, areaTolerance=1e-9):
+    """
+    Runs topology checks on a mesh in one pass over its shared arrays.
+    :param source: MeshSource to read the mesh from.
+    :param checks: names of the checks to run (see CHECKS), defaults to all.
+                   Vertex positions are only read if 'zeroArea' is asked for.
+    :param areaTolerance: faces with an area at or below this are zero area.
+    :return: report dictionary, e.g.
+             {"name": "pCube1", "faceCount": 6, "vertexCount": 8,
+              "ngons": {"count": 1, "components": [(2, 2)]},
+              "nonManifoldEdges": {"count": 1, "components": [(0, 1)]}, ...}
+             Face and vertex checks give compacted (start, end) ranges,
+             nonManifoldEdges gives (vertex, vertex) pairs.
+    """
+    checks = CHECKS if checks is None else checks
+    unknown = set(checks) - set(CHECKS)
+    if unknown:
+        raise ValueError("Unknown mesh checks: %s" % ", ".join(sorted(unknown)))
+
+    arrays = MeshArrays(source)
+    report = {"name": source.name,
+              "faceCount": int(arrays.faceCounts.size),
+              "vertexCount": int(arrays.vertexCount)}
+
+    # Run in CHECKS order so the cheap checks come first.
+    for check in CHECKS:
+        if check not in checks:
+            continue
+        if arrays.faceCounts.size:
+            found = _CHECK_FUNCTIONS[check](arrays, areaTolerance=areaTolerance)
+        elif check == "isolatedVertices":
+            found = np.arange(arrays.vertexCount)
+        else:
+            found = np.zeros((0, 2) if check == "nonManifoldEdges" else 0, dtype=np.int64)
+        if check == "nonManifoldEdges":
+            components = [tuple(pair) for pair in found.tolist()]
+        else:
+            components = compactRanges(found)
+        report[check] = {"count": int(len(found)), "components": components}
+
+    return report
@@ -0,0 +1,132 @@
+import bisect
+import re
+
+'''
+Hands out unique node names without asking Maya whether each one exists.
+
+The allocator is built once from a single listing of the scene's names. For
+every prefix it keeps a sorted list of the numeric suffixes in use, e.g.
+'arm_ctrl_1' and 'arm_ctrl_4' are numbers 1 and 4 of prefix 'arm_ctrl_'. The
+next free number (filling gaps) is found with a binary search, and whole blocks
+of names can be reserved for a batch in one call.
+
+A name ending in several digits is filed under every way of splitting them,
+e.g. 'arm12' as number 12 of 'arm' and number 2 of 'arm1', so whichever prefix
+a name is reserved under the numbers in use are known.
+
+Used by the renamer (Rename and Number) and the rigControlBuilder.
+
+    allocator = NameAllocator(cmds.ls())
+    allocator.unique('arm_ctrl')            # 'arm_ctrl', or 'arm_ctrl_1' if taken.
+    allocator.reserve('finger_', 5, padding=2)  # ['finger_01', ... ] skipping used ones.
+'''
+
+TRAILING_DIGITS = re.compile(r"\d+$")
+
+
+# Returns every (prefix, digits) a name can be split into, one per way of splitting
+# its trailing digits, e.g. 'arm12' -> [('arm', '12'), ('arm1', '2')].
+def splitNumber(name):
+    match = TRAILING_DIGITS.search(name)
+    if not match:
+        return []
+
+    return [(name[:cut], name[cut:]) for cut in range(match.start(), len(name))]
+
+
+class NameAllocator(object):
+
+    def __init__(self, names=()):
+        # Every name in use.
+        self.names = set()
+        # {prefix: sorted list of the numbers in use after it}
+        self.numbers = {}
+
+        for name in names:
+            self.add(name)
+
+    def __contains__(self, name):
+        return name in self.names
+
+    def __len__(self):
+        return len(self.names)
+
+    # Marks a name as used. Long names are reduced to their short name.
+    def add(self, name):
+        name = name.rpartition("|")[2]
+        if name in self.names:
+            return
+        self.names.add(name)
+
+        for prefix, digits in splitNumber(name):
+            used = self.numbers.setdefault(prefix, [])
+            number = int(digits)
+            index = bisect.bisect_left(used, number)
+            if index == len(used) or used[index] != number:
+                used.insert(index, number)
+
+    # Frees a name, e.g. when the node that had it is renamed or deleted.
+    def remove(self, name):
+        name = name.rpartition("|")[2]
+        if name not in self.names:
+            return
+        self.names.discard(name)
+
+        for prefix, digits in splitNumber(name):
+            number = int(digits)
+            # 'a_1' and 'a_01' share number 1, only free it once neither is used.
+            if any(prefix + str(number).zfill(width) in self.names for width in range(1, len(digits) + 2)):
+                continue
+            used = self.numbers.get(prefix, [])
+            index = bisect.bisect_left(used, number)
+            if index < len(used) and used[index] == number:
+                del used[index]
+
+    # Returns True if the name is used.
+    def exists(self, name):
+        return name.rpartition("|")[2] in self.names
+
+    # Returns the lowest number at or above start that isn't used after prefix,
+    # filling gaps, in O(log n).
+    def nextNumber(self, prefix, start=1):
+        used = self.numbers.get(prefix)
+        if not used:
+            return start
+
+        first = bisect.bisect_left(used, start)
+        # With no gaps, used[first + i] == start + i. Binary search for the first
+        # place that breaks, that's where the gap is.
+        low, high = first, len(used)
+        while low < high:
+            middle = (low + high) // 2
+            if used[middle] == start + (middle - first):
+                low = middle + 1
+            else:
+                high = middle
+
+        return start + (low - first)
+
+    # Reserves count names made of prefix and a number, skipping numbers in use.
+    # padding is the number of digits the number is padded to with 0's.
+    # Returns the list of names, which are now marked as used.
+    def reserve(self, prefix, count, start=1, padding=0):
+        names = []
+        number = start
+        while len(names) < count:
+            number = self.nextNumber(prefix, number)
+            name = prefix + str(number).zfill(padding)
+            # A differently padded name can still be free, but keep numbers unique.
+            self.add(name)
+            names.append(name)
+            number += 1
+
+        return names
+
+    # Returns name if it's free, otherwise name + separator + the next free number.
+    # The returned name is marked as used.
+    def unique(self, name, separator="_", start=1):
+        if name not in self.names:
+            self.add(name)
+            return name
+
+        return self.reserve(name + separator, 1, start)[0]
@@ -0,0 +1,291 @@
+import json
+import re
+
+"""
+Naming convention linter. A convention is written as a spec of tokens and
+compiled once into one regular expression per node type, so checking a name
+is a single match call.
+
+A spec looks like DEFAULT_SPEC:
+    separator - what goes between tokens.
+    order     - token order. "name" is the free part of the name, "type" is
+                the node type suffix, any other token is one of a fixed set
+                of values from "tokens".
+    tokens    - allowed values of each fixed token, e.g. the sides.
+    optional  - tokens a name can leave out.
+    types     - allowed type suffixes for each node type. Node types that
+                aren't listed aren't checked.
+    numbered  - allow a number after the type suffix, straight after it or
+                after the separator (arm_ctrl1, arm_ctrl_1). The second is how
+                nameAllocator.unique() numbers a name that's taken.
+
+Names are checked in bulk with lint(), and NamingLinter keeps the results of
+a whole scene so only the nodes that change have to be checked again. Both only
+say which names fail, explain() works out why for the ones that get shown.
+
+The default spec follows the names the tools in this repo rely on: side
+tokens for rigMirror.getNewSideName, FK/IK for rigMirror.isFK/isIK, and the
+_ctrl/ctrlGrp suffixes controlBuilder gives its controls.
+
+Nothing in here imports maya, see namingLinter for checking a Maya scene.
+"""
+
+DEFAULT_SPEC = {
+    "separator": "_",
+    "order": ["side", "name", "rig", "type"],
+    "tokens": {
+        "side": ["L", "R", "C", "M", "Lf", "Rt", "Ct"],
+        "rig": ["FK", "IK", "fk", "ik"],
+    },
+    "optional": ["side", "rig"],
+    "types": {
+        "joint": ["jnt", "JNT", "joint"],
+        "ikHandle": ["ikHandle", "hdl"],
+        "transform": ["ctrl", "ctrlGrp", "grp", "Grp", "geo", "loc"],
+    },
+    "numbered": True,
+}
+
+SPEC_KEYS = ("separator", "order", "tokens", "optional", "types", "numbered")
+
+# The free part of a name: words split by the separator. As few words as
+# possible, so optional tokens after it still get picked up. Each word is
+# matched greedily, backtracking a letter at a time is much slower.
+NAME_PATTERN = "[A-Za-z][A-Za-z0-9]*(?:{sep}[A-Za-z0-9]+)*?"
+
+VALID_CHARACTERS = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+##############
+# Convention #
+##############
+
+class Convention(object):
+    """
+    A compiled naming convention.
+    """
+    def __init__(self, spec=None):
+        """
+        :param spec: spec dictionary (see the module docstring), defaults to
+                     DEFAULT_SPEC.
+        """
+        spec = dict(DEFAULT_SPEC if spec is None else spec)
+        unknown = set(spec) - set(SPEC_KEYS)
+        if unknown:
+            raise ValueError("Unknown naming spec keys: %s" % ", ".join(sorted(unknown)))
+
+        self.separator = spec.get("separator", "_")
+        self.order = list(spec.get("order", ["name", "type"]))
+        self.tokens = dict((key, list(values)) for key, values in spec.get("tokens", {}).items())
+        self.optional = set(spec.get("optional", []))
+        self.types = dict((key, list(values)) for key, values in spec.get("types", {}).items())
+        self.numbered = bool(spec.get("numbered", False))
+
+        for token in self.order:
+            if token not in ("name", "type") and token not in self.tokens:
+                raise ValueError("Naming spec token '%s' has no allowed values in 'tokens'." % token)
+
+        # {node type: compiled pattern}
+        self.matchers = dict((nodeType, re.compile(self.pattern(suffixes)))
+                             for nodeType, suffixes in self.types.items())
+        # {node type: endings a name has to have to stand a chance of matching}.
+        # One endswith call throws out most failing names far quicker than the
+        # pattern can, which has to backtrack through every split before failing.
+        self.endings = {}
+        if self.order and self.order[-1] == "type":
+            digits = tuple("0123456789") if self.numbered else ()
+            self.endings = dict((nodeType, tuple(suffixes) + digits) for nodeType, suffixes in self.types.items())
+
+    @classmethod
+    def fromFile(cls, path):
+        """
+        Loads a convention from a JSON spec file.
+        :param path: path to the .json spec.
+        :return: Convention.
+        """
+        with open(path) as specFile:
+            return cls(json.load(specFile))
+
+    def pattern(self, suffixes):
+        """
+        Builds the regular expression for names with one of the given type suffixes.
+        :param suffixes: allowed type suffixes.
+        :return: pattern string.
+        """
+        sep = re.escape(self.separator)
+        parts = []
+        leading = True
+        for token in self.order:
+            if token == "name":
+                piece = "(?P<name>%s)" % NAME_PATTERN.format(sep=sep)
+            else:
+                values = suffixes if token == "type" else self.tokens[token]
+                # Longest first, so "Lf" isn't matched as "L".
+                choices = "|".join(re.escape(value) for value in sorted(values, key=len, reverse=True))
+                piece = "(?P<%s>%s)" % (token, choices)
+                if token == "type" and self.numbered:
+                    piece += "(?:%s?[0-9]+)?" % sep
+
+            optional = token in self.optional
+            if leading:
+                if optional:
+                    parts.append("(?:%s%s)?" % (piece, sep))
+                    continue
+                parts.append(piece)
+                leading = False
+            else:
+                parts.append("(?:%s%s)%s" % (sep, piece, "?" if optional else ""))
+
+        return "^%s$" % "".join(parts)
+
+    def check(self, name, nodeType):
+        """
+        Checks a single name.
+        :param name: short node name.
+        :param nodeType: node type, names of types the convention doesn't list pass.
+        :return: None if the name follows the convention, otherwise the reason it doesn't.
+        """
+        matcher = self.matchers.get(nodeType)
+        if matcher is None or matcher.match(name):
+            return None
+
+        return self.explain(name, nodeType)
+
+    def parse(self, name, nodeType):
+        """
+        Splits a name into its tokens.
+        :return: {token: value} (None for left out optional tokens), or None if
+                 the name doesn't follow the convention.
+        """
+        matcher = self.matchers.get(nodeType)
+        found = matcher.match(name) if matcher is not None else None
+        return found.groupdict() if found else None
+
+    def explain(self, name, nodeType):
+        """
+        Works out why a name doesn't follow the convention. Only called for names
+        that failed, so it can take its time.
+        :return: reason string.
+        """
+        if not VALID_CHARACTERS.match(name):
+            return "has characters that can't be in a name"
+
+        words = name.split(self.separator)
+        if self.numbered and len(words) > 1 and words[-1].isdigit():
+            words.pop()
+        suffixes = self.types.get(nodeType, [])
+        if "type" in self.order and not self._endsWithSuffix(words[-1], suffixes):
+            return "%s names should end with %s" % (nodeType, " or ".join(self.separator + s for s in suffixes))
+
+        for position, token in enumerate(self.order):
+            if token in ("name", "type") or token in self.optional:
+                continue
+            # Required tokens before the name are at a fixed position from the start.
+            if "name" in self.order[position:] and (len(words) <= position or words[position] not in self.tokens[token]):
+                return "is missing its %s token (%s)" % (token, ", ".join(self.tokens[token]))
+
+        return "tokens aren't in the order %s" % self.separator.join(self.order)
+
+    def _endsWithSuffix(self, word, suffixes):
+        if self.numbered:
+            word = word.rstrip("0123456789")
+        return word in suffixes
+
+    def lint(self, names, nodeTypes):
+        """
+        Checks a list of names in one pass.
+        :param names: list of short names.
+        :param nodeTypes: node type of each name, or a single node type for all of them.
+        :return: list of (index, name, nodeType) for the names that fail. Use
+                 explain() for the reason, only the names shown need one.
+        """
+        if isinstance(nodeTypes, str):
+            return self._lintType(names, range(len(names)), nodeTypes)
+
+        # Group the names by type, so each group is matched in one map call.
+        groups = {}
+        for index, nodeType in enumerate(nodeTypes):
+            group = groups.get(nodeType)
+            if group is None:
+                groups[nodeType] = [index]
+            else:
+                group.append(index)
+
+        failed = []
+        for nodeType, indices in groups.items():
+            if nodeType in self.matchers:
+                failed.extend(self._lintType([names[index] for index in indices], indices, nodeType))
+        failed.sort()
+
+        return failed
+
+    def _lintType(self, names, indices, nodeType):
+        matcher = self.matchers.get(nodeType)
+        if matcher is None:
+            return []
+
+        match = matcher.match
+        endings = self.endings.get(nodeType)
+        if endings is None:
+            return [(index, name, nodeType) for index, name, found in zip(indices, names, map(match, names))
+                    if found is None]
+
+        return [(index, name, nodeType) for index, name in zip(indices, names)
+                if not name.endswith(endings) or match(name) is None]
+
+
+###############
+# Incremental #
+###############
+
+class NamingLinter(object):
+    """
+    Keeps the lint results of a set of nodes, so when nodes are added, renamed
+    or deleted only they are checked again.
+    """
+    def __init__(self, convention=None):
+        self.convention = convention or Convention()
+        # {handle: (name, nodeType)} of the nodes that fail.
+        self.violations = {}
+        self.checked = 0
+
+    def __len__(self):
+        return len(self.violations)
+
+    def build(self, items):
+        """
+        Checks every node, replacing any earlier results.
+        :param items: list of (handle, name, nodeType).
+        """
+        self.violations = {}
+        self.checked = 0
+        self.update(items)
+
+    def update(self, items):
+        """
+        Checks only the given nodes again, e.g. ones that were added or renamed.
+        :param items: list of (handle, name, nodeType).
+        """
+        items = list(items)
+        violations = self.violations
+        for handle, _, _ in items:
+            violations.pop(handle, None)
+
+        failed = self.convention.lint([name for _, name, _ in items], [nodeType for _, _, nodeType in items])
+        for index, name, nodeType in failed:
+            violations[items[index][0]] = (name, nodeType)
+        self.checked += len(items)
+
+    def remove(self, handles):
+        """
+        Forgets nodes that were deleted.
+        :param handles: list of handles.
+        """
+        for handle in handles:
+            self.violations.pop(handle, None)
+
+    def reason(self, handle):
+        """
+        :return: why a failing node's name doesn't follow the convention.
+        """
+        return self.convention.explain(*self.violations[handle])
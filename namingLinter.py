@@ -0,0 +1,192 @@
+import time
+
+import maya.cmds
+import maya.api.OpenMaya as om
+
+import namingConvention
+
+"""
+Checks the names of the nodes in a Maya scene against a naming convention
+(see namingConvention for how conventions are written).
+
+lintScene() lists every node and its type with one ls call and checks them
+all in one pass. SceneLinter keeps the results and listens for nodes being
+added, renamed and deleted, so revalidate() only checks the nodes that
+changed since the last time.
+
+Default nodes, startup cameras and referenced nodes are skipped, they can't
+be renamed anyway.
+
+Usage:
+    import namingLinter
+    namingLinter.lintScene(select=True)
+
+    linter = namingLinter.SceneLinter()
+    linter.build()
+    ...
+    linter.revalidate()
+"""
+
+
+def _skippedNodes():
+    """
+    :return: set of long names of the nodes that aren't checked.
+    """
+    skipped = set(maya.cmds.ls(defaultNodes=True, long=True) or [])
+    skipped.update(maya.cmds.ls(referencedNodes=True, long=True) or [])
+    for camera in maya.cmds.ls(cameras=True, long=True) or []:
+        if maya.cmds.camera(camera, query=True, startupCamera=True):
+            skipped.add(camera)
+            skipped.update(maya.cmds.listRelatives(camera, parent=True, fullPath=True) or [])
+
+    return skipped
+
+
+def lintScene(convention=None, select=False):
+    """
+    Checks every node in the scene in one pass.
+    :param convention: namingConvention.Convention, defaults to the default spec.
+    :param select: select the nodes that fail.
+    :return: list of (longName, nodeType) of the nodes that fail, see
+             Convention.explain() for why.
+    """
+    start = time.time()
+    convention = convention or namingConvention.Convention()
+
+    # One call for every node and its type: [name, type, name, type, ...]
+    listing = maya.cmds.ls(long=True, showType=True) or []
+    skipped = _skippedNodes()
+    longNames = []
+    nodeTypes = []
+    for longName, nodeType in zip(listing[::2], listing[1::2]):
+        if longName not in skipped:
+            longNames.append(longName)
+            nodeTypes.append(nodeType)
+
+    shortNames = [longName.rpartition("|")[2] for longName in longNames]
+    failed = [(longNames[index], nodeType) for index, _, nodeType in convention.lint(shortNames, nodeTypes)]
+
+    elapsed = time.time() - start
+    print("Checked %d node names in %.2fs, %d don't follow the naming convention." % (len(longNames), elapsed,
+                                                                                    len(failed)))
+    # Only the names shown need a reason.
+    for longName, nodeType in failed[:20]:
+        reason = convention.explain(longName.rpartition("|")[2], nodeType)
+        print("    %s (%s): %s" % (longName, nodeType, reason))
+    if len(failed) > 20:
+        print("    ...and %d more." % (len(failed) - 20))
+
+    if select:
+        maya.cmds.select([longName for longName, _ in failed], replace=True)
+
+    return failed
+
+
+class SceneLinter(object):
+    """
+    Keeps the lint results of every node in the scene up to date, checking
+    only the nodes added or renamed since the last check.
+    """
+    def __init__(self, convention=None):
+        self.linter = namingConvention.NamingLinter(convention)
+        self.callbacks = []
+        # UUIDs of nodes added or renamed since the last check.
+        self.dirty = set()
+
+    def build(self):
+        """
+        Checks every node in the scene and starts listening for changes.
+        """
+        start = time.time()
+        skipped = _skippedNodes()
+        items = []
+        nodeIt = om.MItDependencyNodes()
+        while not nodeIt.isDone():
+            item = self.item(nodeIt.thisNode(), skipped)
+            if item is not None:
+                items.append(item)
+            nodeIt.next()
+
+        self.linter.build(items)
+        self.dirty = set()
+        if not self.callbacks:
+            self.addCallbacks()
+
+        print("Checked %d node names in %.2fs, %d don't follow the naming convention."
+              % (len(items), time.time() - start, len(self.linter)))
+
+    def item(self, node, skipped=()):
+        """
+        :return: (uuid, name, nodeType) for a node, or None if it isn't checked.
+        """
+        nodeFn = om.MFnDependencyNode(node)
+        if nodeFn.isDefaultNode or nodeFn.isFromReferencedFile:
+            return None
+        if skipped and node.hasFn(om.MFn.kDagNode) and om.MDagPath.getAPathTo(node).fullPathName() in skipped:
+            return None
+
+        return nodeFn.uuid().asString(), nodeFn.name(), nodeFn.typeName
+
+    def addCallbacks(self):
+        self.callbacks = [
+            om.MDGMessage.addNodeAddedCallback(self.nodeChanged, "dependNode"),
+            om.MDGMessage.addNodeRemovedCallback(self.nodeRemoved, "dependNode"),
+            om.MNodeMessage.addNameChangedCallback(om.MObject(), self.nodeChanged),
+            om.MSceneMessage.addCallback(om.MSceneMessage.kAfterOpen, self.rebuild),
+            om.MSceneMessage.addCallback(om.MSceneMessage.kAfterNew, self.rebuild),
+        ]
+
+    def close(self):
+        """
+        Stops listening for changes.
+        """
+        if self.callbacks:
+            om.MMessage.removeCallbacks(self.callbacks)
+        self.callbacks = []
+
+    def rebuild(self, *args):
+        self.build()
+
+    def nodeChanged(self, node, *args):
+        # Names aren't final while nodes are being created, so just note the node
+        # and check it in revalidate().
+        if not node.isNull():
+            self.dirty.add(om.MFnDependencyNode(node).uuid().asString())
+
+    def nodeRemoved(self, node, *args):
+        uuid = om.MFnDependencyNode(node).uuid().asString()
+        self.dirty.discard(uuid)
+        self.linter.remove([uuid])
+
+    def revalidate(self):
+        """
+        Checks the nodes added or renamed since the last check.
+        :return: number of nodes checked.
+        """
+        items = []
+        for uuid in self.dirty:
+            selList = om.MSelectionList()
+            try:
+                selList.add(om.MUuid(uuid))
+            except (RuntimeError, ValueError):
+                continue
+            item = self.item(selList.getDependNode(0))
+            if item is None:
+                self.linter.remove([uuid])
+            else:
+                items.append(item)
+
+        self.linter.update(items)
+        self.dirty = set()
+
+        return len(items)
+
+    def violations(self):
+        """
+        :return: list of (name, nodeType, reason) of the nodes that fail.
+        """
+        if self.dirty:
+            self.revalidate()
+
+        explain = self.linter.convention.explain
+        return [(name, nodeType, explain(name, nodeType)) for name, nodeType in self.linter.violations.values()]
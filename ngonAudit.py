@@ -0,0 +1,224 @@
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+
+import meshTopology
+import objScanner
+
+"""
+Batch ngon audit for many meshes at once.
+
+The topology arrays of every mesh are collected first (from a Maya scene by
+ngonFinder.auditScene()) and the classification is fanned out over a process
+pool. A directory of exported .obj files is audited one file per worker with
+the streaming objScanner. Each mesh gets a report:
+    name       - mesh name (or file:object for exported assets).
+    faceCount  - number of faces.
+    ngonCount  - number of faces with more than 4 vertices.
+    maxValence - vertex count of the worst face.
+    ngonRanges - compacted (start, end) ngon face ranges.
+
+Run from the command line to audit a directory of .obj files, e.g.:
+    python ngonAudit.py /path/to/assets --report audit.json --fail-on-ngons
+"""
+
+# Only bother starting a pool when there is this much work to share out.
+MIN_FACES_FOR_POOL = 200000
+
+
+####################
+# Auditing         #
+####################
+
+def auditTopology(item):
+    """
+    Audits a single mesh. Top level function so it can be sent to a pool.
+    :param item: (name, faceCounts) tuple.
+    :return: report dictionary for the mesh.
+    """
+    name, faceCounts = item
+    faceCounts = np.asarray(faceCounts)
+    ngonIndices = meshTopology.findNgonIndices(faceCounts)
+
+    return {"name": name,
+            "faceCount": int(faceCounts.size),
+            "ngonCount": int(ngonIndices.size),
+            "maxValence": int(faceCounts.max()) if faceCounts.size else 0,
+            "ngonRanges": meshTopology.compactRanges(ngonIndices)}
+
+
+def auditTopologies(items, processes=None):
+    """
+    Audits many meshes, spreading them over a process pool.
+    :param items: list of (name, faceCounts) tuples.
+    :param processes: number of worker processes, defaults to the cpu count.
+                      Pass 1 to audit in this process.
+    :return: list of reports in the same order as items.
+    """
+    items = list(items)
+    processes = processes or multiprocessing.cpu_count()
+    totalFaces = sum(len(faceCounts) for _, faceCounts in items)
+
+    if processes == 1 or len(items) < 2 or totalFaces < MIN_FACES_FOR_POOL:
+        return [auditTopology(item) for item in items]
+
+    _setPoolExecutable()
+    # Hand out work in chunks so small meshes don't pay a round trip each.
+    chunkSize = max(1, len(items) // (processes * 4))
+    pool = multiprocessing.Pool(processes)
+    try:
+        reports = pool.map(auditTopology, items, chunkSize)
+    finally:
+        pool.close()
+        pool.join()
+
+    return reports
+
+
+def fanOut(reports, copies):
+    """
+    Hands the reports of unique meshes out to every copy of them.
+    :param reports: reports of the unique meshes.
+    :param copies: {uniqueName: [names]} from meshTopology.dedupeTopologies().
+    :return: list of reports, one per copy, each noting which mesh it came from.
+    """
+    fannedOut = []
+    for report in reports:
+        for name in copies.get(report["name"], [report["name"]]):
+            copy = dict(report, name=name, sourceMesh=report["name"])
+            fannedOut.append(copy)
+
+    return fannedOut
+
+
+def _setPoolExecutable():
+    """
+    Inside a Maya GUI session sys.executable is Maya itself, so point the pool
+    at mayapy to stop it from launching more copies of Maya.
+    """
+    exe = os.path.basename(sys.executable).lower()
+    if exe.startswith("maya") and not exe.startswith("mayapy"):
+        mayapy = os.path.join(os.path.dirname(sys.executable), "mayapy")
+        if sys.platform == "win32":
+            mayapy += ".exe"
+        multiprocessing.set_executable(mayapy)
+
+
+####################
+# Exported Assets  #
+####################
+
+def auditObjFile(path):
+    """
+    Audits every object/group of an .obj file with the streaming objScanner.
+    Top level function so it can be sent to a pool.
+    :param path: path to the .obj file.
+    :return: list of reports, one per object/group.
+    """
+    baseName = os.path.basename(path)
+    reports = []
+    for group in objScanner.scanObj(path).groups.values():
+        report = group.asDict()
+        report["name"] = "%s:%s" % (baseName, group.name)
+        reports.append(report)
+
+    return reports
+
+
+def auditDirectory(directory, processes=None):
+    """
+    Audits every .obj file in a directory (recursively), one file per worker.
+    :param directory: directory to search.
+    :param processes: number of worker processes, defaults to the cpu count.
+    :return: list of reports, one per object/group of every file.
+    """
+    paths = []
+    for root, _, files in os.walk(directory):
+        for fileName in sorted(files):
+            if fileName.lower().endswith(".obj"):
+                paths.append(os.path.join(root, fileName))
+
+    processes = processes or multiprocessing.cpu_count()
+    if processes == 1 or len(paths) < 2:
+        fileReports = [auditObjFile(path) for path in paths]
+    else:
+        _setPoolExecutable()
+        pool = multiprocessing.Pool(min(processes, len(paths)))
+        try:
+            fileReports = pool.map(auditObjFile, paths, 1)
+        finally:
+            pool.close()
+            pool.join()
+
+    return [report for reports in fileReports for report in reports]
+
+
+####################
+# Reports          #
+####################
+
+def summarise(reports):
+    """
+    Totals up a list of reports.
+    :param reports: list of report dictionaries.
+    :return: summary dictionary.
+    """
+    return {"meshCount": len(reports),
+            "faceCount": sum(report["faceCount"] for report in reports),
+            "ngonCount": sum(report["ngonCount"] for report in reports),
+            "meshesWithNgons": sum(1 for report in reports if report["ngonCount"]),
+            "maxValence": max([report["maxValence"] for report in reports] or [0])}
+
+
+def writeReport(reports, path):
+    """
+    Writes the reports out as JSON or CSV, depending on the file extension.
+    :param reports: list of report dictionaries.
+    :param path: .json or .csv path to write to.
+    :return: N/A
+    """
+    if path.lower().endswith(".csv"):
+        with open(path, "w", newline="") as reportFile:
+            writer = csv.writer(reportFile)
+            writer.writerow(["name", "faceCount", "ngonCount", "maxValence", "ngonRanges"])
+            for report in reports:
+                ranges = " ".join("%d:%d" % (start, end) for start, end in report["ngonRanges"])
+                writer.writerow([report["name"], report["faceCount"], report["ngonCount"],
+                                 report["maxValence"], ranges])
+    else:
+        with open(path, "w") as reportFile:
+            json.dump({"summary": summarise(reports), "meshes": reports}, reportFile, indent=2)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Audit a directory of .obj files for ngons.")
+    parser.add_argument("directory", help="Directory of exported assets to scan.")
+    parser.add_argument("--report", help="Write the report to this .json or .csv file.")
+    parser.add_argument("--processes", type=int, default=None, help="Number of worker processes.")
+    parser.add_argument("--fail-on-ngons", action="store_true",
+                        help="Exit with status 1 if any ngons are found.")
+    args = parser.parse_args(args)
+
+    start = time.time()
+    reports = auditDirectory(args.directory, args.processes)
+    summary = summarise(reports)
+
+    print("Audited %d meshes (%d faces) in %.2fs, %d ngons found."
+          % (summary["meshCount"], summary["faceCount"], time.time() - start, summary["ngonCount"]))
+
+    if args.report:
+        writeReport(reports, args.report)
+
+    if args.fail_on_ngons and summary["ngonCount"]:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
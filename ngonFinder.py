@@ -1,49 +1,211 @@
 import maya.cmds
+import maya.api.OpenMaya as om
+import numpy as np
+
+import meshTopology
+import ngonAudit
+import topologyCache
 
 """
 Looks at the selected mesh and selects any faces that are ngons
 (has more than 4 edges on a face/more than 2 triangles making up the face).
 
+The face vertex counts are read from the mesh in one bulk call and classified
+by meshTopology, the ngons are then selected with a single select call using
+compacted face ranges (e.g. pCube1.f[10:99]).
+
+Results are cached by topology hash, so running it again on a mesh whose
+topology hasn't changed returns straight away. Set NGON_CACHE.directory to
+also keep results on disk per asset.
+
 refs used:
 https://stackoverflow.com/questions/32428452/selecting-faces-in-a-list-maya-python
 """
 
+# Ngon results of recently scanned meshes, keyed by topology hash.
+NGON_CACHE = topologyCache.TopologyCache(maxSize=64)
+
+
+class MayaMeshSource(meshTopology.MeshSource):
+    """
+    Reads the topology arrays of a Maya mesh through the API.
+    """
+    def getTopology(self):
+        selList = om.MSelectionList()
+        selList.add(self.name)
+        meshFn = om.MFnMesh(selList.getDagPath(0))
+
+        # Face vertex counts and face vertex ids in one call.
+        faceCounts, faceConnects = meshFn.getVertices()
+
+        return (np.array(faceCounts, dtype=np.int32),
+                np.array(faceConnects, dtype=np.int32))
+
+    def getPoints(self):
+        # Object space positions of every vertex as one flat list.
+        points = maya.cmds.xform('%s.vtx[*]' % self.name, query=True, translation=True, objectSpace=True)
+        return np.array(points, dtype=np.float64).reshape(-1, 3)
+
+    def getVertexCount(self):
+        return maya.cmds.polyEvaluate(self.name, vertex=True)
+
 
 def findNgons(faces):
     """
     Looks through the obj faces given and selects all the ngons in the list.
-    :param faces: faces we want to look through for ngons.
-    :return: Returns 'None' if no ngons are found.
+    :param faces: faces we want to look through for ngons, or the mesh name.
+    :return: Returns 'None' if no ngons are found, otherwise the list of
+             compacted ngon face names that were selected.
     """
-    # Expand compacted face name into a list of face names.
-    facesList = maya.cmds.filterExpand(faces, sm=34)
-    ngonCount = 0
-    ngonFaces = []
+    if not isinstance(faces, (list, tuple)):
+        faces = [faces]
+    objName = faces[0].split('.')[0]
 
-    # Clear selection.
-    maya.cmds.select(cl=True)
+    # Only look through the faces we were given, a bare mesh name means all of them.
+    faceIndices = None
+    if '.' in faces[0]:
+        faceIndices = meshTopology.componentIndices(faces)
+
+    faceCounts, faceConnects = MayaMeshSource(objName).getTopology()
+    topologyHash = meshTopology.topologyHash(faceCounts, faceConnects)
 
-    # Select face and check the number of tris.
-    for face in facesList:
-        maya.cmds.select(face, add=True)
-        numOfTris = maya.cmds.polyEvaluate(tc=True)
-        # Clears selection.
-        maya.cmds.select(face, cl=True)
+    # The cache holds the ngons of the whole mesh, cut them down to the faces asked for after.
+    ngonRanges = NGON_CACHE.get('ngons', topologyHash, asset=objName)
+    if ngonRanges is None:
+        ngonRanges = meshTopology.findNgons(meshTopology.InMemoryMeshSource(objName, faceCounts, faceConnects))
+        NGON_CACHE.put('ngons', topologyHash, ngonRanges, asset=objName)
+    if faceIndices is not None:
+        ngonRanges = meshTopology.restrictRanges(ngonRanges, faceIndices)
+    ngonCount = sum(end - start + 1 for start, end in ngonRanges)
 
-        if numOfTris > 2:
-            ngonCount += 1
-            ngonFaces.append(face)
+    # Clear selection.
+    maya.cmds.select(cl=True)
 
     # If list is empty (no ngons) return None.
-    if len(ngonFaces) == 0:
-        objName = facesList[0].split('.')[0]
-        print "No ngons found on ", objName
+    if not ngonRanges:
+        print("No ngons found on %s" % objName)
         return None
 
-    # Select the faces in the ngon list.
-    [maya.cmds.select(face, add=True, af=True) for face in ngonFaces]
+    # Select all the ngons at once.
+    ngonFaces = meshTopology.componentNames(objName, ngonRanges)
+    maya.cmds.select(ngonFaces, replace=True)
+
+    print("NGons found: %d" % ngonCount)
+
+    return ngonFaces
+
+
+def nodeUuids(paths):
+    """
+    Gets the uuid of the node at each path. Every instance path of a shape
+    gives the same uuid.
+    :param paths: list of DAG paths.
+    :return: list of uuid strings, one per path.
+    """
+    selList = om.MSelectionList()
+    for path in paths:
+        selList.add(path)
+
+    return [om.MFnDependencyNode(selList.getDependNode(i)).uuid().asString()
+            for i in range(selList.length())]
 
-    print "NGons found: ", ngonCount
+
+def collectSceneTopology():
+    """
+    Reads the topology of every mesh in the scene, once per unique mesh.
+    Instances of a shape are only read once, and meshes with the same topology
+    are grouped together by meshTopology.dedupeTopologies().
+    :return: (items, copies) where items is a list of (mesh name, faceCounts)
+             for each unique topology, and copies maps each of those meshes to
+             every mesh path that shares it.
+    """
+    # Skip intermediate (orig) shapes, they are not what the artist sees. ls only
+    # lists one path per instanced shape unless asked for all of them.
+    meshes = maya.cmds.ls(type='mesh', noIntermediate=True, long=True, allPaths=True) or []
+    uuids = nodeUuids(meshes)
+
+    # Instanced shapes show up once per path but share one uuid.
+    instances = {}
+    for mesh, uuid in zip(meshes, uuids):
+        instances.setdefault(uuid, []).append(mesh)
+
+    topologies = []
+    for paths in instances.values():
+        faceCounts, faceConnects = MayaMeshSource(paths[0]).getTopology()
+        topologies.append((paths[0], faceCounts, faceConnects))
+    instancePaths = dict((paths[0], paths) for paths in instances.values())
+
+    uniqueItems, topologyCopies = meshTopology.dedupeTopologies(topologies)
+
+    copies = {}
+    for name, sameTopology in topologyCopies.items():
+        copies[name] = [path for mesh in sameTopology for path in instancePaths[mesh]]
+
+    return [(name, faceCounts) for name, faceCounts, _ in uniqueItems], copies
+
+
+def auditScene(reportPath=None, processes=None):
+    """
+    Audits every mesh in the scene for ngons. Each unique topology is only
+    classified once and its report given to all of its copies and instances.
+    :param reportPath: optional .json or .csv file to write the report to.
+    :param processes: number of worker processes to classify with.
+    :return: list of per mesh reports.
+    """
+    items, copies = collectSceneTopology()
+    reports = ngonAudit.fanOut(ngonAudit.auditTopologies(items, processes), copies)
+    summary = ngonAudit.summarise(reports)
+    print("Meshes: %d (%d unique), faces: %d, ngons: %d (on %d meshes)"
+          % (summary["meshCount"], len(items), summary["faceCount"], summary["ngonCount"],
+             summary["meshesWithNgons"]))
+
+    if reportPath:
+        ngonAudit.writeReport(reports, reportPath)
+
+    return reports
+
+
+def auditTopology(mesh=None, checks=None, select=True):
+    """
+    Runs the topology checks from meshTopology.auditMesh() on a mesh in one
+    pass, e.g. auditTopology(checks=['ngons', 'lamina']).
+    :param mesh: mesh to check, defaults to the selected object.
+    :param checks: names of the checks to run, defaults to all of them.
+    :param select: selects the faces and vertices that were found.
+    :return: the audit report.
+    """
+    if mesh is None:
+        selObj = maya.cmds.ls(selection=True)
+        if len(selObj) != 1:
+            maya.cmds.warning("Please select one object.")
+            return None
+        mesh = selObj[0]
+
+    report = meshTopology.auditMesh(MayaMeshSource(mesh), checks)
+
+    components = []
+    for check in meshTopology.CHECKS:
+        if check not in report:
+            continue
+        print("%s: %d" % (check, report[check]["count"]))
+
+        if check == "nonManifoldEdges":
+            # Edges are reported as vertex pairs, let Maya find the edges between them.
+            for pair in report[check]["components"]:
+                vertices = ['%s.vtx[%d]' % (mesh, vertex) for vertex in pair]
+                components.extend(maya.cmds.polyListComponentConversion(vertices, toEdge=True,
+                                                                        internal=True) or [])
+        elif check == "isolatedVertices":
+            components.extend(meshTopology.componentNames(mesh, report[check]["components"], "vtx"))
+        else:
+            components.extend(meshTopology.componentNames(mesh, report[check]["components"]))
+
+    if select and components:
+        maya.cmds.select(components, replace=True)
+    elif select:
+        maya.cmds.select(cl=True)
+
+    return report
 
 
 def run():
@@ -54,6 +216,5 @@ def run():
         return None
 
     faces = maya.cmds.ls('%s.f[*]' % selObj[0])
-    print "Object Name: ", selObj[0]
+    print("Object Name: ", selObj[0])
     findNgons(faces)
-
@@ -0,0 +1,269 @@
+"""
+Headless ngon scanner for .obj files, for publish hooks that have no Maya
+session.
+
+The file is memory-mapped and read in fixed size chunks that end on a line
+break. Each chunk is handled as one NumPy byte array: the 'f' records are
+found and their vertices counted by counting whitespace separated tokens,
+so no Python objects are built per face or per vertex and memory use stays
+the same no matter how big the file is. Only the compacted ngon ranges of
+each object/group are kept.
+
+Face indices are counted per object/group (from 'o' and 'g' records), the
+same way the faces are numbered once the object is imported.
+
+Run from the command line, e.g.:
+    python objScanner.py hero.obj --read-speed
+"""
+
+import argparse
+import mmap
+import os
+import sys
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+import meshTopology
+
+CHUNK_SIZE = 1024 * 1024
+DEFAULT_GROUP = "default"
+
+_NEWLINE = ord("\n")
+_SPACE = ord(" ")
+_TAB = ord("\t")
+
+# Lookup table of the bytes that separate tokens.
+_IS_WHITESPACE = np.zeros(256, dtype=bool)
+_IS_WHITESPACE[[_SPACE, _TAB, ord("\r"), _NEWLINE]] = True
+
+
+class GroupStats(object):
+    """
+    Running totals for one object/group of an .obj file.
+    """
+    def __init__(self, name):
+        self.name = name
+        self.faceCount = 0
+        self.ngonCount = 0
+        self.maxValence = 0
+        self.ngonRanges = []
+
+    def addFaces(self, faceCounts):
+        """
+        Adds the vertex counts of the next faces of this group.
+        :param faceCounts: array of vertex counts, one per face.
+        :return: N/A
+        """
+        if not faceCounts.size:
+            return
+
+        ngonIndices = meshTopology.findNgonIndices(faceCounts) + self.faceCount
+        ranges = meshTopology.compactRanges(ngonIndices)
+
+        # Join a range that carries on from the end of the previous chunk.
+        if ranges and self.ngonRanges and self.ngonRanges[-1][1] + 1 == ranges[0][0]:
+            self.ngonRanges[-1] = (self.ngonRanges[-1][0], ranges.pop(0)[1])
+        self.ngonRanges.extend(ranges)
+
+        self.faceCount += int(faceCounts.size)
+        self.ngonCount += int(ngonIndices.size)
+        self.maxValence = max(self.maxValence, int(faceCounts.max()))
+
+    def asDict(self):
+        return {"name": self.name,
+                "faceCount": self.faceCount,
+                "ngonCount": self.ngonCount,
+                "maxValence": self.maxValence,
+                "ngonRanges": list(self.ngonRanges)}
+
+
+class ScanResult(object):
+    """
+    Result of scanning one .obj file.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.groups = OrderedDict()
+        self.byteCount = 0
+        self.seconds = 0.0
+
+    @property
+    def faceCount(self):
+        return sum(group.faceCount for group in self.groups.values())
+
+    @property
+    def ngonCount(self):
+        return sum(group.ngonCount for group in self.groups.values())
+
+    @property
+    def facesPerSecond(self):
+        return self.faceCount / self.seconds if self.seconds else 0.0
+
+    @property
+    def megabytesPerSecond(self):
+        return self.byteCount / (1024.0 * 1024.0) / self.seconds if self.seconds else 0.0
+
+
+####################
+# Scanning         #
+####################
+
+def _scanChunk(chunk):
+    """
+    Finds the face and group records of a chunk of whole lines.
+    :param chunk: uint8 array of the chunk bytes.
+    :return: (faceLines, faceCounts, groupLines, groupNames) where the line
+             arrays are line numbers within the chunk, used to put the faces
+             into the right group.
+    """
+    size = chunk.size
+    lineEnds = np.flatnonzero(chunk == _NEWLINE)
+    if not lineEnds.size or lineEnds[-1] != size - 1:
+        # Last line of the file without a line break.
+        lineEnds = np.append(lineEnds, size)
+    lineStarts = np.concatenate(([0], lineEnds[:-1] + 1))
+
+    # Look at the first two bytes of every line.
+    first = chunk[np.minimum(lineStarts, size - 1)]
+    second = chunk[np.minimum(lineStarts + 1, size - 1)]
+    secondIsSpace = (second == _SPACE) | (second == _TAB)
+    isFace = (first == ord("f")) & secondIsSpace & (lineEnds - lineStarts > 1)
+    isGroup = ((first == ord("o")) | (first == ord("g"))) & secondIsSpace
+
+    # Count the tokens on every line: a token starts on a non whitespace byte
+    # that follows whitespace.
+    isSpace = _IS_WHITESPACE[chunk]
+    tokenStarts = ~isSpace
+    tokenStarts[1:] &= isSpace[:-1]
+    tokenStarts = np.flatnonzero(tokenStarts)
+
+    faceLines = np.flatnonzero(isFace)
+    # Every face record has one token for the 'f' itself.
+    faceCounts = (np.searchsorted(tokenStarts, lineEnds[faceLines]) -
+                  np.searchsorted(tokenStarts, lineStarts[faceLines]) - 1)
+
+    groupLines = np.flatnonzero(isGroup)
+    groupNames = []
+    for line in groupLines:
+        name = chunk[lineStarts[line] + 2:lineEnds[line]].tobytes().strip()
+        groupNames.append(name.decode("utf-8", "replace") or DEFAULT_GROUP)
+
+    return faceLines, faceCounts, groupLines, groupNames
+
+
+def _chunks(fileMap, chunkSize):
+    """
+    Yields (offset, length) of chunks of the mapped file that end on a line break.
+    """
+    size = len(fileMap)
+    offset = 0
+    while offset < size:
+        end = min(offset + chunkSize, size)
+        if end < size:
+            lineBreak = fileMap.rfind(b"\n", offset, end)
+            if lineBreak == -1:
+                # A single line longer than the chunk, read up to its end.
+                lineBreak = fileMap.find(b"\n", end)
+                lineBreak = size - 1 if lineBreak == -1 else lineBreak
+            end = lineBreak + 1
+        yield offset, end - offset
+        offset = end
+
+
+def scanObj(path, chunkSize=CHUNK_SIZE):
+    """
+    Scans an .obj file for ngons.
+    :param path: path to the .obj file.
+    :param chunkSize: number of bytes to handle at once.
+    :return: ScanResult with the stats of every object/group.
+    """
+    result = ScanResult(path)
+    start = time.time()
+
+    with open(path, "rb") as objFile:
+        size = os.fstat(objFile.fileno()).st_size
+        result.byteCount = size
+        if not size:
+            return result
+
+        fileMap = mmap.mmap(objFile.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            current = GroupStats(DEFAULT_GROUP)
+            for offset, length in _chunks(fileMap, chunkSize):
+                chunk = np.frombuffer(fileMap, dtype=np.uint8, count=length, offset=offset)
+                faceLines, faceCounts, groupLines, groupNames = _scanChunk(chunk)
+                del chunk
+
+                # Split the faces of the chunk at each group record.
+                splits = np.searchsorted(faceLines, groupLines)
+                begin = 0
+                for split, name in zip(splits, groupNames):
+                    if split > begin:
+                        _addGroupFaces(result, current, faceCounts[begin:split])
+                    current = result.groups.get(name) or GroupStats(name)
+                    begin = split
+                _addGroupFaces(result, current, faceCounts[begin:])
+        finally:
+            fileMap.close()
+
+    result.seconds = time.time() - start
+
+    return result
+
+
+def _addGroupFaces(result, group, faceCounts):
+    if not faceCounts.size:
+        return
+    # Groups only make it into the result once they have faces.
+    result.groups.setdefault(group.name, group)
+    group.addFaces(faceCounts)
+
+
+def measureReadSpeed(path, chunkSize=CHUNK_SIZE):
+    """
+    Times a plain sequential read of a file, to compare scan speed against.
+    :param path: file to read.
+    :param chunkSize: number of bytes to read at once.
+    :return: megabytes per second.
+    """
+    start = time.time()
+    byteCount = 0
+    with open(path, "rb") as readFile:
+        data = readFile.read(chunkSize)
+        while data:
+            byteCount += len(data)
+            data = readFile.read(chunkSize)
+    seconds = time.time() - start
+
+    return byteCount / (1024.0 * 1024.0) / seconds if seconds else 0.0
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Scan .obj files for ngons without Maya.")
+    parser.add_argument("paths", nargs="+", help=".obj files to scan.")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Bytes to handle at once.")
+    parser.add_argument("--read-speed", action="store_true",
+                        help="Also time a raw read of each file to compare against.")
+    args = parser.parse_args(args)
+
+    ngonCount = 0
+    for path in args.paths:
+        result = scanObj(path, args.chunk_size)
+        ngonCount += result.ngonCount
+
+        for group in result.groups.values():
+            print("%s:%s  faces: %d  ngons: %d  max valence: %d"
+                  % (path, group.name, group.faceCount, group.ngonCount, group.maxValence))
+        print("%s  %d faces in %.2fs (%.0f faces/s, %.1f MB/s)"
+              % (path, result.faceCount, result.seconds, result.facesPerSecond, result.megabytesPerSecond))
+
+        if args.read_speed:
+            print("%s  raw read: %.1f MB/s" % (path, measureReadSpeed(path, args.chunk_size)))
+
+    return 1 if ngonCount else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,545 @@
+import argparse
+import io
+import multiprocessing
+import os
+import re
+import sys
+import time
+
+import mappingTable
+import renameEngine
+
+'''
+Renames nodes in Maya ASCII (.ma) files without opening them in Maya.
+
+The same renames the Renamer does (search and replace, prefix, suffix and rename
+tables) are applied straight to the file text. Files are streamed a line at a
+time, and only the lines that name nodes are touched:
+    createNode <type> -n "name" -p "parent"
+    rename ["old"] "new"
+    connectAttr "node.attr" "node.attr"
+    parent "child" ... "parent"
+    select -ne "node"
+    relationship "link" "node" ...
+setAttr values, script nodes and everything else are written back unchanged.
+
+Every node created in the file is tracked under both its old and new names, so
+each reference can be rewritten in the same form it was written in (short name,
+partial path or full path) and then checked: the rewritten reference has to
+resolve to the same node, and to only that node, at that point in the file,
+the same way Maya resolves it when loading. New names that would clash with a
+sibling are caught the same way. A file with any problems isn't written.
+
+Nodes with namespaces (referenced nodes), default nodes (":time1") and shared
+nodes (createNode -s, like persp and lightLinker1) are never renamed.
+
+Run from the command line (python or mayapy) on files or directories, e.g.:
+    python maRenamer.py shots/ --search arm --replace leg --output renamed/
+    python maRenamer.py shots/ --table renames.csv --in-place --processes 8
+'''
+
+# Command -> {flag: number of values it takes}. Unknown flags are taken to have none.
+FLAGS = {
+    "createNode": {"-n": 1, "-name": 1, "-p": 1, "-parent": 1, "-s": 0, "-shared": 0, "-ss": 0, "-skipSelect": 0},
+    "rename": {"-uid": 1, "-uuid": 1, "-is": 0, "-ignoreShape": 0},
+    "connectAttr": {"-l": 1, "-lock": 1, "-na": 0, "-nextAvailable": 0, "-f": 0, "-force": 0},
+    "parent": {},
+    "select": {},
+    "relationship": {},
+}
+COMMANDS = tuple(command + " " for command in FLAGS)
+
+# A quoted string or a bare word.
+TOKEN = re.compile(r'"(?:[^"\\]|\\.)*"|[^\s;]+')
+
+
+# A rename rule made from the Renamer's operations, applied in order: rename table,
+# search and replace, prefix, suffix. Only nodes of the given types are renamed.
+# A class rather than a function so it can be sent to the worker processes.
+class RenameRule(object):
+
+    def __init__(self, search=None, replace="", regex=False, ignoreCase=False, prefix="", suffix="",
+                 table=None, types=None):
+        self.search = search
+        self.replace = replace
+        self.regex = regex
+        self.ignoreCase = ignoreCase
+        self.prefix = prefix
+        self.suffix = suffix
+        # {old name or long name: new name}
+        self.table = table or {}
+        self.types = set(types) if types else None
+
+    # Returns the new short name for a node.
+    def __call__(self, name, nodeType, longName):
+        if ":" in name or (self.types is not None and nodeType not in self.types):
+            return name
+
+        name = self.table.get(longName, self.table.get(name, name))
+        if self.search:
+            name = renameEngine.searchReplace([name], self.search, self.replace, self.regex, self.ignoreCase)[0]
+
+        return self.prefix + name + self.suffix
+
+
+# Reads a rename table (see mappingTable) into a dictionary for RenameRule.
+def readTable(path):
+    return dict((old, new) for _, old, new in mappingTable.readRows(path))
+
+
+# A node created in the file.
+class _Node(object):
+    __slots__ = ("oldName", "newName", "type", "parents", "shared")
+
+    def __init__(self, oldName, newName, nodeType, parents, shared=False):
+        self.oldName = oldName
+        self.newName = newName
+        self.type = nodeType
+        # Parent nodes, None for the world. More than one when instanced.
+        self.parents = parents
+        # Created with -shared: one of Maya's default nodes (persp, lightLinker1, ...), which other
+        # files refer to by name, so it's never renamed.
+        self.shared = shared
+
+    def name(self, new):
+        return self.newName if new else self.oldName
+
+    # Returns the first long name of the node.
+    def longName(self, new=False):
+        parent = self.parents[0] if self.parents else None
+        if parent is None:
+            return "|" + self.name(new)
+        return parent.longName(new) + "|" + self.name(new)
+
+
+# The nodes created so far in a file, looked up by their old or new short names.
+class _Scene(object):
+
+    def __init__(self):
+        self.byName = ({}, {})
+
+    def add(self, node):
+        self.byName[0].setdefault(node.oldName, []).append(node)
+        self.byName[1].setdefault(node.newName, []).append(node)
+
+    def remove(self, node):
+        self.byName[0][node.oldName].remove(node)
+        self.byName[1][node.newName].remove(node)
+
+    # Returns [(node, chain of nodes along the matching path)] for every node a
+    # reference (short name, partial or full path, no attribute) resolves to.
+    def resolve(self, reference, new=False):
+        absolute = reference.startswith("|")
+        parts = reference.lstrip("|").split("|")
+
+        matches = []
+        for node in self.byName[new].get(parts[-1], ()):
+            chain = self._match(node, parts, len(parts) - 1, new, absolute)
+            if chain is not None:
+                matches.append((node, chain))
+
+        return matches
+
+    def _match(self, node, parts, i, new, absolute):
+        if node.name(new) != parts[i]:
+            return None
+        if i == 0:
+            if absolute and None not in node.parents:
+                return None
+            return [node]
+
+        for parent in node.parents:
+            if parent is not None:
+                chain = self._match(parent, parts, i - 1, new, absolute)
+                if chain is not None:
+                    return chain + [node]
+
+        return None
+
+    # Returns True if another node under one of the node's parents already has the name.
+    def clashes(self, node, new):
+        for other in self.byName[new].get(node.name(new), ()):
+            if other is not node and set(other.parents) & set(node.parents):
+                return True
+        return False
+
+
+# Renames the nodes of one .ma file.
+class MaRenamer(object):
+
+    def __init__(self, rule):
+        self.rule = rule
+        self.scene = _Scene()
+        # The node commands like rename act on: the last one created or selected.
+        self.current = None
+        self.lineNumber = 0
+
+        self.nodeCount = 0
+        self.renamed = 0
+        self.references = 0
+        self.rewritten = 0
+        # (line number, message)
+        self.errors = []
+
+    def error(self, message):
+        self.errors.append((self.lineNumber, message))
+
+    # Rewrites the lines of a file, yielding the new lines.
+    def rewrite(self, lines):
+        inStatement = False
+        for line in lines:
+            self.lineNumber += 1
+
+            # Only look at lines starting a statement, not ones continuing a setAttr.
+            if not inStatement:
+                stripped = line.lstrip()
+                if stripped.startswith(COMMANDS):
+                    line = self.rewriteStatement(line, stripped.split(None, 1)[0])
+
+            inStatement = not line.rstrip().endswith(";")
+            yield line
+
+    # Rewrites one statement line.
+    def rewriteStatement(self, line, command):
+        flags = FLAGS[command]
+        tokens = [(match.start(), match.end(), match.group()) for match in TOKEN.finditer(line)][1:]
+
+        # Split into flag values and positional arguments.
+        values = {}
+        positional = []
+        i = 0
+        while i < len(tokens):
+            token = tokens[i][2]
+            if token.startswith("-"):
+                count = flags.get(token, 0)
+                if count:
+                    values[token] = i + 1
+                i += 1 + count
+            else:
+                positional.append(i)
+                i += 1
+
+        # {token index: new text}
+        edits = getattr(self, command)(tokens, values, positional)
+        if not edits:
+            return line
+
+        for index in sorted(edits, reverse=True):
+            start, end, _ = tokens[index]
+            line = line[:start] + '"%s"' % edits[index] + line[end:]
+
+        return line
+
+    # Returns the text of a token without its quotes.
+    @staticmethod
+    def text(token):
+        if token.startswith('"'):
+            return token[1:-1]
+        return token
+
+    # Rewrites a node reference, optionally with attributes ("|grp|node.attr[0]").
+    # Returns the new reference, or None if it doesn't need changing.
+    def reference(self, token):
+        reference = self.text(token)
+        nodePath, dot, attribute = reference.partition(".")
+        if not nodePath or ":" in nodePath:
+            return None
+
+        self.references += 1
+        matches = self.scene.resolve(nodePath)
+        if len(matches) != 1:
+            # Not a node from this file (or Maya couldn't resolve it either), leave
+            # it alone as long as the new names don't make it resolve to one.
+            if not matches and self.scene.resolve(nodePath, new=True):
+                self.error("%s would now resolve to a renamed node" % nodePath)
+            return None
+
+        node, chain = matches[0]
+        newPath = ("|" if nodePath.startswith("|") else "") + "|".join(link.newName for link in chain)
+
+        resolved = self.scene.resolve(newPath, new=True)
+        if len(resolved) != 1 or resolved[0][0] is not node:
+            self.error("%s -> %s doesn't resolve to a single node" % (nodePath, newPath))
+            return None
+
+        if newPath == nodePath:
+            return None
+
+        self.rewritten += 1
+        return newPath + dot + attribute
+
+    # Returns the node a reference resolves to, or None.
+    def node(self, token):
+        matches = self.scene.resolve(self.text(token).partition(".")[0])
+        return matches[0][0] if len(matches) == 1 else None
+
+    # Works out the new name for a node and checks it doesn't clash.
+    def renameNode(self, node):
+        node.newName = self.rule(node.oldName, node.type, node.longName())
+        if node.newName == node.oldName:
+            return
+
+        if not renameEngine.isValidName(node.newName):
+            self.error("%s -> %s is not a valid name" % (node.oldName, node.newName))
+        elif self.scene.clashes(node, True) and not self.scene.clashes(node, False):
+            self.error("%s -> %s clashes with another node" % (node.oldName, node.newName))
+        self.renamed += 1
+
+    # COMMANDS
+
+    def createNode(self, tokens, values, positional):
+        if "-n" not in values and "-name" not in values:
+            return None
+        nameIndex = values.get("-n", values.get("-name"))
+        parentIndex = values.get("-p", values.get("-parent"))
+        nodeType = self.text(tokens[positional[0]][2]) if positional else ""
+
+        edits = {}
+        parents = [None]
+        if parentIndex is not None:
+            parentToken = tokens[parentIndex][2]
+            parent = self.node(parentToken)
+            # Parents that aren't from this file can't be followed.
+            parents = [parent] if parent is not None else []
+            newParent = self.reference(parentToken)
+            if newParent is not None:
+                edits[parentIndex] = newParent
+
+        oldName = self.text(tokens[nameIndex][2])
+        shared = any(token in ("-s", "-shared") for _, _, token in tokens)
+        node = _Node(oldName, oldName, nodeType, parents, shared)
+        self.nodeCount += 1
+        if ":" not in oldName and not shared:
+            self.renameNode(node)
+        self.scene.add(node)
+        self.current = node
+
+        if node.newName != oldName:
+            edits[nameIndex] = node.newName
+
+        return edits
+
+    def rename(self, tokens, values, positional):
+        if not positional:
+            return None
+
+        edits = {}
+        if len(positional) > 1:
+            node = self.node(tokens[positional[0]][2])
+            newReference = self.reference(tokens[positional[0]][2])
+            if newReference is not None:
+                edits[positional[0]] = newReference
+        else:
+            node = self.current
+
+        nameIndex = positional[-1]
+        oldName = self.text(tokens[nameIndex][2])
+        if node is None or ":" in oldName:
+            return edits
+
+        self.scene.remove(node)
+        node.oldName = oldName
+        if node.shared:
+            node.newName = oldName
+        else:
+            self.renameNode(node)
+        self.scene.add(node)
+
+        if node.newName != oldName:
+            edits[nameIndex] = node.newName
+
+        return edits
+
+    def connectAttr(self, tokens, values, positional):
+        return self.rewriteReferences(tokens, positional)
+
+    def select(self, tokens, values, positional):
+        if positional:
+            self.current = self.node(tokens[positional[0]][2])
+        return self.rewriteReferences(tokens, positional)
+
+    def relationship(self, tokens, values, positional):
+        # The first argument is the type of relationship.
+        return self.rewriteReferences(tokens, positional[1:])
+
+    def parent(self, tokens, values, positional):
+        edits = self.rewriteReferences(tokens, positional)
+
+        # Keep track of the hierarchy so later paths still resolve.
+        words = set(token for _, _, token in tokens)
+        if words & set(("-w", "-world")):
+            parent, children = None, positional
+        elif len(positional) > 1:
+            parent, children = self.node(tokens[positional[-1]][2]), positional[:-1]
+            if parent is None:
+                return edits
+        else:
+            return edits
+
+        instancing = bool(words & set(("-add", "-a", "-addObject")))
+        removing = bool(words & set(("-rm", "-removeObject")))
+        for index in children:
+            child = self.node(tokens[index][2])
+            if child is None or removing:
+                continue
+            if instancing:
+                child.parents.append(parent)
+            else:
+                child.parents = [parent]
+
+        return edits
+
+    # Rewrites the references in the given positional arguments.
+    def rewriteReferences(self, tokens, positional):
+        edits = {}
+        for index in positional:
+            newReference = self.reference(tokens[index][2])
+            if newReference is not None:
+                edits[index] = newReference
+        return edits
+
+
+# Renames the nodes of a .ma file, writing the result to outputPath (which can be
+# the same file). Nothing is written if there are any errors, or with dryRun.
+# Top level function so it can be sent to a pool.
+# Returns a result dictionary.
+def renameFile(path, rule, outputPath=None, dryRun=False):
+    start = time.time()
+    outputPath = outputPath or path
+    renamer = MaRenamer(rule)
+    tempPath = outputPath + ".renaming"
+
+    # surrogateescape keeps any bytes that aren't utf-8 exactly as they were.
+    with io.open(path, "r", encoding="utf-8", errors="surrogateescape", newline="") as maFile:
+        if dryRun:
+            for _ in renamer.rewrite(maFile):
+                pass
+        else:
+            directory = os.path.dirname(outputPath)
+            if directory and not os.path.isdir(directory):
+                try:
+                    os.makedirs(directory)
+                except OSError:
+                    # Another worker made it first.
+                    if not os.path.isdir(directory):
+                        raise
+            with io.open(tempPath, "w", encoding="utf-8", errors="surrogateescape", newline="") as outFile:
+                outFile.writelines(renamer.rewrite(maFile))
+
+    written = not dryRun and not renamer.errors
+    if written:
+        os.replace(tempPath, outputPath)
+    elif os.path.exists(tempPath):
+        os.remove(tempPath)
+
+    return {"path": path,
+            "output": outputPath if written else None,
+            "nodes": renamer.nodeCount,
+            "renamed": renamer.renamed,
+            "references": renamer.references,
+            "rewritten": renamer.rewritten,
+            "errors": renamer.errors,
+            "lines": renamer.lineNumber,
+            "seconds": time.time() - start}
+
+
+def _renameFile(args):
+    return renameFile(*args)
+
+
+# Returns every .ma file in the given files and directories (recursively).
+def findFiles(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, fileNames in os.walk(path):
+                for fileName in sorted(fileNames):
+                    if fileName.lower().endswith(".ma"):
+                        files.append(os.path.join(root, fileName))
+        else:
+            files.append(path)
+
+    # The same file given twice would be written by two workers at once.
+    unique = []
+    seen = set()
+    for path in files:
+        key = os.path.normcase(os.path.abspath(path))
+        if key not in seen:
+            seen.add(key)
+            unique.append(path)
+
+    return unique
+
+
+# Renames every .ma file in paths with a process pool.
+# outputDirectory: where to write the renamed files (keeping the folder structure
+# below root), None to rename in place.
+# Returns a list of result dictionaries in the same order as the files.
+def renameFiles(paths, rule, outputDirectory=None, root=None, processes=None, dryRun=False):
+    files = findFiles(paths)
+    jobs = []
+    for path in files:
+        outputPath = None
+        if outputDirectory:
+            relative = os.path.relpath(path, root) if root else os.path.basename(path)
+            outputPath = os.path.join(outputDirectory, relative)
+        jobs.append((path, rule, outputPath, dryRun))
+
+    processes = processes or multiprocessing.cpu_count()
+    if processes == 1 or len(jobs) < 2:
+        return [_renameFile(job) for job in jobs]
+
+    pool = multiprocessing.Pool(min(processes, len(jobs)))
+    try:
+        return pool.map(_renameFile, jobs, 1)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Rename nodes in Maya ASCII files without opening them.")
+    parser.add_argument("paths", nargs="+", help=".ma files or directories of them.")
+    parser.add_argument("--search", help="Text to search for in node names.")
+    parser.add_argument("--replace", default="", help="Text to replace it with.")
+    parser.add_argument("--regex", action="store_true", help="Search is a regular expression.")
+    parser.add_argument("--ignore-case", action="store_true", help="Search ignoring upper/lower case.")
+    parser.add_argument("--prefix", default="", help="Prefix to add to node names.")
+    parser.add_argument("--suffix", default="", help="Suffix to add to node names.")
+    parser.add_argument("--table", help="Rename table (.csv, .json or .jsonl) of old and new names.")
+    parser.add_argument("--type", action="append", dest="types",
+                        help="Only rename nodes of this type (can be given more than once).")
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument("--output", help="Directory to write the renamed files to.")
+    output.add_argument("--in-place", action="store_true", help="Overwrite the files.")
+    output.add_argument("--dry-run", action="store_true", help="Only check the renames, write nothing.")
+    parser.add_argument("--processes", type=int, default=None, help="Number of worker processes.")
+    args = parser.parse_args(args)
+
+    if not (args.search or args.prefix or args.suffix or args.table):
+        parser.error("Nothing to do, give --search, --prefix, --suffix or --table.")
+
+    rule = RenameRule(args.search, args.replace, args.regex, args.ignore_case, args.prefix, args.suffix,
+                      readTable(args.table) if args.table else None, args.types)
+    root = args.paths[0] if len(args.paths) == 1 and os.path.isdir(args.paths[0]) else None
+
+    start = time.time()
+    results = renameFiles(args.paths, rule, args.output, root, args.processes, args.dry_run)
+    elapsed = time.time() - start
+
+    failed = [result for result in results if result["errors"]]
+    for result in failed:
+        print("%s: not written, %d problem(s):" % (result["path"], len(result["errors"])))
+        for lineNumber, message in result["errors"][:5]:
+            print("    line %d: %s" % (lineNumber, message))
+
+    lines = sum(result["lines"] for result in results)
+    print("%d file(s), %d node(s) renamed, %d reference(s) rewritten in %.2fs (%d lines/s), %d failed."
+          % (len(results), sum(result["renamed"] for result in results),
+             sum(result["rewritten"] for result in results), elapsed, lines / max(elapsed, 1e-6), len(failed)))
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
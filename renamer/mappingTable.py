@@ -0,0 +1,171 @@
+import csv
+import io
+import json
+import os
+
+'''
+Reads rename tables (old name -> new name) and matches them against the nodes
+in a scene, for batch renames handed over from other departments.
+
+Tables can be:
+    .csv    two columns, old name then new name. A header row like "old,new" is
+            skipped, as are blank lines and lines starting with #.
+    .jsonl  one ["old", "new"] or {"old": ..., "new": ...} per line.
+    .json   {"old": "new", ...} or a list of rows like the .jsonl ones.
+
+CSV and JSON lines files are read a row at a time, so big tables are never held
+in memory as text. Old names can be short names or long (|group|node) names.
+
+Matching looks every old name up in a dictionary of the scene's short and long
+names, so it costs the same however many rows the table has. Rows whose old name
+isn't in the scene, or is the short name of more than one node, are reported
+instead of guessed at. Collisions between new names are left to
+renameEngine.buildPlan.
+
+Nothing in here imports maya.
+'''
+
+FORMATS = (".csv", ".json", ".jsonl")
+
+
+# Reads a rename table, yielding (row number, old name, new name) for every row.
+def readRows(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError("Unknown rename table format: %s (use %s)" % (extension, ", ".join(FORMATS)))
+
+    if extension == ".csv":
+        return _readCsv(path)
+    if extension == ".jsonl":
+        return _readJsonLines(path)
+    return _readJson(path)
+
+
+def _readCsv(path):
+    with io.open(path, "r", encoding="utf-8-sig", newline="") as tableFile:
+        for rowNumber, row in enumerate(csv.reader(tableFile), 1):
+            # Skip blank lines, comments and the header.
+            if not row or not row[0].strip() or row[0].startswith("#"):
+                continue
+            if rowNumber == 1 and row[0].strip().lower() in ("old", "source", "from", "oldname", "old name"):
+                continue
+            if len(row) < 2:
+                raise ValueError("%s row %d: expected old and new name, got %r" % (path, rowNumber, row))
+
+            yield rowNumber, row[0].strip(), row[1].strip()
+
+
+def _readJsonLines(path):
+    with io.open(path, "r", encoding="utf-8") as tableFile:
+        for rowNumber, line in enumerate(tableFile, 1):
+            line = line.strip()
+            if not line:
+                continue
+            old, new = _pair(json.loads(line), path, rowNumber)
+            yield rowNumber, old, new
+
+
+def _readJson(path):
+    with io.open(path, "r", encoding="utf-8") as tableFile:
+        table = json.load(tableFile)
+
+    if isinstance(table, dict):
+        rows = enumerate(table.items(), 1)
+    else:
+        rows = enumerate(table, 1)
+
+    for rowNumber, row in rows:
+        old, new = _pair(row, path, rowNumber)
+        yield rowNumber, old, new
+
+
+# Returns (old, new) from a JSON row, either [old, new] or {"old": old, "new": new}.
+def _pair(row, path, rowNumber):
+    if isinstance(row, dict):
+        if "old" in row and "new" in row:
+            return row["old"], row["new"]
+    elif isinstance(row, (list, tuple)) and len(row) == 2:
+        return row[0], row[1]
+
+    raise ValueError("%s row %d: expected [old, new] or {\"old\": ..., \"new\": ...}, got %r" % (path, rowNumber, row))
+
+
+# The rows of a table matched against the scene.
+class TableMatch(object):
+
+    def __init__(self):
+        # (handle, longName) of every matched node, and its new name, in table order.
+        self.nodes = []
+        self.newNames = []
+        # (row number, old name) of rows whose old name isn't in the scene.
+        self.missing = []
+        # (row number, old name, number of nodes with that name).
+        self.ambiguous = []
+        # (row number, old name) of rows renaming a node an earlier row already renames.
+        self.duplicates = []
+        self.rows = 0
+
+    def __len__(self):
+        return len(self.nodes)
+
+    # Rows that didn't match exactly one node.
+    @property
+    def unmatched(self):
+        return len(self.missing) + len(self.ambiguous) + len(self.duplicates)
+
+    # Short description of the unmatched rows, for warnings.
+    def problems(self, limit=5):
+        lines = ["row %d: %s not found" % row for row in self.missing]
+        lines += ["row %d: %s matches %d nodes, use its long name" % row for row in self.ambiguous]
+        lines += ["row %d: %s is already renamed by an earlier row" % row for row in self.duplicates]
+
+        remaining = len(lines) - limit
+        lines = lines[:limit]
+        if remaining > 0:
+            lines.append("...and %d more." % remaining)
+
+        return "\n".join(lines)
+
+
+# Matches table rows against the scene.
+# rows: (row number, old name, new name), e.g. from readRows.
+# sceneNodes: (handle, longName) of every node in the scene that can be renamed.
+def matchTable(rows, sceneNodes):
+    # {long name: node} and {short name: [nodes]}, built in one pass.
+    byLongName = {}
+    byShortName = {}
+    for node in sceneNodes:
+        longName = node[1]
+        byLongName[longName] = node
+        short = longName.rpartition("|")[2]
+        found = byShortName.get(short)
+        if found is None:
+            byShortName[short] = [node]
+        else:
+            found.append(node)
+
+    match = TableMatch()
+    seen = set()
+    for rowNumber, old, new in rows:
+        match.rows += 1
+
+        node = byLongName.get(old)
+        if node is None:
+            found = byShortName.get(old)
+            if not found:
+                match.missing.append((rowNumber, old))
+                continue
+            if len(found) > 1:
+                match.ambiguous.append((rowNumber, old, len(found)))
+                continue
+            node = found[0]
+
+        if node[0] in seen:
+            match.duplicates.append((rowNumber, old))
+            continue
+        seen.add(node[0])
+
+        match.nodes.append(node)
+        match.newNames.append(new)
+
+    return match
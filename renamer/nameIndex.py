@@ -0,0 +1,128 @@
+'''
+Substring index of node names, so "which nodes have X in their name" can be
+answered without looking at every name in the scene.
+
+Every name is broken into trigrams (3 letter pieces, lower case). A search
+looks up the trigrams of the search text, intersects their (small) sets of
+nodes, and only checks the names left over. Searches shorter than 3 letters
+fall back to checking every name.
+
+Nodes are added, renamed and removed one at a time, so the index can be kept
+up to date from scene callbacks instead of being rebuilt (see
+renamer.SceneNameIndex).
+
+Nothing in here imports maya.
+'''
+
+GRAM = 3
+
+
+# Returns the set of trigrams in a name.
+def grams(name):
+    name = name.lower()
+    return set(name[i:i + GRAM] for i in range(len(name) - GRAM + 1))
+
+
+# Trigram index of names, keyed by a handle per node (e.g. its UUID).
+class NameIndex(object):
+
+    def __init__(self, items=()):
+        # {handle: name}
+        self.names = {}
+        # {trigram: set of handles}
+        self.grams = {}
+
+        # Bulk build, quicker than adding names one at a time.
+        index = self.grams
+        for handle, name in items:
+            self.names[handle] = name
+            lower = name.lower()
+            for i in range(len(lower) - GRAM + 1):
+                gram = lower[i:i + GRAM]
+                handles = index.get(gram)
+                if handles is None:
+                    index[gram] = set([handle])
+                else:
+                    handles.add(handle)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, handle):
+        return handle in self.names
+
+    # Adds a node to the index, replacing its old name if it's already in it.
+    def add(self, handle, name):
+        if handle in self.names:
+            self.remove(handle)
+
+        self.names[handle] = name
+        index = self.grams
+        for gram in grams(name):
+            handles = index.get(gram)
+            if handles is None:
+                index[gram] = set([handle])
+            else:
+                handles.add(handle)
+
+    # Removes a node from the index.
+    def remove(self, handle):
+        name = self.names.pop(handle, None)
+        if name is None:
+            return
+
+        for gram in grams(name):
+            handles = self.grams.get(gram)
+            if handles is not None:
+                handles.discard(handle)
+                if not handles:
+                    del self.grams[gram]
+
+    # Renames a node in the index, only touching the trigrams that changed.
+    def rename(self, handle, newName):
+        oldName = self.names.get(handle)
+        if oldName is None:
+            self.add(handle, newName)
+            return
+
+        oldGrams = grams(oldName)
+        newGrams = grams(newName)
+        for gram in oldGrams - newGrams:
+            handles = self.grams[gram]
+            handles.discard(handle)
+            if not handles:
+                del self.grams[gram]
+        for gram in newGrams - oldGrams:
+            self.grams.setdefault(gram, set()).add(handle)
+
+        self.names[handle] = newName
+
+    # Returns the handles of every node with text in its name.
+    def search(self, text, ignoreCase=False):
+        if not text:
+            return []
+
+        needle = text.lower() if ignoreCase else text
+        if len(text) < GRAM:
+            candidates = self.names
+        else:
+            # Intersect the smallest sets first, a missing trigram means no match.
+            sets = []
+            for gram in grams(text):
+                handles = self.grams.get(gram)
+                if not handles:
+                    return []
+                sets.append(handles)
+            sets.sort(key=len)
+            candidates = sets[0].intersection(*sets[1:])
+
+        names = self.names
+        if ignoreCase:
+            return [handle for handle in candidates if needle in names[handle].lower()]
+        return [handle for handle in candidates if needle in names[handle]]
+
+    # Returns the handles of every node whose name the compiled regular expression matches.
+    # Regular expressions can't use the trigrams, so every name is checked.
+    def searchPattern(self, pattern):
+        search = pattern.search
+        return [handle for handle, name in self.names.items() if search(name)]
@@ -0,0 +1,328 @@
+import re
+import string
+
+'''
+Plan-then-commit rename engine used by the Renamer.
+
+A rename is worked out in plain Python first: every node gets its new short
+name, no-ops are dropped, and invalid names and name collisions are found
+before anything in the scene is touched. Only a plan without problems gets
+applied (see renamer.applyPlan).
+
+Nodes are given as (handle, longName) pairs, where the handle is a stable id
+such as the node's UUID. Renames are ordered deepest first, so renaming a node
+never changes the long names of the nodes still waiting to be renamed.
+
+The name functions further down (searchReplace, addPrefix, addSuffix, number,
+applyTemplate and changeCase) are the headless rename API the Renamer buttons
+sit on. They all take a list of short names and return the new names in the
+same order, e.g.
+
+    searchReplace(names, r"^(L|R)_(\\w+)_geo$", r"\\2_\\1_geo", regex=True)
+    applyTemplate(names, "{side}_{base!c}_{index:03d}_{type}", start=1)
+    changeCase(names, "snake")
+
+Regular expressions are compiled once and cached, so calling them over and
+over on big batches doesn't pay for compiling every time.
+
+Nothing in here imports maya, so it works (and can be tested) on plain lists
+of names.
+'''
+
+# A valid node name, optionally inside namespaces.
+VALID_NAME = re.compile(r"^(?:[A-Za-z_][A-Za-z0-9_]*:)*[A-Za-z_][A-Za-z0-9_]*$")
+
+
+# Holds the renames worked out for a set of nodes, and anything wrong with them.
+class RenamePlan(object):
+
+    def __init__(self):
+        # (handle, longName, newName) in the order to rename them.
+        self.renames = []
+        # Handles of nodes whose current name another node in the plan wants,
+        # these get moved out of the way to a temporary name first.
+        self.staged = set()
+        # Long names of nodes whose name wouldn't change.
+        self.noOps = []
+        # (longName, newName, reason) for every rename that can't be done.
+        self.collisions = []
+        self.invalid = []
+
+    def __len__(self):
+        return len(self.renames)
+
+    # True if the plan can be applied as it is.
+    @property
+    def ok(self):
+        return not self.collisions and not self.invalid
+
+    # Short description of any problems, for warnings.
+    def problems(self, limit=5):
+        lines = []
+        for longName, newName, reason in (self.invalid + self.collisions)[:limit]:
+            lines.append("%s -> %s: %s" % (shortName(longName), newName, reason))
+
+        remaining = len(self.invalid) + len(self.collisions) - limit
+        if remaining > 0:
+            lines.append("...and %d more." % remaining)
+
+        return "\n".join(lines)
+
+
+# Splits a long name into its parent path and short name.
+# DG nodes (no '|') have no parent, so their names have to be unique in the scene.
+def splitPath(longName):
+    if "|" not in longName:
+        return None, longName
+
+    parent, _, short = longName.rpartition("|")
+    return parent, short
+
+
+# Returns the short name of a long name.
+def shortName(longName):
+    return longName.rpartition("|")[2]
+
+
+# Returns True if name can be used as a node name.
+def isValidName(name):
+    return bool(VALID_NAME.match(name))
+
+
+# Returns the long names in byParent ({parent: longName}) that a node under
+# parent can't share its short name with. DG node names have to be unique
+# against every node, DAG node names only against their siblings and DG nodes.
+def _clashes(byParent, parent):
+    if parent is None:
+        return list(byParent.values())
+    return [byParent[key] for key in (parent, None) if key in byParent]
+
+
+# Works out the rename plan for a list of nodes.
+# nodes: list of (handle, longName) for the nodes to rename.
+# newNames: new short name of each node, in the same order.
+# sceneNames: long names of every node in the scene, to check against.
+def buildPlan(nodes, newNames, sceneNames=()):
+    plan = RenamePlan()
+
+    # Who currently holds each short name in the scene, as {name: {parent: longName}}.
+    holders = {}
+    for longName in sceneNames:
+        parent, name = splitPath(longName)
+        holders.setdefault(name, {})[parent] = longName
+
+    renames = []
+    seen = set()
+    for (handle, longName), newName in zip(nodes, newNames):
+        # Instanced nodes can show up under more than one path.
+        if handle in seen:
+            continue
+        seen.add(handle)
+
+        parent, oldName = splitPath(longName)
+        holders.setdefault(oldName, {}).setdefault(parent, longName)
+
+        if newName == oldName:
+            plan.noOps.append(longName)
+        elif not isValidName(newName):
+            plan.invalid.append((longName, newName, "not a valid name"))
+        else:
+            renames.append((handle, longName, newName))
+
+    renaming = dict((longName, handle) for handle, longName, _ in renames)
+    targets = {}
+    for handle, longName, newName in renames:
+        parent, _ = splitPath(longName)
+
+        wanted = _clashes(targets.get(newName, {}), parent)
+        if wanted:
+            plan.collisions.append((longName, newName, "also wanted by %s" % wanted[0]))
+            continue
+        targets.setdefault(newName, {})[parent] = longName
+
+        for holder in _clashes(holders.get(newName, {}), parent):
+            if holder == longName:
+                continue
+            if holder in renaming:
+                # The holder is being renamed too, move it aside before this rename.
+                plan.staged.add(renaming[holder])
+            else:
+                plan.collisions.append((longName, newName, "%s already exists" % holder))
+                break
+
+    # Deepest first, so parents are renamed after everything under them.
+    renames.sort(key=lambda rename: rename[1].count("|"), reverse=True)
+    plan.renames = renames
+
+    return plan
+
+
+# Works out the current long name of a node part way through applying a plan.
+# renamed: {original long name: current short name} of the nodes renamed so far.
+def currentPath(longName, renamed):
+    if "|" not in longName:
+        return renamed.get(longName, longName)
+
+    parts = longName.split("|")
+    path = ""
+    current = []
+    for part in parts[1:]:
+        path += "|" + part
+        current.append(renamed.get(path, part))
+
+    return "|" + "|".join(current)
+
+
+# NAME FUNCTIONS
+
+# Compiled regular expressions, keyed by (pattern, flags).
+_patternCache = {}
+
+# Default way of splitting a name into template tokens: optional side, base, optional type.
+# e.g. "L_arm_jnt" -> side "L", base "arm", type "jnt".
+NAME_TOKENS = r"^(?:(?P<side>[LRCM]|Lf|Rt|Ct|lf|rt|ct)_)?(?P<base>.+?)(?:_(?P<type>[A-Za-z]+))?$"
+
+CASES = ("upper", "lower", "capitalize", "camel", "pascal", "snake")
+
+
+# Returns a compiled regular expression, compiling it only the first time.
+def compilePattern(pattern, flags=0):
+    key = (pattern, flags)
+    compiled = _patternCache.get(key)
+    if compiled is None:
+        compiled = _patternCache[key] = re.compile(pattern, flags)
+
+    return compiled
+
+
+# Replaces search with replace in every name.
+# With regex=True, search is a regular expression and replace can use its groups (\1, \g<name>).
+def searchReplace(names, search, replace, regex=False, ignoreCase=False):
+    if not regex and not ignoreCase:
+        return [name.replace(search, replace) for name in names]
+
+    if not regex:
+        search = re.escape(search)
+        replace = replace.replace("\\", "\\\\")
+    pattern = compilePattern(search, re.IGNORECASE if ignoreCase else 0)
+    sub = pattern.sub
+
+    return [sub(replace, name) for name in names]
+
+
+def addPrefix(names, prefix):
+    return [prefix + name for name in names]
+
+
+def addSuffix(names, suffix):
+    return [name + suffix for name in names]
+
+
+# Renames every name to base followed by a number, counting up from start.
+# padding is how many 0's are added in front of the number (padding 2 -> base001).
+def number(names, base, start=1, padding=0):
+    if padding == 0:
+        return [base + str(start + i) for i in range(len(names))]
+
+    return [base + str(start + i).zfill(padding + 1) for i in range(len(names))]
+
+
+# Formatter adding case conversions to templates: {base!u} upper, {base!l} lower,
+# {base!c} capitalize.
+class _TemplateFormatter(string.Formatter):
+
+    def convert_field(self, value, conversion):
+        if conversion == "u":
+            return str(value).upper()
+        if conversion == "l":
+            return str(value).lower()
+        if conversion == "c":
+            value = str(value)
+            return value[:1].upper() + value[1:]
+
+        return string.Formatter.convert_field(self, value, conversion)
+
+
+_formatter = _TemplateFormatter()
+
+
+# Builds new names from a template of tokens, e.g. "{side}_{base}_{index:03d}_{type}".
+# Tokens are {name} (the old name), {index} (counting up from start) and the named
+# groups of tokenPattern ({side}, {base} and {type} by default). tokens adds fixed
+# values, and is also used for any token the name doesn't have.
+def applyTemplate(names, template, start=1, tokens=None, tokenPattern=NAME_TOKENS):
+    match = compilePattern(tokenPattern).match
+    tidy = compilePattern(r"_{2,}").sub
+    fixed = dict(tokens or {})
+    groups = list(compilePattern(tokenPattern).groupindex)
+
+    # Parse the template once rather than for every name. Plain templates can
+    # use str.format, only the case conversions need the custom formatter.
+    parsed = list(_formatter.parse(template))
+    custom = any(conversion in ("u", "l", "c") for _, _, _, conversion in parsed)
+
+    newNames = []
+    for index, name in enumerate(names, start):
+        values = dict(fixed)
+        found = match(name)
+        for key in groups:
+            value = found.group(key) if found else None
+            if value is not None or key not in values:
+                values[key] = value or ""
+        values["name"] = name
+        values["index"] = index
+
+        if custom:
+            newName = _formatter.vformat(template, (), values)
+        else:
+            newName = template.format(**values)
+        # Empty tokens shouldn't leave doubled or trailing underscores behind.
+        newNames.append(tidy("_", newName).strip("_"))
+
+    return newNames
+
+
+# Splits a name into its words, e.g. "leftArm_IKCtrl" -> ["left", "Arm", "IK", "Ctrl"].
+def _words(name):
+    return compilePattern(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+").findall(name)
+
+
+# Splits a name into its namespaces and any '|' path, and the bare node name after them.
+# e.g. "|grp|ns:leftArm" -> ("|grp|ns:", "leftArm")
+def _splitLeaf(name):
+    cut = max(name.rfind(":"), name.rfind("|")) + 1
+    return name[:cut], name[cut:]
+
+
+# Changes the case of a bare node name, case is one of CASES.
+def _leafCase(leaf, case):
+    if case == "upper":
+        return leaf.upper()
+    if case == "lower":
+        return leaf.lower()
+    if case == "capitalize":
+        return leaf[:1].upper() + leaf[1:]
+
+    words = _words(leaf)
+    if not words:
+        return leaf
+    if case == "snake":
+        return "_".join(word.lower() for word in words)
+    if case == "camel":
+        return words[0].lower() + "".join(word.capitalize() for word in words[1:])
+
+    return "".join(word.capitalize() for word in words)
+
+
+# Changes the case of every name, case is one of CASES.
+# Only the node name itself changes, namespaces and parent paths are kept as they are.
+def changeCase(names, case):
+    if case not in CASES:
+        raise ValueError("Unknown case: %s" % case)
+
+    newNames = []
+    for name in names:
+        prefix, leaf = _splitLeaf(name)
+        newNames.append(prefix + _leafCase(leaf, case))
+
+    return newNames
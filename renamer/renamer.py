@@ -1,10 +1,255 @@
+import re
+import time
+
 from maya import cmds
+import maya.api.OpenMaya as om
+
+import mappingTable
+import nameAllocator
+import nameIndex
+import renameEngine
+
+
+# Returns (uuid, longName) for every selected node, read through the API so the
+# uuids and names are guaranteed to line up.
+def selectedNodes():
+    selection = om.MGlobal.getActiveSelectionList()
+    nodes = []
+
+    for i in range(selection.length()):
+        node = selection.getDependNode(i)
+        if node.hasFn(om.MFn.kDagNode):
+            longName = selection.getDagPath(i).fullPathName()
+        else:
+            longName = om.MFnDependencyNode(node).name()
+        nodes.append((om.MFnDependencyNode(node).uuid().asString(), longName))
+
+    return nodes
+
+
+# Applies a rename plan from renameEngine.buildPlan in one undo chunk.
+# Returns the new long names of the renamed nodes.
+def applyPlan(plan):
+    # {original long name: current short name} of everything renamed so far.
+    renamed = {}
+    newNames = []
+
+    cmds.undoInfo(openChunk=True, chunkName="Renamer")
+    try:
+        # Move nodes whose name is wanted by another node out of the way first.
+        for index, (handle, longName, newName) in enumerate(plan.renames):
+            if handle in plan.staged:
+                tempName = cmds.rename(renameEngine.currentPath(longName, renamed), "renamerTemp%d_" % index)
+                renamed[longName] = tempName.rpartition("|")[2]
+
+        # Deepest first, so the long names of the nodes left stay valid.
+        for handle, longName, newName in plan.renames:
+            result = cmds.rename(renameEngine.currentPath(longName, renamed), newName)
+            renamed[longName] = result.rpartition("|")[2]
+            newNames.append(renameEngine.currentPath(longName, renamed))
+    finally:
+        cmds.undoInfo(closeChunk=True)
+
+    return newNames
+
+
+# Returns (uuid, longName) for each uuid that still exists.
+def nodesFromUuids(uuids):
+    nodes = []
+    for uuid in uuids:
+        selList = om.MSelectionList()
+        try:
+            selList.add(om.MUuid(uuid))
+        except (RuntimeError, ValueError):
+            continue
+
+        node = selList.getDependNode(0)
+        if node.hasFn(om.MFn.kDagNode):
+            longName = om.MDagPath.getAPathTo(node).fullPathName()
+        else:
+            longName = om.MFnDependencyNode(node).name()
+        nodes.append((uuid, longName))
+
+    return nodes
+
+
+# Returns (uuid, longName) of every node in the scene that can be renamed.
+def sceneNodes():
+    nodes = []
+    nodeIt = om.MItDependencyNodes()
+    while not nodeIt.isDone():
+        node = nodeIt.thisNode()
+        nodeFn = om.MFnDependencyNode(node)
+        if not nodeFn.isDefaultNode and not nodeFn.isFromReferencedFile:
+            if node.hasFn(om.MFn.kDagNode):
+                longName = om.MDagPath.getAPathTo(node).fullPathName()
+            else:
+                longName = nodeFn.name()
+            nodes.append((nodeFn.uuid().asString(), longName))
+        nodeIt.next()
+
+    return nodes
+
+
+# Renames nodes from a rename table (see mappingTable) in one undo chunk.
+# Every row is checked before anything is renamed: if any new names collide or aren't
+# valid nothing is renamed. Rows that don't match a node are reported, and with
+# strict=True also stop the rename.
+# Returns the new long names of the renamed nodes.
+def renameFromTable(path, strict=False):
+    start = time.time()
+    match = mappingTable.matchTable(mappingTable.readRows(path), sceneNodes())
+
+    if match.unmatched:
+        cmds.warning("%d of %d row(s) in %s didn't match a node:\n%s"
+                     % (match.unmatched, match.rows, path, match.problems()))
+        if strict:
+            return []
+
+    plan = renameEngine.buildPlan(match.nodes, match.newNames, cmds.ls(long=True))
+    if not plan.ok:
+        cmds.warning("Nothing renamed, %d name(s) can't be used:\n%s"
+                     % (len(plan.invalid) + len(plan.collisions), plan.problems()))
+        return []
+
+    cmds.refresh(suspend=True)
+    try:
+        renamed = applyPlan(plan)
+    finally:
+        cmds.refresh(suspend=False)
+
+    elapsed = time.time() - start
+    print("Renamed %d object(s) from %d row(s) in %.2fs (%d rows/s, %d unchanged, %d unmatched)."
+          % (len(renamed), match.rows, elapsed, match.rows / max(elapsed, 1e-6), len(plan.noOps), match.unmatched))
+
+    return renamed
+
+
+# Keeps a nameIndex.NameIndex of every node in the scene that can be renamed, up to
+# date through node added/removed/renamed callbacks, so searching the whole scene
+# doesn't have to list and check every node each time.
+class SceneNameIndex(object):
+
+    def __init__(self):
+        self.index = nameIndex.NameIndex()
+        self.callbacks = []
+        self.paused = False
+        # How many references are being loaded right now.
+        self.loadingReferences = 0
+
+    # Builds the index from one pass over the scene's nodes and starts listening for changes.
+    def build(self):
+        start = time.time()
+        items = []
+        nodeIt = om.MItDependencyNodes()
+        while not nodeIt.isDone():
+            nodeFn = om.MFnDependencyNode(nodeIt.thisNode())
+            if self.isRenamable(nodeFn):
+                items.append((nodeFn.uuid().asString(), nodeFn.name()))
+            nodeIt.next()
+
+        self.index = nameIndex.NameIndex(items)
+        self.paused = False
+        self.loadingReferences = 0
+        if not self.callbacks:
+            self.addCallbacks()
+
+        print("Indexed %d node names in %.2fs." % (len(self.index), time.time() - start))
+
+    # Default and referenced nodes can't be renamed, so there's no point finding them.
+    def isRenamable(self, nodeFn):
+        return not nodeFn.isDefaultNode and not nodeFn.isFromReferencedFile
+
+    def addCallbacks(self):
+        self.callbacks = [
+            om.MDGMessage.addNodeAddedCallback(self.nodeAdded, "dependNode"),
+            om.MDGMessage.addNodeRemovedCallback(self.nodeRemoved, "dependNode"),
+            # A null MObject listens to name changes on every node.
+            om.MNodeMessage.addNameChangedCallback(om.MObject(), self.nameChanged),
+            om.MSceneMessage.addCallback(om.MSceneMessage.kBeforeOpen, self.pause),
+            om.MSceneMessage.addCallback(om.MSceneMessage.kBeforeNew, self.pause),
+            om.MSceneMessage.addCallback(om.MSceneMessage.kAfterOpen, self.rebuild),
+            om.MSceneMessage.addCallback(om.MSceneMessage.kAfterNew, self.rebuild),
+            om.MSceneMessage.addCallback(om.MSceneMessage.kBeforeLoadReference, self.referenceStarted),
+            om.MSceneMessage.addCallback(om.MSceneMessage.kBeforeCreateReference, self.referenceStarted),
+            om.MSceneMessage.addCallback(om.MSceneMessage.kAfterLoadReference, self.referenceFinished),
+            om.MSceneMessage.addCallback(om.MSceneMessage.kAfterCreateReference, self.referenceFinished),
+        ]
+
+    # Stops listening for changes.
+    def close(self):
+        if self.callbacks:
+            om.MMessage.removeCallbacks(self.callbacks)
+        self.callbacks = []
+
+    # Opening or clearing a scene changes every node, so rebuild after instead.
+    def pause(self, *args):
+        self.paused = True
+
+    def rebuild(self, *args):
+        self.build()
+
+    # Nodes coming in with a reference can't be renamed, but aren't always flagged as
+    # referenced yet when they're added, so skip everything added while one loads.
+    def referenceStarted(self, *args):
+        self.loadingReferences += 1
+
+    def referenceFinished(self, *args):
+        self.loadingReferences = max(self.loadingReferences - 1, 0)
+
+    def nodeAdded(self, node, *args):
+        if self.paused or self.loadingReferences:
+            return
+        nodeFn = om.MFnDependencyNode(node)
+        if self.isRenamable(nodeFn):
+            self.index.add(nodeFn.uuid().asString(), nodeFn.name())
+
+    def nodeRemoved(self, node, *args):
+        if self.paused:
+            return
+        self.index.remove(om.MFnDependencyNode(node).uuid().asString())
+
+    def nameChanged(self, node, prevName, *args):
+        if self.paused or self.loadingReferences or node.isNull():
+            return
+        nodeFn = om.MFnDependencyNode(node)
+        uuid = nodeFn.uuid().asString()
+        if uuid in self.index:
+            self.index.rename(uuid, nodeFn.name())
+        elif self.isRenamable(nodeFn):
+            self.index.add(uuid, nodeFn.name())
+
+    # Returns (uuid, longName) of every node with text in its name.
+    def search(self, text, ignoreCase=False):
+        return nodesFromUuids(self.index.search(text, ignoreCase))
+
+    # Returns (uuid, longName) of every node whose name matches a regular expression.
+    def searchPattern(self, pattern, ignoreCase=False):
+        compiled = renameEngine.compilePattern(pattern, re.IGNORECASE if ignoreCase else 0)
+        return nodesFromUuids(self.index.searchPattern(compiled))
+
+
+# reload() keeps the module's globals, so stop the callbacks of an index built before it
+# or they'd keep firing alongside the new one's.
+if globals().get("_sceneIndex") is not None:
+    _sceneIndex.close()
+_sceneIndex = None
+
+
+# Returns the scene name index, building it the first time it's asked for.
+def sceneIndex():
+    global _sceneIndex
+    if _sceneIndex is None:
+        _sceneIndex = SceneNameIndex()
+        _sceneIndex.build()
+
+    return _sceneIndex
 
 
 # A class that holds all the UI details for the Renamer window and its functionality.
 class RenamerWindow(object):
     windowName = "Renamer"
-    height = 370
+    height = 555
     width = 310
 
     # UI
@@ -32,6 +277,11 @@ class RenamerWindow(object):
         cmds.textField(self.startField, edit=True, text='1')
         cmds.textField(self.paddingField, edit=True, text='0')
 
+        cmds.textField(self.templateField, edit=True, text='')
+        cmds.checkBox(self.regexCheckBox, edit=True, value=False)
+        cmds.checkBox(self.ignoreCaseCheckBox, edit=True, value=False)
+        cmds.checkBox(self.sceneCheckBox, edit=True, value=False)
+
     # Close the Renamer window.
     def close(self, *args) :
         cmds.deleteUI(self.windowName)
@@ -59,6 +309,16 @@ class RenamerWindow(object):
 
         cmds.setParent('..')
 
+        cmds.rowLayout(numberOfColumns=4)
+        cmds.text(label="", w=textWidth)
+        self.regexCheckBox = cmds.checkBox(label="Regex", ann="Search is a regular expression, Replace can use its "
+                                                             "groups (\\1, \\g<name>)")
+        self.ignoreCaseCheckBox = cmds.checkBox(label="Ignore case", ann="Search ignoring upper/lower case")
+        self.sceneCheckBox = cmds.checkBox(label="Whole scene", ann="Search every object in the scene instead of "
+                                                                   "the selection")
+
+        cmds.setParent('..')
+
         cmds.separator(h=5)
         cmds.button("Search and Replace", w=buttonWidth, align='centre', command=self.searchAndReplace,
                     ann="Search for occurrences of 'Search' and replace it with 'Rename'")
@@ -114,6 +374,38 @@ class RenamerWindow(object):
                     ann="Rename and number objects with defined number padding")
         cmds.separator(h=20, style='in')
 
+        # Template.
+        cmds.rowLayout(numberOfColumns=2)
+        cmds.text(label="Template:", align='right', w=textWidth)
+        self.templateField = cmds.textField(w=fieldWidth, ann="Tokens: {name} {side} {base} {type} {index}, "
+                                                             "e.g. {side}_{base}_{index:03d}_{type}. Add !u, !l or "
+                                                             "!c for upper, lower or capitalized. {index} counts "
+                                                             "from Start #.")
+
+        cmds.setParent('..')
+
+        cmds.separator(h=5)
+        cmds.button("Apply Template", w=buttonWidth, align='center', command=self.applyTemplate,
+                    ann="Rename objects from the template")
+        cmds.separator(h=20, style='in')
+
+        # Case.
+        cmds.rowLayout(numberOfColumns=2)
+        self.caseMenu = cmds.optionMenu(label="Case:", w=buttonWidth / 2.01)
+        for case in renameEngine.CASES:
+            cmds.menuItem(label=case)
+        cmds.button("Change Case", w=buttonWidth / 2.01, align='center', command=self.changeCase,
+                    ann="Change the case of the selected object(s) names")
+
+        cmds.setParent('..')
+
+        cmds.separator(h=20, style='in')
+
+        # Rename table.
+        cmds.button("Rename From Table...", w=buttonWidth, align='center', command=self.renameFromTable,
+                    ann="Rename objects in the scene from a CSV or JSON table of old and new names")
+        cmds.separator(h=20, style='in')
+
         cmds.setParent('..')
 
 
@@ -123,33 +415,65 @@ class RenamerWindow(object):
 
     # RENAMER PROCS
 
+    # Plans the renames of nodes to newNames, and applies them if nothing collides.
+    def renameNodes(self, nodes, newNames):
+        start = time.time()
+        plan = renameEngine.buildPlan(nodes, newNames, cmds.ls(long=True))
+
+        if not plan.ok:
+            cmds.warning("Nothing renamed, %d name(s) can't be used:\n%s"
+                         % (len(plan.invalid) + len(plan.collisions), plan.problems()))
+            return []
+
+        renamed = applyPlan(plan)
+        print("Renamed %d object(s) in %.2fs (%d unchanged)." % (len(renamed), time.time() - start, len(plan.noOps)))
+
+        return renamed
+
     # Searches through selected object(s) and replaces occurrences of 'Search' with 'Replace'.
     def searchAndReplace(self, *args):
-        objects = cmds.ls(selection=True, long=True)
         # Search and Replace queries.
         search = cmds.textField(self.searchField, q=True, text=True)
         replace = cmds.textField(self.replaceField, q=True, text=True)
-
-        if not objects:
-            cmds.warning("You need to select at least one object to search through.")
-            return
+        regex = cmds.checkBox(self.regexCheckBox, q=True, value=True)
+        ignoreCase = cmds.checkBox(self.ignoreCaseCheckBox, q=True, value=True)
+        wholeScene = cmds.checkBox(self.sceneCheckBox, q=True, value=True)
 
         if not search or not replace:
             cmds.warning("You need to enter something in the Search and Replace fields.")
             return
 
-        for curObj in objects:
-            oldName = curObj.split("|")[-1]
-            newName = oldName.replace(search, replace)
+        try:
+            # Search the whole scene through the name index, or just the selection.
+            if not wholeScene:
+                objects = selectedNodes()
+            elif regex:
+                objects = sceneIndex().searchPattern(search, ignoreCase)
+            else:
+                objects = sceneIndex().search(search, ignoreCase)
+        except re.error as e:
+            cmds.warning("Invalid regular expression: %s" % e)
+            return
 
-            cmds.rename(oldName, newName)
+        if not objects:
+            if wholeScene:
+                cmds.warning("No objects in the scene have '%s' in their name." % search)
+            else:
+                cmds.warning("You need to select at least one object to search through.")
+            return
 
+        try:
+            newNames = renameEngine.searchReplace(self.shortNames(objects), search, replace, regex, ignoreCase)
+        except re.error as e:
+            cmds.warning("Invalid regular expression: %s" % e)
+            return
 
+        self.renameNodes(objects, newNames)
 
     # Add prefix to a list of objects.
     def addPrefix(self, *args):
         prefix = cmds.textField(self.prefixField, q=True, text=True)
-        objects = cmds.ls(selection=True, long=True)
+        objects = selectedNodes()
 
         if not objects:
             cmds.warning("You need to select at least one object to add a prefix to.")
@@ -159,21 +483,12 @@ class RenamerWindow(object):
             cmds.warning("You need to enter a prefix to add to selection.")
             return
 
-        for i in range(len(objects)):
-            # Get the name of the current object in the list.
-            oldName = objects[i].split("|")[-1]
-            newName = ""
-
-            if prefix:
-                newName = "%s%s" % (prefix, oldName)
-
-            cmds.rename(oldName, newName)
-
+        self.renameNodes(objects, renameEngine.addPrefix(self.shortNames(objects), prefix))
 
     # Add suffix to a list of objects.
     def addSuffix(self, *args):
         suffix = cmds.textField(self.suffixField, q=True, text=True)
-        objects = cmds.ls(selection=True, long=True)
+        objects = selectedNodes()
 
         if not objects:
             cmds.warning("You need to select at least one object to add a suffix to.")
@@ -183,27 +498,24 @@ class RenamerWindow(object):
             cmds.warning("You need to enter a suffix to add to selection.")
             return
 
-        for i in range(len(objects)):
-            # Get the name of the current object in the list.
-            oldName = objects[i].split("|")[-1]
-            newName = ""
-
-            if suffix:
-                newName = "%s%s" % (oldName, suffix)
-
-            cmds.rename(oldName, newName)
+        self.renameNodes(objects, renameEngine.addSuffix(self.shortNames(objects), suffix))
 
+    # Gets the starting number, or None (with a warning) if it isn't a number.
+    def getStart(self):
+        try:
+            return int(cmds.textField(self.startField, q=True, text=True))
+        except ValueError:
+            cmds.warning("You need to enter a valid starting number before renaming and numbering.")
+            return None
 
     # Renames and numbers objects with chosen padding to the number.
     def renameAndNumber(self, *args):
-        objects = cmds.ls(selection=True, long=True)
+        objects = selectedNodes()
         rename = cmds.textField(self.renameField, q=True, text=True)
 
         # Error Checking.
-        try:
-            start = int(cmds.textField(self.startField, q=True, text=True))
-        except ValueError:
-            cmds.warning("You need to enter a valid starting number before renaming and numbering.")
+        start = self.getStart()
+        if start is None:
             return
 
         try:
@@ -220,25 +532,63 @@ class RenamerWindow(object):
             cmds.warning("You need to enter a name to rename the object(s) to.")
             return
 
-        for i in range(len(objects)):
-            oldName = objects[i].split("|")[-1]
-            if padding == 0:
-                newName = rename + str(start)
-            else:
-                newName = rename + (str(start).zfill(padding+1))
-
-            cmds.rename(oldName, newName)
-            start += 1
+        # Skip numbers other objects already use. The selected objects' own names
+        # are freed first, as they're about to be given up.
+        allocator = nameAllocator.NameAllocator(cmds.ls())
+        for _, longName in objects:
+            allocator.remove(longName)
+        newNames = allocator.reserve(rename, len(objects), start, padding + 1)
 
+        self.renameNodes(objects, newNames)
 
+    # Renames objects from the template of tokens.
+    def applyTemplate(self, *args):
+        objects = selectedNodes()
+        template = cmds.textField(self.templateField, q=True, text=True)
 
+        start = self.getStart()
+        if start is None:
+            return
 
+        if not objects:
+            cmds.warning("You need to select at least one object to rename.")
+            return
 
+        if not template:
+            cmds.warning("You need to enter a template to rename the object(s) with.")
+            return
 
+        try:
+            newNames = renameEngine.applyTemplate(self.shortNames(objects), template, start)
+        except (KeyError, ValueError, IndexError) as e:
+            cmds.warning("Invalid template: %s" % e)
+            return
 
+        self.renameNodes(objects, newNames)
 
+    # Changes the case of the selected objects names.
+    def changeCase(self, *args):
+        objects = selectedNodes()
+        case = cmds.optionMenu(self.caseMenu, q=True, value=True)
 
+        if not objects:
+            cmds.warning("You need to select at least one object to change the case of.")
+            return
 
+        self.renameNodes(objects, renameEngine.changeCase(self.shortNames(objects), case))
 
+    # Picks a rename table and renames the scene's objects from it.
+    def renameFromTable(self, *args):
+        paths = cmds.fileDialog2(fileMode=1, caption="Rename From Table",
+                                 fileFilter="Rename tables (*.csv *.json *.jsonl)")
+        if not paths:
+            return
 
+        try:
+            renameFromTable(paths[0])
+        except (IOError, ValueError) as e:
+            cmds.warning("Couldn't read rename table: %s" % e)
 
+    # Returns the short names of (handle, longName) pairs.
+    def shortNames(self, objects):
+        return [renameEngine.shortName(longName) for _, longName in objects]
@@ -0,0 +1,336 @@
+import argparse
+import copy
+import fnmatch
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import OrderedDict
+
+from maya import cmds
+
+import nameAllocator
+import rigControlBuilder
+
+'''
+Builds a character's controls from a control spec, without the window.
+
+A spec is a JSON file listing groups of joints and how to build their controls:
+    {
+        "defaults": {"shape": "Circle", "orient": [0, 90, 0], "scale": [1, 1, 1]},
+        "controls": [
+            {"joints": ["L_shoulder_jnt", "L_elbow_jnt", "L_wrist_jnt"], "mode": "parent",
+             "name": "{joint}_FK_ctrl"},
+            {"joints": ["L_elbow_jnt"], "mode": "poleVector", "shape": "Diamond"},
+            {"joints": ["*_finger*_jnt"], "scale": [0.3, 0.3, 0.3], "bake": true}
+        ]
+    }
+Every entry takes the keys below, falling back to "defaults" and then SPEC_DEFAULTS:
+    joints - joint names, or patterns like "L_*_jnt". Joints matched by a pattern are built in
+             scene order, which is the order Parent Controls chains them in.
+    shape  - name of a shape in the shape library.
+    orient, scale - the same as the X/Y/Z fields in the window.
+    mode   - "singular", "parent" or "poleVector".
+    matrix, bake, share - the window's 'Matrix driven', 'Bake orientation and scale' and
+             'Share shapes' checkboxes.
+    name   - control name format (see rigControlBuilder.controlName), e.g. "{joint}_ctrl".
+    poleFactor - with "poleVector", how far out from the joint the control goes, as a fraction
+             of the length of the chain the joint is the middle of.
+
+The whole spec is built in one pass: the scene's joints and names are listed once, and every
+entry is built in one undo chunk with the viewport refresh off. Joints or patterns the scene
+doesn't have are reported rather than stopping the build, so one spec can cover characters
+that are missing a few joints.
+
+Run with mayapy over a directory of character scenes, one scene per worker process, e.g.:
+    mayapy controlSpec.py biped.json characters/ --output rigged/ --processes 4
+'''
+
+MODES = {"singular": rigControlBuilder.SINGULAR,
+         "parent": rigControlBuilder.PARENT,
+         "poleVector": rigControlBuilder.POLE_VECTOR}
+
+SPEC_DEFAULTS = {"shape": "Circle", "orient": [0, 0, 0], "scale": [1, 1, 1], "mode": "singular",
+                 "matrix": False, "bake": False, "share": False, "name": None,
+                 "poleFactor": rigControlBuilder.POLE_FACTOR}
+
+ENTRY_KEYS = ("joints",) + tuple(SPEC_DEFAULTS)
+
+SCENE_TYPES = {".ma": "mayaAscii", ".mb": "mayaBinary"}
+
+
+########################
+# Specs
+########################
+
+# Loads and checks a spec, from a path or an already loaded dictionary.
+# Returns the list of entries with every key filled in.
+# Raises ValueError for anything wrong with the spec, before anything is built.
+def loadSpec(spec):
+    if not isinstance(spec, dict):
+        with open(spec) as specFile:
+            spec = json.load(specFile, object_pairs_hook=OrderedDict)
+
+    unknown = set(spec) - set(("defaults", "controls"))
+    if unknown:
+        raise ValueError("Unknown control spec keys: %s" % ", ".join(sorted(unknown)))
+
+    defaults = dict(SPEC_DEFAULTS)
+    defaults.update(_checkEntry(spec.get("defaults", {}), "defaults"))
+
+    entries = []
+    for number, entry in enumerate(spec.get("controls", []), 1):
+        where = "controls entry %d" % number
+        entry = dict(defaults, **_checkEntry(entry, where))
+        if not entry.get("joints"):
+            raise ValueError("%s: has no joints." % where)
+        if isinstance(entry["joints"], str):
+            entry["joints"] = [entry["joints"]]
+        entries.append(entry)
+
+    return entries
+
+
+def _checkEntry(entry, where):
+    unknown = set(entry) - set(ENTRY_KEYS)
+    if unknown:
+        raise ValueError("%s: unknown keys %s" % (where, ", ".join(sorted(unknown))))
+    if "mode" in entry and entry["mode"] not in MODES:
+        raise ValueError("%s: mode should be one of %s, not %r" % (where, ", ".join(sorted(MODES)), entry["mode"]))
+    if "shape" in entry and entry["shape"] not in rigControlBuilder.shapeNames():
+        raise ValueError("%s: %r isn't in the shape library (%s)"
+                         % (where, entry["shape"], ", ".join(rigControlBuilder.shapeNames())))
+    for key in ("orient", "scale"):
+        if key in entry and len(entry[key]) != 3:
+            raise ValueError("%s: %s should be 3 numbers, not %r" % (where, key, entry[key]))
+    if entry.get("name"):
+        try:
+            rigControlBuilder.controlName(entry["name"], "joint")
+        except (KeyError, IndexError, ValueError) as error:
+            raise ValueError("%s: bad name format %r (%s)" % (where, entry["name"], error))
+
+    return copy.deepcopy(entry)
+
+
+# Returns the joints an entry's names and patterns match, without repeats, and the names and
+# patterns that didn't match anything.
+# sceneJoints: every joint in the scene, in scene order. jointSet: the same as a set.
+def resolveJoints(names, sceneJoints, jointSet):
+    joints = []
+    missing = []
+    seen = set()
+    for name in names:
+        if any(character in name for character in "*?["):
+            found = fnmatch.filter(sceneJoints, name)
+        else:
+            found = [name] if name in jointSet else []
+
+        if not found:
+            missing.append(name)
+        for joint in found:
+            if joint not in seen:
+                seen.add(joint)
+                joints.append(joint)
+
+    return joints, missing
+
+
+########################
+# Building
+########################
+
+# Builds every control in a spec in the open scene.
+# Returns {"controls": {joint: [controls]}, "missing": [(entry number, name or pattern)], "seconds": time}.
+def buildFromSpec(spec):
+    start = time.time()
+    entries = loadSpec(spec)
+
+    # List the scene once for every entry.
+    sceneJoints = cmds.ls(type="joint") or []
+    jointSet = set(sceneJoints)
+    allocator = nameAllocator.NameAllocator(cmds.ls())
+    builder = rigControlBuilder.controlBuilder()
+
+    controls = OrderedDict()
+    missing = []
+    cmds.undoInfo(openChunk=True, chunkName="buildFromSpec")
+    cmds.refresh(suspend=True)
+    try:
+        for number, entry in enumerate(entries, 1):
+            joints, notFound = resolveJoints(entry["joints"], sceneJoints, jointSet)
+            missing.extend((number, name) for name in notFound)
+            if not joints:
+                continue
+
+            built = builder.buildControls(joints, entry["shape"], MODES[entry["mode"]], entry["orient"],
+                                          entry["scale"], entry["matrix"], entry["bake"], entry["share"],
+                                          entry["name"], allocator, entry["poleFactor"])
+            for joint, control in built.items():
+                controls.setdefault(joint, []).append(control)
+    finally:
+        cmds.refresh(suspend=False)
+        cmds.undoInfo(closeChunk=True)
+
+    for number, name in missing:
+        cmds.warning("Control spec entry %d: no joints match %s" % (number, name))
+
+    return {"controls": controls, "missing": missing, "seconds": time.time() - start}
+
+
+# Opens a scene, builds a spec in it and saves it to outputPath (over the scene if not given).
+# Errors are caught and returned, so one broken character doesn't stop a batch.
+# Returns a result dictionary with the time taken to open, build and save the scene.
+def buildScene(spec, path, outputPath=None):
+    outputPath = outputPath or path
+    result = {"path": path, "output": None, "controls": 0, "missing": [], "error": None,
+              "open": 0.0, "build": 0.0, "save": 0.0}
+    try:
+        start = time.time()
+        cmds.file(path, open=True, force=True, prompt=False)
+        result["open"] = time.time() - start
+
+        built = buildFromSpec(spec)
+        result["build"] = built["seconds"]
+        result["controls"] = sum(len(controls) for controls in built["controls"].values())
+        result["missing"] = built["missing"]
+
+        start = time.time()
+        directory = os.path.dirname(outputPath)
+        if directory and not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                # Another worker made it first.
+                if not os.path.isdir(directory):
+                    raise
+        fileType = SCENE_TYPES.get(os.path.splitext(outputPath)[1].lower(), "mayaAscii")
+        cmds.file(rename=outputPath)
+        cmds.file(save=True, type=fileType, force=True)
+        result["save"] = time.time() - start
+        result["output"] = outputPath
+    except Exception as error:
+        result["error"] = "%s: %s" % (type(error).__name__, error)
+
+    return result
+
+
+def _buildScene(args):
+    return buildScene(*args)
+
+
+# Starts Maya in this process when it's mayapy (or a pool worker) and Maya isn't running yet. Until
+# then maya.cmds has none of Maya's commands in it.
+def _initialiseMaya():
+    if not hasattr(cmds, "file"):
+        import maya.standalone
+        maya.standalone.initialize(name="python")
+
+
+# Inside a Maya GUI session sys.executable is Maya itself, so point the pool at mayapy to stop it
+# from launching more copies of Maya.
+def _setPoolExecutable():
+    exe = os.path.basename(sys.executable).lower()
+    if exe.startswith("maya") and not exe.startswith("mayapy"):
+        mayapy = os.path.join(os.path.dirname(sys.executable), "mayapy")
+        if sys.platform == "win32":
+            mayapy += ".exe"
+        multiprocessing.set_executable(mayapy)
+
+
+# Returns every .ma and .mb scene in the given files and directories (recursively).
+def findScenes(paths):
+    scenes = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, fileNames in os.walk(path):
+                for fileName in sorted(fileNames):
+                    if os.path.splitext(fileName)[1].lower() in SCENE_TYPES:
+                        scenes.append(os.path.join(root, fileName))
+        else:
+            scenes.append(path)
+
+    # The same scene given twice would be saved by two workers at once.
+    unique = []
+    seen = set()
+    for path in scenes:
+        key = os.path.normcase(os.path.abspath(path))
+        if key not in seen:
+            seen.add(key)
+            unique.append(path)
+
+    return unique
+
+
+# Builds a spec in every scene in paths, one scene per worker process. Each worker starts Maya
+# once and then builds scene after scene, so the start up cost is only paid once per worker.
+# outputDirectory: where to save the built scenes (keeping the folder structure below root),
+# None to save over them.
+# Returns a list of buildScene results in the same order as the scenes.
+def buildScenes(spec, paths, outputDirectory=None, root=None, processes=None):
+    # Check the spec here, rather than once per scene in the workers.
+    if not isinstance(spec, dict):
+        with open(spec) as specFile:
+            spec = json.load(specFile, object_pairs_hook=OrderedDict)
+    loadSpec(spec)
+
+    jobs = []
+    for path in findScenes(paths):
+        outputPath = None
+        if outputDirectory:
+            relative = os.path.relpath(path, root) if root else os.path.basename(path)
+            outputPath = os.path.join(outputDirectory, relative)
+        jobs.append((spec, path, outputPath))
+
+    processes = processes or multiprocessing.cpu_count()
+    if processes == 1 or len(jobs) < 2:
+        _initialiseMaya()
+        return [_buildScene(job) for job in jobs]
+
+    _setPoolExecutable()
+    pool = multiprocessing.Pool(min(processes, len(jobs)), initializer=_initialiseMaya)
+    try:
+        return pool.map(_buildScene, jobs, 1)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Build rig controls from a control spec in many character scenes.")
+    parser.add_argument("spec", help="Control spec (.json).")
+    parser.add_argument("paths", nargs="+", help=".ma/.mb scenes or directories of them.")
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument("--output", help="Directory to save the built scenes to.")
+    output.add_argument("--in-place", action="store_true", help="Save over the scenes.")
+    parser.add_argument("--processes", type=int, default=None, help="Number of worker processes.")
+    parser.add_argument("--report", help="Write the per-character results to this .json file.")
+    args = parser.parse_args(args)
+
+    root = args.paths[0] if len(args.paths) == 1 and os.path.isdir(args.paths[0]) else None
+
+    start = time.time()
+    results = buildScenes(args.spec, args.paths, args.output, root, args.processes)
+    elapsed = time.time() - start
+
+    for result in results:
+        if result["error"]:
+            print("%s: failed, %s" % (result["path"], result["error"]))
+            continue
+        print("%s: %d controls, open %.2fs, build %.2fs, save %.2fs%s"
+              % (result["path"], result["controls"], result["open"], result["build"], result["save"],
+                 ", %d missing" % len(result["missing"]) if result["missing"] else ""))
+
+    failed = [result for result in results if result["error"]]
+    print("%d character(s), %d controls in %.2fs, %d failed."
+          % (len(results), sum(result["controls"] for result in results), elapsed, len(failed)))
+
+    if args.report:
+        with open(args.report, "w") as reportFile:
+            json.dump(results, reportFile, indent=2)
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
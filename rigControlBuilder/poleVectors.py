@@ -0,0 +1,62 @@
+import numpy as np
+
+'''
+Works out where pole vector controls go, on plain (n, 3) position arrays so it can be used and checked
+without Maya. rigControlBuilder.placePoleVectors() reads the joint positions and places the controls.
+'''
+
+# How far pole vector controls are placed from the middle joint, as a fraction of the chain's length.
+POLE_FACTOR = 0.5
+
+
+# Works out where pole vectors go for any number of three joint chains, all at once.
+# starts, mids, ends: (n, 3) world positions of the joints of each chain.
+# factor: how far out from the middle joint the pole goes, as a fraction of the chain's length.
+# fallbacks: (n, 3) directions to use for chains that are straight (no bend to take a plane from).
+#            Without one, or if it's along the chain, the world axis furthest from the chain is used.
+# tolerance: chains whose middle joint is closer than this fraction of their length to the line
+#            from start to end count as straight.
+# Returns the (n, 3) pole positions and an (n,) array of which chains were straight. The pole is in
+# the plane of the chain, out from the middle joint on the side it bends to.
+def solvePoleVectors(starts, mids, ends, factor=POLE_FACTOR, fallbacks=None, tolerance=1e-4):
+    starts, mids, ends = [np.asarray(points, dtype=np.float64).reshape(-1, 3) for points in (starts, mids, ends)]
+    chain = ends - starts
+    length = np.linalg.norm(mids - starts, axis=1) + np.linalg.norm(ends - mids, axis=1)
+
+    # Out from the closest point to the middle joint on the line from start to end.
+    chainSquared = np.einsum('ij,ij->i', chain, chain)
+    along = np.einsum('ij,ij->i', mids - starts, chain) / np.where(chainSquared > 0, chainSquared, 1)
+    direction = mids - (starts + chain * along[:, None])
+    distance = np.linalg.norm(direction, axis=1)
+
+    straight = distance <= tolerance * length
+    if straight.any():
+        axes = chain[straight]
+        preferred = None if fallbacks is None else np.asarray(fallbacks, dtype=np.float64).reshape(-1, 3)[straight]
+        direction[straight] = _perpendicular(axes, preferred)
+        distance[straight] = 1.0
+
+    # Chains with all three joints in one place get their pole on the middle joint.
+    straight &= length > 0
+    distance[distance == 0] = 1.0
+    poles = mids + direction * (factor * length / distance)[:, None]
+
+    return poles, straight
+
+
+# Returns unit directions at right angles to axes, as close to preferred as possible.
+def _perpendicular(axes, preferred=None):
+    axisLength = np.linalg.norm(axes, axis=1)
+    axes = np.where(axisLength[:, None] > 0, axes / np.where(axisLength > 0, axisLength, 1)[:, None], [1.0, 0.0, 0.0])
+
+    # The world axis least along each chain, for when there's no preferred direction to use.
+    worldAxes = np.eye(3)[np.argmin(np.abs(axes), axis=1)]
+    result = worldAxes - axes * np.einsum('ij,ij->i', axes, worldAxes)[:, None]
+
+    if preferred is not None:
+        preferred = np.nan_to_num(preferred)
+        fromPreferred = preferred - axes * np.einsum('ij,ij->i', axes, preferred)[:, None]
+        usable = np.linalg.norm(fromPreferred, axis=1) > 1e-8 * np.linalg.norm(preferred, axis=1)
+        result[usable] = fromPreferred[usable]
+
+    return result / np.linalg.norm(result, axis=1)[:, None]
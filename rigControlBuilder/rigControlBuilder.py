@@ -1,17 +1,40 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+
 from maya import cmds
-import pymel.core as pm
+import maya.api.OpenMaya as om
+import numpy as np
 from collections import OrderedDict
 
+import nameAllocator
+from poleVectors import POLE_FACTOR, solvePoleVectors
+
 '''
 Steps taken to create control(s).
-1. Create shape.
-2. Orient the shape in the right axis using setattr.
+1. Create shape from the shape library (controlShapes.json).
+2. Orient the shape in the right axis using setattr. With 'Bake orientation and scale' ticked, the library
+   points are rotated and scaled with numpy before the curves are made instead, so controls come out with
+   zeroed transforms and nothing to set. With 'Share shapes' ticked, only the first control of each shape,
+   orientation and scale gets a shape, the rest get that shape instanced under them.
 3. Group the control to itself and rename.
-4. Select shape control group and the joint it is going to control and parent them.
-5. Zero out translations and rotations on group.
-6. Un-parent joint and control group.
-7. Parent controls under each-other if checkbox is set to True.
-8. Parent constraint joints to controls.
+4. Move each group onto its joint. The world matrices of all the joints are read in one go, and each
+   group gets its joint's matrix (without scale) with one xform call, nothing is parented.
+5. Parent controls under each-other if checkbox is set to True. Pole vector controls are moved out in front
+   of their joints instead, see placePoleVectors(). solvePoleVectors() (in poleVectors.py) works out every
+   pole position from the joint positions in one go, and can be used on its own with any (n, 3) position
+   arrays, without Maya.
+6. Parent constraint joints to controls.
+
+placeGroupsLegacy() is the old way of doing step 4 (parent the group under the joint, zero out its
+translations and rotations, un-parent it), kept to compare against. benchmarkPlacement() times the two.
+
+With 'Matrix driven' ticked, Parent Controls skips steps 3-6: controls are parented straight under
+each other with their rest place in offsetParentMatrix, and drive the joints through direct
+translate/rotate connections (or a multMatrix where the joint isn't a child of the previous one).
+benchmarkRigModes() compares the node count and evaluation time of the two modes.
 
 # TODOs
 * Add ability for user to set naming format?
@@ -20,10 +43,21 @@ Steps taken to create control(s).
 # Nice TODOs
 * Add colour picker to change the shapes colour.
 * Give option to add to new layer.
-* Add more shapes (arrow, star, etc..)
+
+# Shape library
+Shapes are stored in controlShapes.json next to this file as degree, knots and CV points for each curve
+(or a primitive, like the sphere). The file is read the first time a shape is needed and kept in memory.
+To add a shape, draw it, select it and run captureShape("Star"). It's saved to the library and shows up in
+the Shape Type menu the next time the window is opened.
 '''
 
 
+# Control modes, the same order as the radio buttons.
+SINGULAR = 1
+PARENT = 2
+POLE_VECTOR = 3
+
+
 # Create controls for selected joints.
 class controlBuilder(object):
 
@@ -35,7 +69,7 @@ class controlBuilder(object):
     ########################
 
     windowName = "RigControlBuilder"
-    height = 120
+    height = 180
     width = 400
 
     def show(self):
@@ -75,10 +109,8 @@ class controlBuilder(object):
         # Set shape type.
         cmds.rowLayout(numberOfColumns=3)
         cmds.optionMenu("shapeType_optionMenu", label='Shape Type')
-        cmds.menuItem(label='Circle')
-        cmds.menuItem(label='Box')
-        cmds.menuItem(label='Sphere')
-        cmds.menuItem(label='Diamond')
+        for shapeName in shapeNames():
+            cmds.menuItem(label=shapeName)
 
         cmds.setParent('..')
 
@@ -108,10 +140,31 @@ class controlBuilder(object):
 
         cmds.setParent('..')
 
+        # Drive the joints through offsetParentMatrix instead of groups and parent constraints.
+        cmds.rowLayout(numberOfColumns=1)
+        cmds.checkBox('matrixMode_checkBox', label='Matrix driven (Parent Controls, no constraints or groups)',
+                      value=False)
+
+        cmds.setParent('..')
+
+        # Bake the orientation and scale into the shape instead of setting them on the control.
+        cmds.rowLayout(numberOfColumns=1)
+        cmds.checkBox('bakeShape_checkBox', label='Bake orientation and scale into the shape (clean transforms)',
+                      value=False)
+
+        cmds.setParent('..')
+
+        # Controls of the same shape and size share one instanced shape node.
+        cmds.rowLayout(numberOfColumns=1)
+        cmds.checkBox('shareShapes_checkBox', label='Share shapes between controls (instanced, smaller files)',
+                      value=False)
+
+        cmds.setParent('..')
+
         # Create shape.
         cmds.rowLayout(numberOfColumns=2)
-        pm.button(label="Create", align='right', command=self.createShapes, width=buttonWidth)
-        pm.button(label="Reset", align='right', command=self.reset, width=buttonWidth)
+        cmds.button(label="Create", align='right', command=self.createShapes, width=buttonWidth)
+        cmds.button(label="Reset", align='right', command=self.reset, width=buttonWidth)
 
 
     ########################
@@ -128,7 +181,43 @@ class controlBuilder(object):
             return
 
         # Gets the type of shape we want to create.
-        shapeType = pm.optionMenu('shapeType_optionMenu', q=True, sl=True)
+        shapeType = cmds.optionMenu('shapeType_optionMenu', q=True, value=True)
+        mode = cmds.radioButtonGrp('parentAndPole_radiobuttonGrp', q=True, sl=True)
+        matrixMode = cmds.checkBox('matrixMode_checkBox', q=True, value=True)
+        bakeShape = cmds.checkBox('bakeShape_checkBox', q=True, value=True)
+        shareShapes = cmds.checkBox('shareShapes_checkBox', q=True, value=True)
+
+        # Orientation and scale.
+        orient = [float(cmds.textField(field, q=True, text=True)) for field in ("xOrient", "yOrient", "zOrient")]
+        scale = [float(cmds.textField(field, q=True, text=True)) for field in ("xScale", "yScale", "zScale")]
+
+        return self.buildControls(self.joints, shapeType, mode, orient, scale, matrixMode, bakeShape, shareShapes)
+
+    # Creates controls for joints, without reading anything from the UI.
+    # shapeType: name of a shape in the shape library (or its number in the Shape Type menu).
+    # mode: SINGULAR, PARENT or POLE_VECTOR.
+    # matrixMode: with PARENT, drive the joints through offsetParentMatrix instead of groups and constraints.
+    # bakeShape: bake orient and scale into the shape's CVs, so the controls have clean transforms.
+    # shareShapes: controls share one instanced shape per shape type, orient and scale. Their
+    #              orient and scale are always baked into the shape.
+    # nameFormat: control names, e.g. "{joint}_FK_ctrl" (see controlName). By default controls are
+    #             named joint_ctrl, or base_poleVector_ctrl for pole vectors.
+    # allocator: nameAllocator.NameAllocator of the names in the scene, so batches of builds can share
+    #            one listing of the scene. Made from cmds.ls() if not given.
+    # poleFactor: with POLE_VECTOR, how far the controls are placed out from the joints (see placePoleVectors).
+    # Returns the {joint: control} dictionary.
+    def buildControls(self, joints, shapeType=1, mode=SINGULAR, orient=(0, 0, 0), scale=(1, 1, 1), matrixMode=False,
+                      bakeShape=False, shareShapes=False, nameFormat=None, allocator=None, poleFactor=POLE_FACTOR):
+        if isinstance(shapeType, int):
+            shapeType = shapeNames()[shapeType - 1]
+        shapeKey = sharedShapeKey(shapeType, orient, scale)
+
+        # Transform the shape's CVs once up front, every control is then made from the baked points.
+        libraryShape = shapeLibrary()["shapes"].get(shapeType)
+        baked = (bakeShape or shareShapes) and libraryShape is not None and "curves" in libraryShape
+        if baked:
+            shapeType = bakedShape(libraryShape, orient, scale)
+
         # List of new shapes created.
         newShapes = []
 
@@ -139,8 +228,15 @@ class controlBuilder(object):
         # List of items that will be used to group under each other.
         controlAndGroup = []
 
+        # Names in the scene, so new controls can be given unique names without checking each one.
+        if allocator is None:
+            allocator = nameAllocator.NameAllocator(cmds.ls())
+
+        # Shared shapes already in the scene, listed once and kept up to date as controls are made.
+        shared = sharedShapes() if shareShapes else None
+
         # Create controls for all the joints depending on which radio button is selected.
-        for joint in self.joints:
+        for index, joint in enumerate(joints):
 
             # If item in the joints list is not a joint, return an error.
             if not cmds.objectType(joint, isType="joint"):
@@ -149,50 +245,53 @@ class controlBuilder(object):
 
             name = joint + "_ctrl"
 
+            if nameFormat:
+                name = controlName(nameFormat, joint, index)
+                if name in allocator:
+                    cmds.warning("%s already exists, creating shape with unique name..." % name)
+
             # Checks if this control should be a pole vector naming convention.
-            if cmds.radioButtonGrp('parentAndPole_radiobuttonGrp', q=True, sl=True) == 3:
+            elif mode == POLE_VECTOR:
                 name = joint.split('_')[0] + "_poleVector_ctrl"
-                if cmds.objExists(name):
+                if name in allocator:
                     cmds.warning("Pole vector shape already exists, creating shape with unique name...")
-                    cmds.select(name)
-                    # Generate a new name based off of old obj.
-                    newName = cmds.rename(name + "_#")
-                    cmds.rename(name)
-                    name = newName
-
-            # Check if name already exists, if it does rename it with a unique number on the end.
-            elif cmds.objExists(name):
+
+            # Check if name already exists, if it does it gets a unique number on the end.
+            elif name in allocator:
                 cmds.warning("Shape(s) on this joint(s) already exists, creating shape with unique name "
                              "(Parent controls may be affected)...")
-                cmds.select(name)
-                # Generate a new name based off of old obj.
-                newName = cmds.rename(name+"_#")
-                cmds.rename(name)
-                name = newName
 
-            self.pickShape(shapeType, name)
+            name = allocator.unique(name)
+
+            if shareShapes:
+                sharedShapeControl(shapeType, name, shapeKey, orient, scale, shared)
+            else:
+                self.pickShape(shapeType, name)
             newShapes.append(name)
             jointShapes.update({joint : name})
 
-        # Set Orientations.
-        xOri = float(cmds.textField("xOrient", q=True, text=True))
-        yOri = float(cmds.textField("yOrient", q=True, text=True))
-        zOri = float(cmds.textField("zOrient", q=True, text=True))
-
-        for shape in newShapes:
-            cmds.setAttr(shape + '.rotateX', xOri)
-            cmds.setAttr(shape + '.rotateY', yOri)
-            cmds.setAttr(shape + '.rotateZ', zOri)
-
-        # Set Scale.
-        xScale = float(cmds.textField("xScale", q=True, text=True))
-        yScale = float(cmds.textField("yScale", q=True, text=True))
-        zScale = float(cmds.textField("zScale", q=True, text=True))
-
-        for shape in newShapes:
-            cmds.setAttr(shape + '.scaleX', xScale)
-            cmds.setAttr(shape + '.scaleY', yScale)
-            cmds.setAttr(shape + '.scaleZ', zScale)
+        # Set Orientations and Scale, unless they're already baked into the shape.
+        if not baked and not shareShapes:
+            for shape in newShapes:
+                cmds.setAttr(shape + '.rotateX', orient[0])
+                cmds.setAttr(shape + '.rotateY', orient[1])
+                cmds.setAttr(shape + '.rotateZ', orient[2])
+
+            for shape in newShapes:
+                cmds.setAttr(shape + '.scaleX', scale[0])
+                cmds.setAttr(shape + '.scaleY', scale[1])
+                cmds.setAttr(shape + '.scaleZ', scale[2])
+
+            # Shapes that aren't curves (the sphere) can't be baked up front, freeze them instead.
+            if bakeShape:
+                cmds.makeIdentity(newShapes, apply=True, rotate=True, scale=True)
+
+        # Matrix mode needs no groups or constraints.
+        if mode == PARENT and matrixMode:
+            if cmds.attributeQuery('offsetParentMatrix', node=joints[0], exists=True):
+                self.driveWithMatrices(jointShapes)
+                return jointShapes
+            cmds.warning("offsetParentMatrix needs Maya 2020 or newer, using groups and constraints instead...")
 
         # Group and rename.
         for key, value in jointShapes.items():
@@ -202,20 +301,16 @@ class controlBuilder(object):
             controlAndGroup.insert(0, value +'Grp')
             controlAndGroup.insert(0, value)
 
-        # Parent, zero out translations and rotations, and un-parent.
-        for key, value in jointGroups.items():
-            cmds.parent(value, key)
-            cmds.setAttr(value + '.translateX', 0)
-            cmds.setAttr(value + '.translateY', 0)
-            cmds.setAttr(value + '.translateZ', 0)
-            cmds.setAttr(value + '.rotateX', 0)
-            cmds.setAttr(value + '.rotateY', 0)
-            cmds.setAttr(value + '.rotateZ', 0)
-            cmds.parent(value, world=True)
+        # Move the groups onto their joints.
+        self.placeGroups(jointGroups)
+
+        # Move pole vectors out in front of their joints.
+        if mode == POLE_VECTOR:
+            self.placePoleVectors(jointGroups, poleFactor)
 
         # Parent controls and groups under each other.
         # Iterate through the list and group the items up the chain IF the checkbox is on.
-        if cmds.radioButtonGrp('parentAndPole_radiobuttonGrp', q=True, sl=True) == 2:
+        if mode == PARENT:
             for index in range(len(controlAndGroup)):
                 if self.isGroup(controlAndGroup[index]) and index != len(controlAndGroup)-1:
                     cmds.parent(controlAndGroup[index], controlAndGroup[index+1])
@@ -224,34 +319,131 @@ class controlBuilder(object):
             for key, value in jointShapes.items():
                 cmds.parentConstraint(value, key, mo=True)
 
+        return jointShapes
+
+    # Moves pole vector control groups out from their joints, each joint being the middle of a chain
+    # with its parent joint and its first child joint. The positions of every chain are read in one go
+    # and solved together with solvePoleVectors. Chains that are straight are bent by the middle joint's
+    # preferred angle (the way the IK solver will bend them) to find which way the pole should go.
+    # Joints without a parent and child joint are left where they are.
+    # jointGroups: {joint: control group}, the groups already placed on their joints.
+    def placePoleVectors(self, jointGroups, factor=POLE_FACTOR):
+        chains = []
+        groups = []
+        for joint, group in jointGroups.items():
+            chain = poleChain(joint)
+            if chain is None:
+                cmds.warning("%s needs a parent and child joint to place a pole vector from, leaving the control "
+                             "on the joint..." % joint)
+                continue
+            chains.append(chain)
+            groups.append(group)
+        if not chains:
+            return
+
+        matrices = jointMatrices([joint for chain in chains for joint in chain]).reshape(-1, 3, 4, 4)
+        starts, mids, ends = matrices[:, 0, 3, :3], matrices[:, 1, 3, :3], matrices[:, 2, 3, :3]
+
+        # Which way each chain would bend: the end joint turned about the middle joint by its preferred angle.
+        rotations = orthonormalise(matrices[:, 1])[:, :3, :3]
+        preferred = np.array([orientScaleMatrix(cmds.getAttr(chain[1] + '.preferredAngle')[0], (1, 1, 1))
+                              for chain in chains])
+        local = np.einsum('ni,nji->nj', ends - mids, rotations)
+        bentEnds = mids + np.einsum('ni,nij,njk->nk', local, preferred, rotations)
+        bends = solvePoleVectors(starts, mids, bentEnds, 1.0)[0] - mids
+
+        poles, straight = solvePoleVectors(starts, mids, ends, factor, bends)
+        for group, pole in zip(groups, poles):
+            cmds.xform(group, worldSpace=True, translation=pole.tolist())
+
+        if straight.any():
+            cmds.warning("%d chain(s) are straight, their pole vectors were placed from the joints' preferred angles."
+                         % straight.sum())
+
+    # Parents the controls under each other and drives the joints from them with matrices, no
+    # offset groups or constraints:
+    # * The control's orientation and scale are frozen, and its rest place is stored in its
+    #   offsetParentMatrix, so its translate and rotate read 0 at rest.
+    # * Joints whose parent is the previous control's joint get the same rest matrix in their own
+    #   offsetParentMatrix and the control's translate and rotate connected straight in.
+    # * Any other joint gets the control's world matrix through a multMatrix.
+    # jointShapes: {joint: control} in the order the controls are parented.
+    def driveWithMatrices(self, jointShapes):
+        joints = list(jointShapes.keys())
+        controls = list(jointShapes.values())
+        restWorld = orthonormalise(jointMatrices(joints))
+        parentJoints = [(cmds.listRelatives(joint, parent=True, fullPath=True) or [None])[0] for joint in joints]
+        jointPaths = [cmds.ls(joint, long=True)[0] for joint in joints]
+
+        for index, (joint, control) in enumerate(zip(joints, controls)):
+            # Shared shapes are already baked, freezing them would change every control using them.
+            if cmds.getAttr(control + '.rotate')[0] != (0, 0, 0) or cmds.getAttr(control + '.scale')[0] != (1, 1, 1):
+                cmds.makeIdentity(control, apply=True, rotate=True, scale=True)
+
+            direct = index > 0 and parentJoints[index] == jointPaths[index - 1]
+            if index > 0:
+                cmds.parent(control, controls[index - 1], relative=True)
+
+            if direct:
+                # The joint's rest matrix relative to its parent, which follows the parent control.
+                rest = np.array(cmds.xform(joint, q=True, objectSpace=True, matrix=True)).reshape(1, 4, 4)
+                rest = orthonormalise(rest)[0]
+            elif index > 0:
+                rest = restWorld[index].dot(np.linalg.inv(restWorld[index - 1]))
+            else:
+                rest = restWorld[index]
+
+            restList = rest.ravel().tolist()
+            cmds.setAttr(control + '.offsetParentMatrix', restList, type='matrix')
+            cmds.setAttr(control + '.rotateOrder', cmds.getAttr(joint + '.rotateOrder'))
+
+            # Move the joint's rest place into its offsetParentMatrix and drive what's left.
+            for attr in ('translate', 'rotate', 'rotateAxis', 'jointOrient'):
+                cmds.setAttr('%s.%s' % (joint, attr), 0, 0, 0)
+
+            if direct:
+                cmds.setAttr(joint + '.offsetParentMatrix', restList, type='matrix')
+                cmds.connectAttr(control + '.translate', joint + '.translate', force=True)
+                cmds.connectAttr(control + '.rotate', joint + '.rotate', force=True)
+            else:
+                multMatrix = cmds.createNode('multMatrix', name=control + '_multMatrix')
+                cmds.connectAttr(control + '.worldMatrix[0]', multMatrix + '.matrixIn[0]')
+                cmds.connectAttr(joint + '.parentInverseMatrix[0]', multMatrix + '.matrixIn[1]')
+                cmds.connectAttr(multMatrix + '.matrixSum', joint + '.offsetParentMatrix', force=True)
+
     ########################
     # Helper functions
     ########################
 
-    # Returns the right curve based on the shape name passed, also names it according to name passed.
+    # Creates a shape from the shape library and names it according to name passed.
+    # shape can be the name of the shape or its number in the Shape Type menu (1 is the first).
     def pickShape(self, shape, name):
-        if shape == 1:
-            # Circle shape control.
-            circle = pm.circle(n=name, nr=[0, 1, 0])
-            return circle
-        elif shape == 2:
-            # Box/cube shape control.
-            box = pm.curve(n=name, d=1,
-                              p=[(1, 1, 1), (1, 1, -1), (-1, 1, -1), (-1, 1, 1), (1, 1, 1), (1, -1, 1),
-                                 (1, -1, -1), (1, 1, -1), (-1, 1, -1), (-1, -1, -1), (1, -1, -1),
-                                 (-1, -1, -1), (-1, -1, 1), (-1, 1, 1), (-1, -1, 1), (1, -1, 1)],
-                              k=[0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15])
-            return box
-        elif shape == 3:
-            sphere = cmds.sphere(name=name, po=0)
-            return sphere
-        elif shape == 4:
-            diamond = pm.curve(name=name, d=1, p=[(0, 1, 0), (-1, 0.00278996, 6.18172e-08), (0, 0, 1), (0, 1, 0),
-                                       (1, 0.00278996, 0), (0, 0, 1), (1, 0.00278996, 0), (0, 0, -1), (0, 1, 0),
-                                       (0, 0, -1), (-1, 0.00278996, 6.18172e-08), (0, -1, 0), (0, 0, -1),
-                                       (1, 0.00278996, 0),(0, -1, 0),(0, 0, 1)],
-                               k=[0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15])
-            return diamond
+        if isinstance(shape, int):
+            shape = shapeNames()[shape - 1]
+
+        return createShape(shape, name)
+
+    # Moves each group onto its joint: the group gets the joint's world matrix without its scale,
+    # the same as parenting it under the joint and zeroing its translations and rotations.
+    # jointGroups: {joint: group}, groups should be at the top of the hierarchy.
+    def placeGroups(self, jointGroups):
+        joints = list(jointGroups.keys())
+        matrices = orthonormalise(jointMatrices(joints))
+
+        for joint, matrix in zip(joints, matrices):
+            cmds.xform(jointGroups[joint], worldSpace=True, matrix=matrix.ravel().tolist())
+
+    # The old way of placing the groups, parenting each under its joint and back out again.
+    def placeGroupsLegacy(self, jointGroups):
+        for key, value in jointGroups.items():
+            cmds.parent(value, key)
+            cmds.setAttr(value + '.translateX', 0)
+            cmds.setAttr(value + '.translateY', 0)
+            cmds.setAttr(value + '.translateZ', 0)
+            cmds.setAttr(value + '.rotateX', 0)
+            cmds.setAttr(value + '.rotateY', 0)
+            cmds.setAttr(value + '.rotateZ', 0)
+            cmds.parent(value, world=True)
 
     # Returns True if node is a group, False otherwise.
     def isGroup(self, node):
@@ -268,3 +460,429 @@ class controlBuilder(object):
                 return False
         else:
             return True
+
+
+# Returns the (parent joint, joint, first child joint) chain a joint is the middle of, or None if it
+# doesn't have both.
+def poleChain(joint):
+    parent = cmds.listRelatives(joint, parent=True, type='joint', fullPath=True)
+    children = cmds.listRelatives(joint, children=True, type='joint', fullPath=True)
+    if not parent or not children:
+        return None
+
+    return parent[0], cmds.ls(joint, long=True)[0], children[0]
+
+
+# Fills in a control name format for a joint. Formats can use:
+# {joint}: the joint's name, {base}: the joint's name up to the first '_', {index}: the joint's number
+# in the list being built (1 is the first).
+def controlName(nameFormat, joint, index=0):
+    return nameFormat.format(joint=joint, base=joint.split('_')[0], index=index + 1)
+
+
+########################
+# Shape library
+########################
+
+SHAPE_LIBRARY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "controlShapes.json")
+
+# The loaded shape library, read from SHAPE_LIBRARY the first time it's needed.
+_shapeLibrary = None
+
+
+# Returns the shape library: {"order": [shape names], "shapes": {name: shape}}.
+def shapeLibrary():
+    global _shapeLibrary
+    if _shapeLibrary is None:
+        with open(SHAPE_LIBRARY) as libraryFile:
+            _shapeLibrary = json.load(libraryFile)
+
+    return _shapeLibrary
+
+
+# Returns the names of the shapes in the library, in menu order.
+def shapeNames():
+    library = shapeLibrary()
+    return library["order"] + sorted(set(library["shapes"]) - set(library["order"]))
+
+
+# Writes the shape library back to disk, one shape per line to keep the file readable in diffs.
+def saveShapeLibrary(path=None):
+    library = shapeLibrary()
+    names = shapeNames()
+
+    lines = ['{', '  "version": %d,' % library.get("version", 1), '  "order": %s,' % json.dumps(names),
+             '  "shapes": {']
+    for index, shapeName in enumerate(names):
+        lines.append('    %s: %s%s' % (json.dumps(shapeName),
+                                        json.dumps(library["shapes"][shapeName], separators=(", ", ": ")),
+                                        "," if index < len(names) - 1 else ""))
+    lines += ['  }', '}']
+
+    path = path or SHAPE_LIBRARY
+    tempPath = path + ".tmp"
+    with open(tempPath, "w") as libraryFile:
+        libraryFile.write("\n".join(lines) + "\n")
+    os.replace(tempPath, path)
+
+
+# Creates a shape from the library, or from a shape dictionary. Returns the name of its transform.
+def createShape(shapeName, name):
+    shape = shapeName if isinstance(shapeName, dict) else shapeLibrary()["shapes"].get(shapeName)
+    if shape is None:
+        cmds.error("There's no '%s' shape in the shape library." % shapeName)
+        return
+
+    if shape.get("primitive") == "sphere":
+        return cmds.sphere(name=name, po=0)[0]
+
+    transform = None
+    for curve in shape["curves"]:
+        node = cmds.curve(name=name, degree=curve["degree"], periodic=curve["periodic"],
+                          point=curve["points"], knot=curve["knots"])
+        if transform is None:
+            transform = node
+            continue
+
+        # Every curve after the first is moved under the first curve's transform.
+        for curveShape in cmds.listRelatives(node, shapes=True, fullPath=True):
+            cmds.parent(curveShape, transform, relative=True, shape=True)
+        cmds.delete(node)
+
+    for index, curveShape in enumerate(cmds.listRelatives(transform, shapes=True, fullPath=True)):
+        cmds.rename(curveShape, "%sShape%s" % (transform, index or ""))
+
+    return transform
+
+
+# Returns the (3, 3) matrix that scales then rotates points (as rows), the same as setting rotate
+# (in degrees, xyz rotate order) and scale on a transform.
+def orientScaleMatrix(orient, scale):
+    x, y, z = np.radians(orient)
+    rotateX = np.array([[1, 0, 0], [0, np.cos(x), np.sin(x)], [0, -np.sin(x), np.cos(x)]])
+    rotateY = np.array([[np.cos(y), 0, -np.sin(y)], [0, 1, 0], [np.sin(y), 0, np.cos(y)]])
+    rotateZ = np.array([[np.cos(z), np.sin(z), 0], [-np.sin(z), np.cos(z), 0], [0, 0, 1]])
+
+    return np.diag(np.asarray(scale, dtype=np.float64)).dot(rotateX).dot(rotateY).dot(rotateZ)
+
+
+# Returns a copy of a library shape with orient and scale baked into its points. The points of
+# all its curves are transformed together with one matrix multiply.
+def bakedShape(shape, orient, scale):
+    matrix = orientScaleMatrix(orient, scale)
+    curves = shape["curves"]
+    points = np.concatenate([np.asarray(curve["points"], dtype=np.float64) for curve in curves])
+    points = np.einsum('ij,jk->ik', points, matrix)
+
+    bakedCurves = []
+    start = 0
+    for curve in curves:
+        end = start + len(curve["points"])
+        bakedCurves.append(dict(curve, points=points[start:end].tolist()))
+        start = end
+
+    return {"curves": bakedCurves}
+
+
+########################
+# Shared shapes
+########################
+
+# Attribute on shared shape nodes holding their sharedShapeKey, so later builds can find them.
+SHARED_SHAPE_ATTR = "controlShapeKey"
+
+
+# Returns the key controls sharing a shape are grouped by: shape type, orientation and scale.
+def sharedShapeKey(shapeName, orient, scale):
+    return "%s %s %s" % (shapeName, " ".join("%g" % value for value in orient),
+                         " ".join("%g" % value for value in scale))
+
+
+# Returns {key: [shape nodes]} of the shared shapes already in the scene.
+def sharedShapes():
+    shapes = {}
+    for shape in cmds.ls("*." + SHARED_SHAPE_ATTR, objectsOnly=True, long=True) or []:
+        key = cmds.getAttr(shape + "." + SHARED_SHAPE_ATTR)
+        shapes.setdefault(key, []).append(shape)
+
+    return shapes
+
+
+# Marks shape nodes as the shared shapes for key.
+def tagSharedShapes(shapes, key):
+    for shape in shapes:
+        if not cmds.attributeQuery(SHARED_SHAPE_ATTR, node=shape, exists=True):
+            cmds.addAttr(shape, longName=SHARED_SHAPE_ATTR, dataType="string")
+        cmds.setAttr(shape + "." + SHARED_SHAPE_ATTR, key, type="string")
+
+
+# Creates a control that shares its shape with every other control of the same key. The first
+# control of a key is made normally (with its orient and scale frozen into the shape), the rest
+# are empty transforms with that shape instanced under them.
+# shape: shape name or baked shape dictionary.
+# shared: {key: [shape nodes]} from sharedShapes(), updated with any new shared shapes. Pass the same
+#         one in for a batch of controls so the scene is only searched once. Returns the control.
+def sharedShapeControl(shape, name, key, orient=(0, 0, 0), scale=(1, 1, 1), shared=None):
+    if shared is None:
+        shared = sharedShapes()
+    existing = [node for node in shared.get(key, []) if cmds.objExists(node)]
+    if existing:
+        control = cmds.createNode("transform", name=name, skipSelect=True)
+        for shapeNode in existing:
+            cmds.parent(shapeNode, control, add=True, shape=True)
+        return control
+
+    control = createShape(shape, name)
+    if not isinstance(shape, dict):
+        # Not baked up front (e.g. the sphere), freeze it before anything shares it.
+        cmds.setAttr(control + '.rotate', *orient)
+        cmds.setAttr(control + '.scale', *scale)
+        cmds.makeIdentity(control, apply=True, rotate=True, scale=True)
+    shapes = cmds.listRelatives(control, shapes=True, fullPath=True)
+    tagSharedShapes(shapes, key)
+    shared[key] = shapes
+
+    return control
+
+
+# Returns a hashable description of the curves under a transform (CVs, knots, degree, form and
+# draw overrides), controls with the same description can share their shapes.
+def _shapeSignature(transform):
+    signature = []
+    for shape in cmds.listRelatives(transform, shapes=True, fullPath=True, type="nurbsCurve") or []:
+        selList = om.MSelectionList()
+        selList.add(shape)
+        curveFn = om.MFnNurbsCurve(selList.getDagPath(0))
+        points = np.array([(point.x, point.y, point.z) for point in curveFn.cvPositions(om.MSpace.kObject)])
+        signature.append((curveFn.degree, curveFn.form, tuple(np.round(curveFn.knots(), 5)),
+                          np.round(points, 5).tobytes(),
+                          cmds.getAttr(shape + ".overrideEnabled"), cmds.getAttr(shape + ".overrideColor")))
+
+    return tuple(signature)
+
+
+# Converts existing controls to shared shapes: controls whose curves are identical (in object space)
+# keep their own transforms but share one instanced set of shapes. Defaults to the selected controls,
+# or every transform in the scene whose name ends with '_ctrl'.
+# Returns the number of shape nodes removed.
+def shareControlShapes(controls=None):
+    controls = controls or cmds.ls(sl=True, type="transform", long=True) or cmds.ls("*_ctrl", type="transform", long=True)
+
+    groups = OrderedDict()
+    for control in controls:
+        shapes = cmds.listRelatives(control, shapes=True, fullPath=True) or []
+        # Only controls made of plain curves, that aren't already instanced.
+        if not shapes or any(cmds.nodeType(shape) != "nurbsCurve" for shape in shapes):
+            continue
+        if any(len(cmds.listRelatives(shape, allParents=True) or []) > 1 for shape in shapes):
+            continue
+        groups.setdefault(_shapeSignature(control), []).append(control)
+
+    removed = 0
+    cmds.undoInfo(openChunk=True, chunkName="shareControlShapes")
+    try:
+        for signature, group in groups.items():
+            if len(group) < 2:
+                continue
+            shared = cmds.listRelatives(group[0], shapes=True, fullPath=True)
+            tagSharedShapes(shared, "converted " + hashlib.sha1(repr(signature).encode("utf-8")).hexdigest()[:16])
+            for control in group[1:]:
+                oldShapes = cmds.listRelatives(control, shapes=True, fullPath=True)
+                cmds.delete(oldShapes)
+                removed += len(oldShapes)
+                for shape in shared:
+                    cmds.parent(shape, control, add=True, shape=True)
+    finally:
+        cmds.undoInfo(closeChunk=True)
+
+    shared = sum(len(group) for group in groups.values() if len(group) > 1)
+    print("Shared the shapes of %d control(s), %d shape node(s) removed." % (shared, removed))
+    return removed
+
+
+# Adds the curves under the selected (or given) transform to the shape library as shapeName.
+# Points are stored in the transform's object space, so freeze it first if it's been moved.
+def captureShape(shapeName, node=None, save=True):
+    node = node or (cmds.ls(sl=True, long=True) or [None])[0]
+    if node is None:
+        cmds.error("Please select a curve to add to the shape library.")
+        return
+
+    curveShapes = cmds.listRelatives(node, shapes=True, fullPath=True, type="nurbsCurve") or []
+    if cmds.objectType(node, isType="nurbsCurve"):
+        curveShapes = [node]
+    if not curveShapes:
+        cmds.error("%s has no curves to add to the shape library." % node)
+        return
+
+    curves = []
+    for curveShape in curveShapes:
+        selList = om.MSelectionList()
+        selList.add(curveShape)
+        curveFn = om.MFnNurbsCurve(selList.getDagPath(0))
+        points = [[round(value, 6) for value in (point.x, point.y, point.z)]
+                  for point in curveFn.cvPositions(om.MSpace.kObject)]
+        curves.append({"degree": curveFn.degree,
+                       "periodic": curveFn.form == om.MFnNurbsCurve.kPeriodic,
+                       "knots": [round(knot, 6) for knot in curveFn.knots()],
+                       "points": points})
+
+    library = shapeLibrary()
+    library["shapes"][shapeName] = {"curves": curves}
+    if shapeName not in library["order"]:
+        library["order"].append(shapeName)
+
+    if save:
+        saveShapeLibrary()
+
+    return library["shapes"][shapeName]
+
+
+########################
+# Matrix functions
+########################
+
+# Returns the world matrices of the nodes as an (n, 4, 4) array, read through the API
+# rather than with a query per node.
+def jointMatrices(nodes):
+    selList = om.MSelectionList()
+    for node in nodes:
+        selList.add(node)
+
+    matrices = [list(selList.getDagPath(i).inclusiveMatrix()) for i in range(len(nodes))]
+    return np.array(matrices, dtype=np.float64).reshape(-1, 4, 4)
+
+
+# Takes the scale out of (n, 4, 4) matrices, keeping their rotations and translations.
+# Rows are made unit length and at right angles to each other (x, then y, then z from x and y).
+def orthonormalise(matrices):
+    matrices = np.array(matrices, dtype=np.float64)
+    x = matrices[:, 0, :3]
+    y = matrices[:, 1, :3]
+    z = matrices[:, 2, :3]
+
+    x = x / np.linalg.norm(x, axis=1)[:, None]
+    y = y - x * np.einsum('ij,ij->i', x, y)[:, None]
+    y = y / np.linalg.norm(y, axis=1)[:, None]
+    # Keep the handedness of the original matrix.
+    sign = np.sign(np.einsum('ij,ij->i', np.cross(x, y), z))
+    sign[sign == 0] = 1
+    z = np.cross(x, y) * sign[:, None]
+
+    matrices[:, 0, :3] = x
+    matrices[:, 1, :3] = y
+    matrices[:, 2, :3] = z
+    matrices[:, :3, 3] = 0
+    matrices[:, 3, 3] = 1
+
+    return matrices
+
+
+# Makes a chain of joints, turning different ways, in a new scene. Returns the joints.
+def benchmarkChain(count):
+    cmds.file(new=True, force=True)
+    cmds.select(clear=True)
+    joints = []
+    for i in range(count):
+        joints.append(cmds.joint(name="bench%d_jnt" % i, position=(i * 0.5, (i % 7) * 0.1, 0),
+                                 orientation=((i * 13) % 90, (i * 7) % 45, (i * 3) % 30)))
+
+    return joints
+
+
+# Times placing control groups on a chain of joints with placeGroups and placeGroupsLegacy,
+# and checks they end up in the same place. Works in a new scene.
+def benchmarkPlacement(count=500):
+    joints = benchmarkChain(count)
+
+    builder = controlBuilder()
+    results = {}
+    for method in ("placeGroupsLegacy", "placeGroups"):
+        jointGroups = OrderedDict()
+        for joint in joints:
+            cmds.select(clear=True)
+            jointGroups[joint] = cmds.group(empty=True, name="%s_%sGrp" % (joint, method))
+
+        start = time.time()
+        getattr(builder, method)(jointGroups)
+        elapsed = time.time() - start
+
+        results[method] = (elapsed, jointMatrices(list(jointGroups.values())))
+        print("%s: %d groups in %.3fs (%.0f groups/s)" % (method, count, elapsed, count / max(elapsed, 1e-6)))
+
+    difference = np.abs(results["placeGroups"][1] - results["placeGroupsLegacy"][1]).max()
+    print("Speed up: %.1fx, largest difference between the two: %g"
+          % (results["placeGroupsLegacy"][0] / max(results["placeGroups"][0], 1e-6), difference))
+
+    return results
+
+
+# Compares Parent Controls built with constraints and groups against the matrix mode, on chains
+# of each length in counts: how many nodes each adds, how long it takes to build, and how long
+# a frame takes to evaluate with every control animated.
+def benchmarkRigModes(counts=(10, 100, 1000), frames=50):
+    builder = controlBuilder()
+    results = []
+    for count in counts:
+        for matrixMode in (False, True):
+            joints = benchmarkChain(count)
+            nodesBefore = len(cmds.ls())
+
+            start = time.time()
+            jointShapes = builder.buildControls(joints, mode=PARENT, matrixMode=matrixMode)
+            buildTime = time.time() - start
+            nodeCount = len(cmds.ls()) - nodesBefore
+
+            controls = list(jointShapes.values())
+            cmds.setKeyframe(controls, attribute='rotateZ', time=1, value=0)
+            cmds.setKeyframe(controls, attribute='rotateZ', time=frames, value=10)
+
+            start = time.time()
+            for frame in range(1, frames + 1):
+                cmds.currentTime(frame, update=True)
+                # Make sure the end of the chain has been worked out.
+                cmds.getAttr(joints[-1] + '.worldMatrix[0]')
+            frameTime = (time.time() - start) / frames
+
+            mode = "matrix" if matrixMode else "constraint"
+            results.append({"joints": count, "mode": mode, "nodes": nodeCount, "build": buildTime,
+                            "frame": frameTime})
+            print("%5d joints, %-10s: %6d nodes, built in %.2fs, %.2fms per frame"
+                  % (count, mode, nodeCount, buildTime, frameTime * 1000))
+
+    return results
+
+
+# Builds count controls on a chain of joints with their own shapes and with shared shapes, and
+# reports the node count, memory and .ma/.mb file size of each. Works in a new scene, and saves
+# the test files to directory (the temp directory by default).
+def benchmarkSharedShapes(count=300, shapeType="Circle", directory=None):
+    directory = directory or tempfile.gettempdir()
+    builder = controlBuilder()
+    results = {}
+    for shareShapes in (False, True):
+        joints = benchmarkChain(count)
+        nodesBefore = len(cmds.ls())
+        memoryBefore = cmds.memory(heapMemory=True, megaByte=True)
+
+        builder.buildControls(joints, shapeType, mode=SINGULAR, bakeShape=True, shareShapes=shareShapes)
+
+        mode = "shared" if shareShapes else "own"
+        result = {"nodes": len(cmds.ls()) - nodesBefore,
+                  "memory": cmds.memory(heapMemory=True, megaByte=True) - memoryBefore}
+        for fileType, extension in (("mayaAscii", "ma"), ("mayaBinary", "mb")):
+            path = os.path.join(directory, "controlShapes_%s.%s" % (mode, extension))
+            cmds.file(rename=path)
+            cmds.file(save=True, type=fileType, force=True)
+            result[extension] = os.path.getsize(path)
+        results[mode] = result
+
+        print("%-6s shapes: %5d nodes, %.1fMB heap, .ma %dKB, .mb %dKB"
+              % (mode, result["nodes"], result["memory"], result["ma"] / 1024, result["mb"] / 1024))
+
+    own, shared = results["own"], results["shared"]
+    print("Savings: %d nodes, %.1fMB heap, .ma %.0f%% smaller, .mb %.0f%% smaller"
+          % (own["nodes"] - shared["nodes"], own["memory"] - shared["memory"],
+             100.0 * (own["ma"] - shared["ma"]) / max(own["ma"], 1), 100.0 * (own["mb"] - shared["mb"]) / max(own["mb"], 1)))
+
+    return results
@@ -0,0 +1,80 @@
+import numpy as np
+
+'''
+    Matrix maths for mirroring rigs, on plain numpy arrays so it can be checked without Maya.
+    Matrices are (4, 4) in Maya's row vector layout: rows are the x, y and z axes, then the translation,
+    and a child's world matrix is its local matrix times its parent's.
+'''
+
+# Which axis is negated to reflect across each plane.
+MIRROR_AXES = {"X": 0, "Y": 1, "Z": 2}
+
+
+# Returns the (4, 4) matrix that reflects points across the plane facing axis ("X" is the YZ plane).
+def reflectionMatrix(axis):
+    reflection = np.eye(4)
+    reflection[MIRROR_AXES[axis], MIRROR_AXES[axis]] = -1
+    return reflection
+
+
+# Reflects (n, 4, 4) world matrices (Maya's row vector layout) across the plane facing axis.
+# behavior: flip the axes of the results so they have no negative scale, and the same rotation values
+# on both sides give mirrored poses (mirrorJoint's Behavior option). Otherwise the results are exact
+# reflections, with a negative scale, like scaling a parent group by -1.
+def mirrorMatrices(matrices, axis="X", behavior=True):
+    mirrored = np.matmul(np.asarray(matrices, dtype=np.float64), reflectionMatrix(axis))
+    if behavior:
+        mirrored[:, :3, :3] *= -1
+    return mirrored
+
+
+# Returns (n, 3) xyz euler angles in degrees (jointOrient's rotation order) of (n, 3, 3) rotation
+# matrices in Maya's row vector layout. Rows are made unit length first.
+def eulerXYZ(rotations):
+    rotations = rotations / np.linalg.norm(rotations, axis=2)[:, :, None]
+    y = np.arcsin(np.clip(-rotations[:, 0, 2], -1.0, 1.0))
+    x = np.arctan2(rotations[:, 1, 2], rotations[:, 2, 2])
+    z = np.arctan2(rotations[:, 0, 1], rotations[:, 0, 0])
+
+    # Gimbal locked (y at +-90), z can be anything so keep it at 0.
+    locked = np.abs(rotations[:, 0, 2]) > 1.0 - 1e-9
+    x[locked] = np.arctan2(-rotations[locked, 2, 1], rotations[locked, 1, 1])
+    z[locked] = 0.0
+
+    return np.degrees(np.stack([x, y, z], axis=1))
+
+
+# Compares two sets of (n, 4, 4) world matrices. Returns the largest difference in translation, in
+# axes, and in axes allowing each one to point the other way ("axesUpToSign"). Mirroring with behavior
+# flips axes that the old negative scale didn't, so only axesUpToSign is expected to match it.
+def matrixDifference(first, second):
+    first = np.asarray(first, dtype=np.float64)
+    second = np.asarray(second, dtype=np.float64)
+    if first.shape != second.shape:
+        raise ValueError("Can't compare %d matrices with %d, the hierarchies are different."
+                         % (len(first), len(second)))
+    if not first.size:
+        return {"translation": 0.0, "axes": 0.0, "axesUpToSign": 0.0}
+
+    axesFirst = first[:, :3, :3]
+    axesSecond = second[:, :3, :3]
+    upToSign = np.minimum(np.abs(axesFirst - axesSecond).max(axis=2), np.abs(axesFirst + axesSecond).max(axis=2))
+    return {"translation": float(np.abs(first[:, 3, :3] - second[:, 3, :3]).max()),
+            "axes": float(np.abs(axesFirst - axesSecond).max()),
+            "axesUpToSign": float(upToSign.max())}
+
+
+# Returns (n, 4, 4) local matrices that give nodes the (n, 4, 4) world matrices, all at once.
+# parents: index of each node's parent in matrices, -1 for parents that aren't in it.
+# parentWorld: (n, 4, 4) world matrices of the parents, used for the ones that aren't in matrices.
+# offsets: (n, 4, 4) offsetParentMatrix of each node, which sits between it and its parent, or None.
+def localMatrices(matrices, parents, parentWorld, offsets=None):
+    matrices = np.asarray(matrices, dtype=np.float64)
+    parents = np.asarray(parents, dtype=int)
+    parentMatrices = np.array(parentWorld, dtype=np.float64)
+    moved = parents >= 0
+    parentMatrices[moved] = matrices[parents[moved]]
+    if offsets is not None:
+        parentMatrices = np.matmul(np.asarray(offsets, dtype=np.float64), parentMatrices)
+
+    return np.matmul(matrices, np.linalg.inv(parentMatrices))
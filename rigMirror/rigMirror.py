@@ -1,12 +1,30 @@
 from maya import cmds
+import maya.api.OpenMaya as om
+import numpy as np
+
+from mirrorMath import MIRROR_AXES, eulerXYZ, localMatrices, matrixDifference, mirrorMatrices
 
 '''
     Order of steps to take when using this tool :
         STEP 1 : Mirror FK
         STEP 2 : Mirror IK
         STEP 3 : Mirror Pole Vector
+
+    Mirroring is done with reflection matrices, across the YZ, XZ or XY plane (scale "X", "Y" or "Z"):
+        1. The world matrices of every transform in the duplicated hierarchy are read in one go.
+        2. They're reflected in one numpy batch, and each one's axes are flipped so it has no negative
+           scale and mirrored rotations behave the same way (like mirrorJoint's Behavior option).
+        3. Each node's new local matrix is worked out from its new parent's, and written back:
+           translate and jointOrient for joints, the matrix for everything else. The CVs of control
+           curves are flipped through their origin so the shapes still mirror the original exactly.
+    No temporary groups are made. compareWithLegacy() mirrors a hierarchy the new way and the old way
+    (temp group scaled -1, or mirrorJoint) and reports how far apart they are, see matrixDifference().
+    The matrix maths is in mirrorMath.py, which doesn't need Maya.
 '''
 
+# mirrorJoint flag for each axis.
+MIRROR_JOINT_FLAGS = {"X": "mirrorYZ", "Y": "mirrorXZ", "Z": "mirrorXY"}
+
 # A class that holds all functions for mirroring a rig.
 class rigMirror(object):
     # Class variables
@@ -131,18 +149,8 @@ class rigMirror(object):
                 elif type == "IK":
                     self.IK_dupControls.append(newName)
 
-        # Create a temporary group to use to scale the group in -1 along the X axis.
-        # May add functionality to choose which axis to scale across later.
-        group = cmds.group(dup[0], name="ctrls_mirrorGrp")
-        cmds.xform(group, os=True, piv=[0, 0, 0])
-        # Depending on what scale was chosen by user, depends which direction it will be scaled in
-        if self.scale == "X":
-            cmds.scale(-1, 1, 1, group)
-        elif self.scale == "Y":
-            cmds.scale(1, -1, 1, group)
-        elif self.scale == "Z":
-            cmds.scale(1, 1, -1, group)
-        cmds.ungroup("ctrls_mirrorGrp")
+        # Mirror the duplicate across the plane chosen by the user.
+        self.mirrorHierarchy(dup[0])
 
     # Duplicates and mirrors the skeleton (joints).
     def mirrorJoints(self, type):
@@ -150,10 +158,7 @@ class rigMirror(object):
         # If there are no joints selected, return out of function and do nothing.
 
         if self.joints:
-            if self.scale == "X":
-                self.dupJoints = cmds.mirrorJoint(self.joints[0], mirrorYZ=True, mirrorBehavior=True,
-                                       sr=[self.curSide, self.newSide])
-            # TODO : Add other axis to list for scaling (Y, Z)
+            self.dupJoints = self.duplicateMirrored(self.joints[0])
         else:
             return
         constraints = []
@@ -208,16 +213,8 @@ class rigMirror(object):
                 self.dupPoleVector.append(newName)
 
 
-        # Create a temporary group to use to scale the group in -1 along the X axis.
-        group = cmds.group(self.dupPoleVector[0], name="ctrls_mirrorGrp")
-        cmds.xform(group, os=True, piv=[0, 0, 0])
-        if self.scale == "X":
-            cmds.scale(-1, 1, 1, group)
-        elif self.scale == "Y":
-            cmds.scale(1, -1, 1, group)
-        elif self.scale == "Z":
-            cmds.scale(1, 1, -1, group)
-        cmds.ungroup("ctrls_mirrorGrp")
+        # Mirror the duplicate across the plane chosen by the user.
+        self.mirrorHierarchy(self.dupPoleVector[0])
 
         # Pole vector constraint new pole vector control to new ikhandle
         # Get original pole vector shape node.
@@ -256,4 +253,201 @@ class rigMirror(object):
         ctrl = self.IK_dupControls[0]
         cmds.pointConstraint(ctrl, ik)
 
+    ################################
+    # REFLECTION
+    ################################
 
+    # Mirrors a duplicated node and everything under it in place, across the plane chosen by the user.
+    # Constraints in the duplicate are disconnected first, they'd still hold the nodes on the old side.
+    def mirrorHierarchy(self, root):
+        disconnectConstraints(root)
+        nodes = hierarchy(root)
+        world, parentWorld, parents, offsets = readHierarchy(nodes)
+        writeHierarchy(nodes, mirrorMatrices(world, self.scale), parents, parentWorld, offsets)
+        flipCurveShapes(cmds.ls(nodes, long=True, exactType="transform"))
+
+    # Duplicates a joint hierarchy, renames it for the new side and mirrors it.
+    # Returns the new root joint and everything under it, root first, like mirrorJoint does.
+    def duplicateMirrored(self, root):
+        dup = cmds.duplicate(root, name=self.getNewSideName(root.split("|")[-1]))[0]
+        dup = cmds.ls(dup, long=True)[0]
+
+        # Deepest first, so the paths of the nodes still to be renamed don't change.
+        for child in cmds.listRelatives(dup, allDescendents=True, fullPath=True) or []:
+            if cmds.objectType(child, isAType="transform"):
+                cmds.rename(child, self.getNewSideName(child.split("|")[-1]))
+
+        self.mirrorHierarchy(dup)
+        nodes = hierarchy(dup, skipped=())
+        kept = set(cmds.ls(nodes, long=True, type=("joint", "constraint")))
+        return cmds.ls([node for node in nodes if node in kept])
+
+    # Mirrors the old way (temp group scaled -1, or mirrorJoint for joints), for comparing against.
+    # Returns the root of the mirrored duplicate.
+    def mirrorLegacy(self, root):
+        if cmds.objectType(root, isType="joint"):
+            flags = {MIRROR_JOINT_FLAGS[self.scale]: True}
+            return cmds.mirrorJoint(root, mirrorBehavior=True, sr=[self.curSide, self.newSide], **flags)[0]
+
+        dup = cmds.duplicate(root)[0]
+        uuid = cmds.ls(dup, uuid=True)[0]
+        group = cmds.group(dup, name="ctrls_mirrorGrp")
+        cmds.xform(group, os=True, piv=[0, 0, 0])
+        scale = [1, 1, 1]
+        scale[MIRROR_AXES[self.scale]] = -1
+        cmds.scale(scale[0], scale[1], scale[2], group)
+        cmds.ungroup(group)
+        return cmds.ls(uuid, long=True)[0]
+
+    # Mirrors root both ways, compares the results and deletes them.
+    # Returns matrixDifference() of every node's world matrix, plus the largest distance between the
+    # world positions of their curve CVs ("cvs").
+    def compareWithLegacy(self, root):
+        legacyRoot = cmds.ls(self.mirrorLegacy(root), long=True)[0]
+        legacyNodes = hierarchy(legacyRoot)
+        legacyWorld = readHierarchy(legacyNodes)[0]
+        legacyCVs = curvePoints(legacyNodes)
+
+        if cmds.objectType(root, isType="joint"):
+            newRoot = cmds.ls(self.duplicateMirrored(root), long=True)[0]
+        else:
+            newRoot = cmds.ls(cmds.duplicate(root)[0], long=True)[0]
+            self.mirrorHierarchy(newRoot)
+        newNodes = hierarchy(newRoot)
+        newWorld = readHierarchy(newNodes)[0]
+        newCVs = curvePoints(newNodes)
+
+        difference = matrixDifference(legacyWorld, newWorld)
+        difference["cvs"] = float(np.abs(legacyCVs - newCVs).max()) if legacyCVs.size else 0.0
+        cmds.delete(legacyRoot, newRoot)
+
+        print("Mirrored %d nodes across %s: translation %.2g, axes %.2g, axes up to sign %.2g, CVs %.2g apart."
+              % (len(newNodes), self.scale, difference["translation"], difference["axes"],
+                 difference["axesUpToSign"], difference["cvs"]))
+        return difference
+
+
+################################
+# REFLECTION ENGINE
+################################
+
+# Returns the full paths of root and the transforms and joints under it, parents before children.
+# Nodes of the skipped types are left out, by default the ones that are placed by their connections.
+def hierarchy(root, skipped=("constraint", "ikEffector")):
+    root = cmds.ls(root, long=True)[0]
+    nodes = [root] + list(reversed(cmds.listRelatives(root, allDescendents=True, type="transform",
+                                                      fullPath=True) or []))
+    if skipped:
+        skipped = set(cmds.ls(nodes, long=True, type=list(skipped)))
+        nodes = [node for node in nodes if node not in skipped]
+
+    return nodes
+
+
+# Disconnects the constraints under root from the nodes they drive.
+def disconnectConstraints(root):
+    constraints = cmds.listRelatives(root, allDescendents=True, type="constraint", fullPath=True) or []
+    for constraint in constraints:
+        connections = cmds.listConnections(constraint, source=False, destination=True, plugs=True,
+                                           connections=True) or []
+        for source, destination in zip(connections[::2], connections[1::2]):
+            cmds.disconnectAttr(source, destination)
+
+
+# Reads the world matrices of nodes through the API in one pass.
+# Returns (n, 4, 4) world matrices, (n, 4, 4) world matrices of their parents, the index of each
+# node's parent in nodes (-1 for parents that aren't in it), and (n, 4, 4) offsetParentMatrix of each
+# node (identity before Maya 2020).
+def readHierarchy(nodes):
+    selList = om.MSelectionList()
+    for node in nodes:
+        selList.add(node)
+
+    world = []
+    parentWorld = []
+    offsets = []
+    for i in range(len(nodes)):
+        dagPath = selList.getDagPath(i)
+        world.append(list(dagPath.inclusiveMatrix()))
+        parentWorld.append(list(dagPath.exclusiveMatrix()))
+        if om.MFnDependencyNode(dagPath.node()).hasAttribute("offsetParentMatrix"):
+            offsets.append(cmds.getAttr(nodes[i] + ".offsetParentMatrix"))
+        else:
+            offsets.append(np.eye(4).ravel().tolist())
+
+    indices = dict((node, i) for i, node in enumerate(nodes))
+    parents = np.array([indices.get(node.rpartition("|")[0], -1) for node in nodes], dtype=int)
+
+    return (np.array(world, dtype=np.float64).reshape(-1, 4, 4),
+            np.array(parentWorld, dtype=np.float64).reshape(-1, 4, 4), parents,
+            np.array(offsets, dtype=np.float64).reshape(-1, 4, 4))
+
+
+# Returns True if node.attr and its children can be set (not locked or connected).
+def settable(node, attr):
+    plugs = ["%s.%s" % (node, attr)]
+    plugs += ["%s.%s" % (node, child) for child in cmds.attributeQuery(attr, node=node, listChildren=True) or []]
+    return all(cmds.getAttr(plug, settable=True) for plug in plugs)
+
+
+# Gives nodes new world matrices. Local matrices are worked out for all of them at once from their
+# parents' new world matrices (or their current ones, for parents that aren't being moved), less
+# their offsetParentMatrix, which is left as it is.
+# Joints get a translate and jointOrient with rotate and rotateAxis zeroed, like mirrorJoint leaves them.
+# Attributes that are locked or connected are left alone, with a warning.
+def writeHierarchy(nodes, matrices, parents, parentWorld, offsets=None):
+    local = localMatrices(matrices, parents, parentWorld, offsets)
+
+    joints = set(cmds.ls(nodes, long=True, type="joint"))
+    orients = eulerXYZ(local[:, :3, :3])
+    skipped = []
+    for node, matrix, orient in zip(nodes, local, orients):
+        if node in joints:
+            values = (("translate", matrix[3, :3].tolist()), ("rotate", [0, 0, 0]), ("rotateAxis", [0, 0, 0]),
+                      ("jointOrient", orient.tolist()))
+            for attr, value in values:
+                if settable(node, attr):
+                    cmds.setAttr("%s.%s" % (node, attr), *value)
+                else:
+                    skipped.append("%s.%s" % (node, attr))
+        elif all(settable(node, attr) for attr in ("translate", "rotate", "scale", "shear")):
+            cmds.xform(node, objectSpace=True, matrix=matrix.ravel().tolist())
+        else:
+            skipped.append(node)
+
+    if skipped:
+        cmds.warning("Couldn't mirror %d locked or connected attribute(s)/node(s): %s"
+                     % (len(skipped), ", ".join(skipped[:10])))
+
+
+# Flips the CVs of the curves under transforms through their object space origin, so a control mirrored with
+# behavior looks the same as the exact reflection of the original. Shapes instanced under more than
+# one of the transforms are only flipped once.
+def flipCurveShapes(transforms):
+    flipped = set()
+    for transform in transforms:
+        for shape in cmds.listRelatives(transform, shapes=True, type="nurbsCurve", fullPath=True) or []:
+            selList = om.MSelectionList()
+            selList.add(shape)
+            shapeObject = selList.getDependNode(0)
+            handle = om.MObjectHandle(shapeObject).hashCode()
+            if handle in flipped:
+                continue
+            flipped.add(handle)
+
+            curveFn = om.MFnNurbsCurve(selList.getDagPath(0))
+            curveFn.setCVPositions([om.MPoint(-point.x, -point.y, -point.z) for point in curveFn.cvPositions()])
+            curveFn.updateCurve()
+
+
+# Returns the world positions of the CVs of every curve under nodes, as one (n, 3) array.
+def curvePoints(nodes):
+    points = []
+    for node in nodes:
+        for shape in cmds.listRelatives(node, shapes=True, type="nurbsCurve", fullPath=True) or []:
+            selList = om.MSelectionList()
+            selList.add(shape)
+            curveFn = om.MFnNurbsCurve(selList.getDagPath(0))
+            points.extend((point.x, point.y, point.z) for point in curveFn.cvPositions(om.MSpace.kWorld))
+
+    return np.array(points, dtype=np.float64).reshape(-1, 3)
@@ -0,0 +1,10 @@
+import os
+import sys
+
+# The tools are run from Maya's scripts directory rather than installed, so put their folders on the
+# path the same way. Only modules that don't import maya are tested.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for folder in ("", "renamer", "rigControlBuilder", "rigMirror"):
+    path = os.path.join(ROOT, folder)
+    if path not in sys.path:
+        sys.path.insert(0, path)
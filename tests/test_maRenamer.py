@@ -0,0 +1,48 @@
+import maRenamer
+
+MA_FILE = """//Maya ASCII 2020 scene
+createNode transform -s -n "persp";
+createNode camera -s -n "perspShape" -p "persp";
+createNode transform -n "arm_grp";
+createNode transform -n "arm_ctrl" -p "arm_grp";
+createNode lightLinker -s -n "lightLinker1";
+rename -uid "1234";
+select -ne :defaultRenderGlobals;
+connectAttr "arm_ctrl.tx" "persp.tx";
+relationship "link" ":lightLinker1" ":initialShadingGroup.message" ":defaultLightSet.message";
+"""
+
+
+def rewrite(rule, text=MA_FILE):
+    renamer = maRenamer.MaRenamer(rule)
+    lines = list(renamer.rewrite(text.splitlines(True)))
+    return renamer, "".join(lines)
+
+
+def test_prefixSkipsSharedNodes():
+    renamer, text = rewrite(maRenamer.RenameRule(prefix="L_"))
+
+    assert renamer.errors == []
+    assert 'createNode transform -s -n "persp";' in text
+    assert 'createNode camera -s -n "perspShape" -p "persp";' in text
+    assert 'createNode lightLinker -s -n "lightLinker1";' in text
+    assert 'createNode transform -n "L_arm_grp";' in text
+    assert 'createNode transform -n "L_arm_ctrl" -p "L_arm_grp";' in text
+    assert 'connectAttr "L_arm_ctrl.tx" "persp.tx";' in text
+    assert renamer.renamed == 2
+
+
+def test_searchSkipsSharedNodes():
+    renamer, text = rewrite(maRenamer.RenameRule(search="persp", replace="side"))
+
+    assert renamer.errors == []
+    assert text == MA_FILE
+    assert renamer.renamed == 0
+
+
+def test_renameOfSharedNodeIsKept():
+    text = MA_FILE + 'select -ne "lightLinker1";\nrename "lightLinker1" "lightLinker2";\n'
+    renamer, rewritten = rewrite(maRenamer.RenameRule(prefix="L_"), text)
+
+    assert renamer.errors == []
+    assert rewritten.endswith('select -ne "lightLinker1";\nrename "lightLinker1" "lightLinker2";\n')
@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+import mappingTable
+
+SCENE = [("u1", "|rig|L_arm"), ("u2", "|rig|R_arm"), ("u3", "|rig|spine"), ("u4", "|geo|spine"), ("u5", "lambert2")]
+
+
+def write(tmp_path, fileName, text):
+    path = tmp_path / fileName
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_readCsvSkipsHeaderCommentsAndBlanks(tmp_path):
+    path = write(tmp_path, "table.csv", "old,new\n\n# comment\nL_arm, left_arm\n|rig|spine,spine_jnt\n")
+
+    assert list(mappingTable.readRows(path)) == [(4, "L_arm", "left_arm"), (5, "|rig|spine", "spine_jnt")]
+
+
+def test_readJsonFormats(tmp_path):
+    lines = write(tmp_path, "table.jsonl", '["L_arm", "left_arm"]\n\n{"old": "R_arm", "new": "right_arm"}\n')
+    table = write(tmp_path, "table.json", json.dumps({"L_arm": "left_arm"}))
+
+    assert list(mappingTable.readRows(lines)) == [(1, "L_arm", "left_arm"), (3, "R_arm", "right_arm")]
+    assert list(mappingTable.readRows(table)) == [(1, "L_arm", "left_arm")]
+
+
+def test_readRowsRejectsBadInput(tmp_path):
+    with pytest.raises(ValueError):
+        mappingTable.readRows(write(tmp_path, "table.txt", "a b"))
+    with pytest.raises(ValueError):
+        list(mappingTable.readRows(write(tmp_path, "table.csv", "only_old\n")))
+    with pytest.raises(ValueError):
+        list(mappingTable.readRows(write(tmp_path, "table.jsonl", '["a", "b", "c"]\n')))
+
+
+def test_matchTable():
+    rows = [(1, "L_arm", "left_arm"), (2, "spine", "spine_jnt"), (3, "|geo|spine", "spine_geo"),
+            (4, "neck", "neck_jnt"), (5, "|rig|L_arm", "arm_L"), (6, "lambert2", "skin_mat")]
+    match = mappingTable.matchTable(rows, SCENE)
+
+    assert match.rows == 6
+    assert match.nodes == [("u1", "|rig|L_arm"), ("u4", "|geo|spine"), ("u5", "lambert2")]
+    assert match.newNames == ["left_arm", "spine_geo", "skin_mat"]
+    assert match.missing == [(4, "neck")]
+    assert match.ambiguous == [(2, "spine", 2)]
+    assert match.duplicates == [(5, "|rig|L_arm")]
+    assert match.unmatched == 3
+    assert "spine matches 2 nodes" in match.problems()
@@ -0,0 +1,111 @@
+import numpy as np
+import pytest
+
+import meshTopology
+
+
+def cubeSource(extraFaces=(), extraPoints=()):
+    """
+    Six quad cube, with any extra faces (as vertex id lists) and points tacked on the end.
+    """
+    faces = [[0, 1, 3, 2], [2, 3, 5, 4], [4, 5, 7, 6], [6, 7, 1, 0], [1, 7, 5, 3], [6, 0, 2, 4]]
+    faces.extend(extraFaces)
+    points = [[-1, -1, 1], [1, -1, 1], [-1, 1, 1], [1, 1, 1],
+              [-1, 1, -1], [1, 1, -1], [-1, -1, -1], [1, -1, -1]]
+    points.extend(extraPoints)
+    return meshTopology.InMemoryMeshSource("pCube1",
+                                           [len(face) for face in faces],
+                                           np.concatenate(faces),
+                                           points)
+
+
+def test_classifyFacesClampsToTriQuadNgon():
+    classes = meshTopology.classifyFaces([3, 4, 5, 8, 4, 3])
+    assert classes.tolist() == [meshTopology.TRI, meshTopology.QUAD, meshTopology.NGON,
+                                meshTopology.NGON, meshTopology.QUAD, meshTopology.TRI]
+
+
+def test_findNgonIndices():
+    assert meshTopology.findNgonIndices([4, 5, 4, 6, 7, 3]).tolist() == [1, 3, 4]
+    assert meshTopology.findNgonIndices([]).tolist() == []
+
+
+@pytest.mark.parametrize("indices, ranges", [
+    ([], []),
+    ([4], [(4, 4)]),
+    ([1, 2, 3, 7, 9, 10], [(1, 3), (7, 7), (9, 10)]),
+    ([0, 2, 4], [(0, 0), (2, 2), (4, 4)]),
+])
+def test_compactRanges(indices, ranges):
+    assert meshTopology.compactRanges(np.array(indices, dtype=np.int64)) == ranges
+
+
+def test_componentNamesRoundTrip():
+    ranges = [(1, 3), (7, 7), (9, 10)]
+    names = meshTopology.componentNames("pCube1", ranges)
+
+    assert names == ["pCube1.f[1:3]", "pCube1.f[7]", "pCube1.f[9:10]"]
+    assert meshTopology.compactRanges(meshTopology.componentIndices(names)) == ranges
+    assert meshTopology.componentIndices(["pCube1.f[*]"]) is None
+
+
+def test_restrictRanges():
+    assert meshTopology.restrictRanges([(0, 4), (9, 9)], [3, 4, 5, 9]) == [(3, 4), (9, 9)]
+    assert meshTopology.restrictRanges([(2, 3)], [0, 1, 4]) == []
+    assert meshTopology.restrictRanges([], [1, 2]) == []
+
+
+def test_findNgonsOnlyLooksThroughGivenFaces():
+    source = meshTopology.InMemoryMeshSource("pPlane1", [4, 5, 4, 6, 7, 3])
+
+    assert meshTopology.findNgons(source) == [(1, 1), (3, 4)]
+    assert meshTopology.findNgons(source, np.array([0, 1, 2])) == [(1, 1)]
+    assert meshTopology.findNgons(source, np.array([4, 5])) == [(4, 4)]
+
+
+def test_topologyHash():
+    faceCounts = np.array([4, 4, 3])
+    faceConnects = np.arange(11)
+    key = meshTopology.topologyHash(faceCounts, faceConnects)
+
+    assert key == meshTopology.topologyHash(faceCounts.astype(np.int64), list(faceConnects))
+    assert key != meshTopology.topologyHash([4, 3, 4], faceConnects)
+    assert key != meshTopology.topologyHash(faceCounts, faceConnects[::-1])
+    # The same ints split differently between the arrays mustn't collide.
+    assert (meshTopology.topologyHash([3], [0, 1, 2]) !=
+            meshTopology.topologyHash([3, 0], [1, 2]))
+
+
+def test_auditMeshCleanCube():
+    report = meshTopology.auditMesh(cubeSource())
+
+    assert report["faceCount"] == 6
+    assert report["vertexCount"] == 8
+    for check in meshTopology.CHECKS:
+        assert report[check] == {"count": 0, "components": []}
+
+
+def test_auditMeshFindsEveryProblem():
+    # Face 6 is a lamina copy of face 0, face 7 a flat triangle, face 8 a pentagon
+    # through a new point and vertex 10 isn't used by any face.
+    source = cubeSource(extraFaces=[[2, 3, 1, 0], [0, 1, 1], [0, 1, 8, 3, 2]],
+                        extraPoints=[[0, -1, 1.5], [0, 0, 0], [5, 5, 5]])
+    report = meshTopology.auditMesh(source)
+
+    assert report["triangles"]["components"] == [(7, 7)]
+    assert report["ngons"]["components"] == [(8, 8)]
+    assert report["lamina"]["components"] == [(0, 0), (6, 6)]
+    assert report["zeroArea"]["components"] == [(7, 7)]
+    assert report["isolatedVertices"]["components"] == [(9, 10)]
+    assert (0, 1) in report["nonManifoldEdges"]["components"]
+
+
+def test_auditMeshOnlyRunsAskedChecks():
+    source = meshTopology.InMemoryMeshSource("pPlane1", [4, 5])
+    report = meshTopology.auditMesh(source, checks=["ngons"])
+
+    # No points were given, so asking for zeroArea would have raised.
+    assert set(report) == {"name", "faceCount", "vertexCount", "ngons"}
+    assert report["ngons"] == {"count": 1, "components": [(1, 1)]}
+    with pytest.raises(ValueError):
+        meshTopology.auditMesh(source, checks=["bogus"])
@@ -0,0 +1,128 @@
+import numpy as np
+import pytest
+
+import mirrorMath
+
+
+def rotations(angles):
+    """
+    Row vector rotation matrices for xyz euler angles in radians, built the way Maya composes them.
+    """
+    matrices = []
+    for x, y, z in angles:
+        rx = np.array([[1, 0, 0], [0, np.cos(x), np.sin(x)], [0, -np.sin(x), np.cos(x)]])
+        ry = np.array([[np.cos(y), 0, -np.sin(y)], [0, 1, 0], [np.sin(y), 0, np.cos(y)]])
+        rz = np.array([[np.cos(z), np.sin(z), 0], [-np.sin(z), np.cos(z), 0], [0, 0, 1]])
+        matrices.append(rx.dot(ry).dot(rz))
+    return np.array(matrices)
+
+
+def worldMatrices(count, seed=0):
+    rng = np.random.RandomState(seed)
+    angles = rng.uniform(-np.pi, np.pi, (count, 3))
+    angles[:, 1] /= 2
+    matrices = np.tile(np.eye(4), (count, 1, 1))
+    matrices[:, :3, :3] = rotations(angles)
+    matrices[:, 3, :3] = rng.normal(size=(count, 3)) * 10
+    return matrices
+
+
+@pytest.mark.parametrize("axis", ["X", "Y", "Z"])
+def test_mirrorMatricesReflectsTranslation(axis):
+    matrices = worldMatrices(50)
+    mirrored = mirrorMath.mirrorMatrices(matrices, axis)
+
+    expected = matrices[:, 3, :3].copy()
+    expected[:, mirrorMath.MIRROR_AXES[axis]] *= -1
+    assert np.allclose(mirrored[:, 3, :3], expected)
+    assert np.allclose(mirrored[:, :3, 3], 0)
+
+
+@pytest.mark.parametrize("axis", ["X", "Y", "Z"])
+def test_mirrorMatricesBehaviorHasNoNegativeScale(axis):
+    mirrored = mirrorMath.mirrorMatrices(worldMatrices(50), axis)
+    assert np.allclose(np.linalg.det(mirrored[:, :3, :3]), 1)
+
+
+@pytest.mark.parametrize("axis", ["X", "Y", "Z"])
+def test_mirrorMatricesWithoutBehaviorMatchesNegativeScale(axis):
+    matrices = worldMatrices(50)
+    mirrored = mirrorMath.mirrorMatrices(matrices, axis, behavior=False)
+    assert np.allclose(mirrored, np.matmul(matrices, mirrorMath.reflectionMatrix(axis)))
+    assert np.allclose(np.linalg.det(mirrored[:, :3, :3]), -1)
+
+
+@pytest.mark.parametrize("axis", ["X", "Y", "Z"])
+def test_mirrorTwiceGivesOriginal(axis):
+    matrices = worldMatrices(50)
+    assert np.allclose(mirrorMath.mirrorMatrices(mirrorMath.mirrorMatrices(matrices, axis), axis), matrices)
+
+
+@pytest.mark.parametrize("axis", ["X", "Y", "Z"])
+def test_flippedPointsMatchExactReflection(axis):
+    # A control's CVs flipped through its origin, under the behavior matrix, land where the old
+    # negative scale put them.
+    matrices = worldMatrices(20)
+    points = np.random.RandomState(1).normal(size=(20, 3))
+    mirrored = mirrorMath.mirrorMatrices(matrices, axis)
+    reflected = np.matmul(matrices, mirrorMath.reflectionMatrix(axis))
+
+    flipped = np.einsum("ni,nij->nj", np.hstack([-points, np.ones((20, 1))]), mirrored)
+    legacy = np.einsum("ni,nij->nj", np.hstack([points, np.ones((20, 1))]), reflected)
+    assert np.allclose(flipped, legacy)
+
+
+def test_eulerXYZRoundTrips():
+    rng = np.random.RandomState(2)
+    angles = rng.uniform(-np.pi, np.pi, (500, 3))
+    angles[:, 1] /= 2
+    assert np.allclose(mirrorMath.eulerXYZ(rotations(angles)), np.degrees(angles))
+
+
+def test_eulerXYZGimbalLock():
+    matrix = rotations([(0.3, np.pi / 2, 0.2)])
+    angles = np.radians(mirrorMath.eulerXYZ(matrix))
+    assert np.allclose(angles[0, 1], np.pi / 2)
+    assert angles[0, 2] == 0
+    assert np.allclose(rotations(angles), matrix)
+
+
+def test_eulerXYZIgnoresScale():
+    angles = np.array([(0.1, 0.2, 0.3)])
+    scaled = rotations(angles) * np.array([2.0, 3.0, 0.5])[:, None]
+    assert np.allclose(mirrorMath.eulerXYZ(scaled), np.degrees(angles))
+
+
+def test_matrixDifference():
+    matrices = worldMatrices(10)
+    flipped = matrices.copy()
+    flipped[:, :3, :3] *= -1
+    moved = matrices.copy()
+    moved[3, 3, 1] += 0.5
+
+    assert mirrorMath.matrixDifference(matrices, matrices) == {"translation": 0.0, "axes": 0.0, "axesUpToSign": 0.0}
+    difference = mirrorMath.matrixDifference(matrices, flipped)
+    assert difference["axes"] > 0.1
+    assert difference["axesUpToSign"] < 1e-12
+    assert np.isclose(mirrorMath.matrixDifference(matrices, moved)["translation"], 0.5)
+    assert mirrorMath.matrixDifference(np.zeros((0, 4, 4)), np.zeros((0, 4, 4)))["axes"] == 0.0
+    with pytest.raises(ValueError):
+        mirrorMath.matrixDifference(matrices, matrices[:5])
+
+
+def test_localMatrices():
+    world = worldMatrices(3)
+    parentWorld = worldMatrices(3, seed=5)
+    offsets = worldMatrices(3, seed=6)
+    # Node 0's parent isn't in the batch, node 1 is under node 0 and node 2 under node 1.
+    parents = np.array([-1, 0, 1])
+
+    local = mirrorMath.localMatrices(world, parents, parentWorld, offsets)
+    rebuilt = [local[0].dot(offsets[0]).dot(parentWorld[0])]
+    for index in (1, 2):
+        rebuilt.append(local[index].dot(offsets[index]).dot(world[parents[index]]))
+    assert np.allclose(rebuilt, world)
+
+    # Without offsets it's the same as identity offsets.
+    assert np.allclose(mirrorMath.localMatrices(world, parents, parentWorld),
+                       mirrorMath.localMatrices(world, parents, parentWorld, np.tile(np.eye(4), (3, 1, 1))))
@@ -0,0 +1,46 @@
+import nameAllocator
+
+
+def test_splitNumber():
+    assert nameAllocator.splitNumber("arm12") == [("arm", "12"), ("arm1", "2")]
+    assert nameAllocator.splitNumber("arm") == []
+
+
+def test_uniqueFillsGaps():
+    allocator = nameAllocator.NameAllocator(["|rig|arm_ctrl", "arm_ctrl_1", "arm_ctrl_3"])
+
+    assert allocator.unique("leg_ctrl") == "leg_ctrl"
+    assert allocator.unique("arm_ctrl") == "arm_ctrl_2"
+    assert allocator.unique("arm_ctrl") == "arm_ctrl_4"
+    assert "arm_ctrl_2" in allocator
+
+
+def test_reserveSkipsUsedNumbersAndPadding():
+    allocator = nameAllocator.NameAllocator(["finger_01", "finger_3"])
+
+    assert allocator.reserve("finger_", 3, padding=2) == ["finger_02", "finger_04", "finger_05"]
+    assert allocator.reserve("finger_", 1) == ["finger_6"]
+
+
+def test_prefixEndingInADigit():
+    # 'arm11' is number 1 of 'arm1' as well as number 11 of 'arm'.
+    allocator = nameAllocator.NameAllocator(["arm11"])
+
+    assert allocator.reserve("arm1", 2) == ["arm12", "arm13"]
+    # The names reserved under 'arm1' are numbers of 'arm' too.
+    assert allocator.reserve("arm", 1, start=11) == ["arm14"]
+    assert allocator.unique("arm1") == "arm1"
+    assert allocator.unique("arm1") == "arm1_1"
+
+
+def test_removeFreesNumbers():
+    allocator = nameAllocator.NameAllocator(["spine1", "spine01", "spine2"])
+
+    allocator.remove("spine1")
+    # spine01 still holds number 1.
+    assert allocator.nextNumber("spine") == 3
+    allocator.remove("spine01")
+    assert allocator.nextNumber("spine") == 1
+    assert not allocator.exists("|rig|spine1")
+    allocator.remove("missing")
+    assert len(allocator) == 1
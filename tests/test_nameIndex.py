@@ -0,0 +1,53 @@
+import re
+
+import nameIndex
+
+NAMES = [("1", "L_arm_jnt"), ("2", "R_arm_jnt"), ("3", "spine_01_jnt"), ("4", "L_ARM_ctrl")]
+
+
+def test_searchMatchesSubstrings():
+    index = nameIndex.NameIndex(NAMES)
+
+    assert sorted(index.search("arm")) == ["1", "2"]
+    assert sorted(index.search("arm", ignoreCase=True)) == ["1", "2", "4"]
+    assert sorted(index.search("_j")) == ["1", "2", "3"]
+    assert index.search("leg") == []
+    assert index.search("") == []
+
+
+def test_bulkBuildMatchesAdd():
+    built = nameIndex.NameIndex(NAMES)
+    added = nameIndex.NameIndex()
+    for handle, name in NAMES:
+        added.add(handle, name)
+
+    assert built.names == added.names
+    assert built.grams == added.grams
+
+
+def test_renameOnlyKeepsCurrentNames():
+    index = nameIndex.NameIndex(NAMES)
+    index.rename("1", "L_leg_jnt")
+    index.rename("5", "neck_jnt")
+
+    assert sorted(index.search("arm")) == ["2"]
+    assert index.search("leg") == ["1"]
+    assert index.search("neck") == ["5"]
+    assert index.grams == nameIndex.NameIndex(list(index.names.items())).grams
+
+
+def test_removeDropsEmptyTrigrams():
+    index = nameIndex.NameIndex(NAMES)
+    index.remove("3")
+    index.remove("missing")
+
+    assert "3" not in index
+    assert len(index) == 3
+    assert "pin" not in index.grams
+
+
+def test_searchPattern():
+    index = nameIndex.NameIndex(NAMES)
+
+    assert sorted(index.searchPattern(re.compile(r"^L_"))) == ["1", "4"]
+    assert sorted(index.searchPattern(re.compile(r"_\d+_"))) == ["3"]
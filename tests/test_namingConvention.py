@@ -0,0 +1,87 @@
+import pytest
+
+import nameAllocator
+import namingConvention
+
+
+@pytest.fixture
+def convention():
+    return namingConvention.Convention()
+
+
+@pytest.mark.parametrize("name, nodeType", [
+    ("L_arm_jnt", "joint"),
+    ("arm_jnt", "joint"),
+    ("Lf_upper_arm_IK_jnt", "joint"),
+    ("C_spine_ctrl", "transform"),
+    ("arm_ctrl1", "transform"),
+    ("arm_ctrl_1", "transform"),
+    ("L_leg_hdl", "ikHandle"),
+    ("anything", "mesh"),
+])
+def test_namesThatFollowTheConvention(convention, name, nodeType):
+    assert convention.check(name, nodeType) is None
+
+
+@pytest.mark.parametrize("name, nodeType, reason", [
+    ("arm-jnt", "joint", "has characters that can't be in a name"),
+    ("L_arm", "joint", "joint names should end with _jnt or _JNT or _joint"),
+    ("L_arm_ctrl", "joint", "joint names should end with _jnt or _JNT or _joint"),
+    ("jnt", "joint", "tokens aren't in the order side_name_rig_type"),
+])
+def test_namesThatDont(convention, name, nodeType, reason):
+    assert convention.check(name, nodeType) == reason
+
+
+def test_parse(convention):
+    assert convention.parse("Lf_upper_arm_IK_jnt", "joint") == {"side": "Lf", "name": "upper_arm",
+                                                                "rig": "IK", "type": "jnt"}
+    assert convention.parse("arm_jnt", "joint") == {"side": None, "name": "arm", "rig": None, "type": "jnt"}
+    assert convention.parse("arm", "joint") is None
+
+
+def test_allocatorNamesFollowTheConvention(convention):
+    allocator = nameAllocator.NameAllocator(["L_arm_ctrl"])
+    name = allocator.unique("L_arm_ctrl")
+
+    assert name == "L_arm_ctrl_1"
+    assert convention.check(name, "transform") is None
+
+
+def test_lintOnlyReturnsFailures(convention):
+    names = ["L_arm_jnt", "arm", "L_hand_ctrl", "bad_jnt_ctrl", "pCube1"]
+    nodeTypes = ["joint", "joint", "transform", "joint", "mesh"]
+
+    assert convention.lint(names, nodeTypes) == [(1, "arm", "joint"), (3, "bad_jnt_ctrl", "joint")]
+    assert convention.lint(["arm", "arm_jnt"], "joint") == [(0, "arm", "joint")]
+
+
+def test_requiredTokensAndUnnumberedSpecs():
+    spec = dict(namingConvention.DEFAULT_SPEC, optional=["rig"], numbered=False)
+    convention = namingConvention.Convention(spec)
+
+    assert convention.check("arm_jnt", "joint") == "is missing its side token (L, R, C, M, Lf, Rt, Ct)"
+    assert convention.check("L_arm_ctrl_1", "transform") is not None
+    with pytest.raises(ValueError):
+        namingConvention.Convention(dict(spec, colour="red"))
+
+
+def test_namingLinterOnlyChecksUpdatedNodes():
+    linter = namingConvention.NamingLinter()
+    linter.build([("u1", "L_arm_jnt", "joint"), ("u2", "arm", "joint"), ("u3", "hand", "joint")])
+
+    assert sorted(linter.violations) == ["u2", "u3"]
+    assert linter.reason("u2") == "joint names should end with _jnt or _JNT or _joint"
+
+    linter.update([("u2", "arm_jnt", "joint")])
+    linter.remove(["u3"])
+    assert linter.violations == {}
+    assert linter.checked == 4
+
+
+def test_lintMatchesTheFullPattern(convention):
+    names = ["L_arm_jnt", "arm_jnt2", "arm_jnt_2", "arm_2", "jnt", "armjnt", "arm_jnt_", "L_arm_ctrl", "x1"]
+    matcher = convention.matchers["joint"]
+
+    expected = [index for index, name in enumerate(names) if matcher.match(name) is None]
+    assert [index for index, _, _ in convention.lint(names, "joint")] == expected
@@ -0,0 +1,67 @@
+import pytest
+
+import objScanner
+
+OBJ_FILE = """# two objects
+v 0 0 0
+v 1 0 0
+v 1 1 0
+v 0 1 0
+v 2 0 0
+o plane
+f 1 2 3 4
+f 1 2 3 4 5
+f 1/1/1 2/2/2 3/3/3 4/4/4 5/5/5
+f 1 2 3
+o tri
+f 1 2 3
+f 1 2 3 4 5 1 2
+"""
+
+
+def scan(tmp_path, text, chunkSize=objScanner.CHUNK_SIZE):
+    path = tmp_path / "asset.obj"
+    path.write_bytes(text.encode("utf-8"))
+    return objScanner.scanObj(str(path), chunkSize)
+
+
+@pytest.mark.parametrize("chunkSize", [objScanner.CHUNK_SIZE, 64, 16, 4, 1])
+def test_scanObjCountsNgonsPerGroup(tmp_path, chunkSize):
+    result = scan(tmp_path, OBJ_FILE, chunkSize)
+
+    assert list(result.groups) == ["plane", "tri"]
+    assert result.groups["plane"].asDict() == {"name": "plane", "faceCount": 4, "ngonCount": 2,
+                                               "maxValence": 5, "ngonRanges": [(1, 2)]}
+    assert result.groups["tri"].asDict() == {"name": "tri", "faceCount": 2, "ngonCount": 1,
+                                             "maxValence": 7, "ngonRanges": [(1, 1)]}
+    assert result.faceCount == 6
+    assert result.ngonCount == 3
+
+
+def test_scanObjWithoutGroupsOrTrailingLineBreak(tmp_path):
+    result = scan(tmp_path, "v 0 0 0\nf 1 2 3 4 5\nf 1 2 3\r\nf 1 2 3 4 5 6", chunkSize=8)
+
+    assert list(result.groups) == [objScanner.DEFAULT_GROUP]
+    assert result.groups[objScanner.DEFAULT_GROUP].ngonRanges == [(0, 0), (2, 2)]
+
+
+def test_scanObjJoinsRangesAcrossChunks(tmp_path):
+    result = scan(tmp_path, "f 1 2 3 4 5\n" * 20, chunkSize=30)
+
+    assert result.groups[objScanner.DEFAULT_GROUP].ngonRanges == [(0, 19)]
+
+
+def test_scanEmptyFile(tmp_path):
+    result = scan(tmp_path, "")
+
+    assert result.groups == {}
+    assert result.faceCount == 0
+
+
+def test_mainFailsOnNgons(tmp_path, capsys):
+    path = tmp_path / "clean.obj"
+    path.write_bytes(b"o quad\nf 1 2 3 4\n")
+
+    assert objScanner.main([str(path)]) == 0
+    assert objScanner.main([str(path), str(scan(tmp_path, OBJ_FILE).path)]) == 1
+    assert "clean.obj:quad  faces: 1  ngons: 0" in capsys.readouterr().out
@@ -0,0 +1,73 @@
+import numpy as np
+
+import poleVectors
+
+
+def test_bentChain():
+    # Elbow bent up in Y, the pole goes further up, half the chain's length (1.41 + 1.41) out from it.
+    poles, straight = poleVectors.solvePoleVectors([[0, 0, 0]], [[1, 1, 0]], [[2, 0, 0]], factor=0.5)
+
+    assert not straight.any()
+    assert np.allclose(poles, [[1, 1 + np.sqrt(2), 0]])
+
+
+def test_bentChainsInOnePass():
+    rng = np.random.RandomState(0)
+    starts, mids, ends = rng.normal(size=(3, 1000, 3))
+    poles, straight = poleVectors.solvePoleVectors(starts, mids, ends, factor=0.5)
+
+    assert not straight.any()
+    # In the plane of each chain...
+    normals = np.cross(mids - starts, ends - starts)
+    assert np.allclose(np.einsum("ij,ij->i", poles - starts, normals), 0)
+    # ...half the chain's length from the middle joint...
+    lengths = np.linalg.norm(mids - starts, axis=1) + np.linalg.norm(ends - mids, axis=1)
+    assert np.allclose(np.linalg.norm(poles - mids, axis=1), 0.5 * lengths)
+    # ...on the side it bends to.
+    chain = ends - starts
+    bend = mids - starts - chain * (np.einsum("ij,ij->i", mids - starts, chain) / np.einsum("ij,ij->i", chain, chain))[:, None]
+    assert (np.einsum("ij,ij->i", poles - mids, bend) > 0).all()
+
+
+def test_straightChainWithFallback():
+    # The fallback is made to be at right angles to the chain.
+    poles, straight = poleVectors.solvePoleVectors([[0, 0, 0]], [[1, 0, 0]], [[2, 0, 0]], factor=0.5,
+                                                   fallbacks=[[1, 0, 3]])
+
+    assert straight.all()
+    assert np.allclose(poles, [[1, 0, 1]])
+
+
+def test_straightChainWithoutFallback():
+    # The world axis least along the chain is used.
+    poles, straight = poleVectors.solvePoleVectors([[0, 0, 0]], [[0, 1, 0]], [[0, 2, 0]], factor=1.0)
+
+    assert straight.all()
+    assert np.allclose(np.linalg.norm(poles - [0, 1, 0], axis=1), 2)
+    assert np.allclose(poles[:, 1], 1)
+
+
+def test_straightChainWithFallbackAlongIt():
+    poles, straight = poleVectors.solvePoleVectors([[0, 0, 0]], [[1, 0, 0]], [[2, 0, 0]], factor=0.5,
+                                                   fallbacks=[[1, 0, 0]])
+
+    assert straight.all()
+    assert np.allclose(poles, [[1, 1, 0]])
+
+
+def test_zeroLengthChain():
+    poles, straight = poleVectors.solvePoleVectors([[1, 2, 3]], [[1, 2, 3]], [[1, 2, 3]])
+
+    assert not straight.any()
+    assert np.allclose(poles, [[1, 2, 3]])
+    assert np.isfinite(poles).all()
+
+
+def test_perpendicular():
+    axes = np.array([[1.0, 0, 0], [0, 0, 2.0], [1.0, 1.0, 0], [0, 0, 0]])
+    result = poleVectors._perpendicular(axes, np.array([[1.0, 1.0, 0], [0, 0, 1.0], [np.nan, 0, 1.0], [0, 1.0, 0]]))
+
+    assert np.allclose(np.linalg.norm(result, axis=1), 1)
+    assert np.allclose(np.einsum("ij,ij->i", result[:3], axes[:3]), 0)
+    assert np.allclose(result[0], [0, 1, 0])
+    assert np.allclose(result[2], [0, 0, 1])
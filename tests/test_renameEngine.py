@@ -0,0 +1,113 @@
+import pytest
+
+import renameEngine
+
+SCENE = ["|grp", "|grp|a", "|grp|b", "|grp|c", "|other", "|other|a", "lambert1"]
+
+
+def plan(renames, sceneNames=SCENE):
+    nodes = [(longName, longName) for longName, _ in renames]
+    return renameEngine.buildPlan(nodes, [newName for _, newName in renames], sceneNames)
+
+
+def test_noOpsAndInvalidNames():
+    result = plan([("|grp|a", "a"), ("|grp|b", "1b"), ("|grp|c", "c_ctrl")])
+
+    assert result.noOps == ["|grp|a"]
+    assert result.invalid == [("|grp|b", "1b", "not a valid name")]
+    assert result.renames == [("|grp|c", "|grp|c", "c_ctrl")]
+    assert not result.ok
+
+
+def test_swapStagesBothNodes():
+    result = plan([("|grp|a", "b"), ("|grp|b", "a")])
+
+    assert result.ok
+    assert result.staged == {"|grp|a", "|grp|b"}
+    assert len(result) == 2
+
+
+def test_chainStagesOnlyTheHolders():
+    result = plan([("|grp|a", "b"), ("|grp|b", "d")])
+
+    assert result.ok
+    assert result.staged == {"|grp|b"}
+
+    # c is held by a node that isn't being renamed, so the chain can't end there.
+    blocked = plan([("|grp|a", "b"), ("|grp|b", "c")])
+    assert blocked.collisions == [("|grp|b", "c", "|grp|c already exists")]
+
+
+def test_siblingCollisionsOnly():
+    # The same short name under another parent is fine.
+    assert plan([("|grp|c", "a")]).collisions == [("|grp|c", "a", "|grp|a already exists")]
+    assert plan([("|other|a", "b")]).ok
+    assert plan([("|grp|a", "x"), ("|grp|b", "x")]).collisions == [("|grp|b", "x", "also wanted by |grp|a")]
+    assert plan([("|grp|a", "x"), ("|other|a", "x")]).ok
+
+
+def test_dgNamesCollideWithEveryShortName():
+    assert plan([("lambert1", "b")]).collisions == [("lambert1", "b", "|grp|b already exists")]
+    assert plan([("|grp|a", "lambert1")]).collisions == [("|grp|a", "lambert1", "lambert1 already exists")]
+    assert not plan([("lambert1", "x"), ("|grp|a", "x")]).ok
+    # Namespaces keep the names apart.
+    assert plan([("lambert1", "ns:b")]).ok
+
+
+def test_parentChildRenamesDeepestFirst():
+    result = plan([("|grp", "root"), ("|grp|a", "arm"), ("|grp|b", "leg")])
+
+    assert result.ok
+    assert [longName for _, longName, _ in result.renames][-1] == "|grp"
+
+    renamed = {"|grp|a": "arm", "|grp": "root"}
+    assert renameEngine.currentPath("|grp|a", renamed) == "|root|arm"
+    assert renameEngine.currentPath("|grp|b", renamed) == "|root|b"
+    assert renameEngine.currentPath("lambert1", {"lambert1": "blinn1"}) == "blinn1"
+
+
+def test_searchReplace():
+    names = ["L_arm_jnt", "l_ARM_jnt"]
+
+    assert renameEngine.searchReplace(names, "arm", "leg") == ["L_leg_jnt", "l_ARM_jnt"]
+    assert renameEngine.searchReplace(names, "arm", "leg", ignoreCase=True) == ["L_leg_jnt", "l_leg_jnt"]
+    assert renameEngine.searchReplace(names, r"^([LR])_(\w+)_jnt$", r"\2_\1_ctrl", regex=True) == \
+        ["arm_L_ctrl", "l_ARM_jnt"]
+    # Without regex a backslash in the replacement is just a backslash.
+    assert renameEngine.searchReplace(["a.b"], ".", "\\1", ignoreCase=True) == ["a\\1b"]
+
+
+def test_numberAndAffixes():
+    names = ["a", "b", "c"]
+
+    assert renameEngine.number(names, "spine", start=0) == ["spine0", "spine1", "spine2"]
+    assert renameEngine.number(names, "spine", padding=2) == ["spine001", "spine002", "spine003"]
+    assert renameEngine.addPrefix(names, "L_") == ["L_a", "L_b", "L_c"]
+    assert renameEngine.addSuffix(names, "_grp") == ["a_grp", "b_grp", "c_grp"]
+
+
+def test_applyTemplate():
+    names = ["L_arm_jnt", "spine", "R_leg_JNT"]
+
+    assert renameEngine.applyTemplate(names, "{side}_{base}_{index:02d}_ctrl") == \
+        ["L_arm_01_ctrl", "spine_02_ctrl", "R_leg_03_ctrl"]
+    assert renameEngine.applyTemplate(names, "{base!u}_{type!l}", tokens={"type": "grp"}) == \
+        ["ARM_jnt", "SPINE_grp", "LEG_jnt"]
+
+
+def test_changeCase():
+    names = ["leftArm_IKCtrl", "spine01"]
+
+    assert renameEngine.changeCase(names, "snake") == ["left_arm_ik_ctrl", "spine_01"]
+    assert renameEngine.changeCase(names, "camel") == ["leftArmIkCtrl", "spine01"]
+    assert renameEngine.changeCase(names, "pascal") == ["LeftArmIkCtrl", "Spine01"]
+    assert renameEngine.changeCase(names, "upper") == ["LEFTARM_IKCTRL", "SPINE01"]
+
+
+def test_changeCaseKeepsNamespacesAndPaths():
+    assert renameEngine.changeCase(["ns:fooBar"], "snake") == ["ns:foo_bar"]
+    assert renameEngine.changeCase(["rig:ns:foo_bar"], "pascal") == ["rig:ns:FooBar"]
+    assert renameEngine.changeCase(["|grp|ns:foo_bar"], "camel") == ["|grp|ns:fooBar"]
+    assert renameEngine.changeCase(["Rig:armCtrl"], "upper") == ["Rig:ARMCTRL"]
+    with pytest.raises(ValueError):
+        renameEngine.changeCase(["a"], "kebab")
@@ -0,0 +1,52 @@
+import json
+
+import topologyCache
+
+
+def test_getPutCountsHitsAndMisses():
+    cache = topologyCache.TopologyCache()
+
+    assert cache.get("ngons", "abc") is None
+    cache.put("ngons", "abc", [(1, 3)])
+    assert cache.get("ngons", "abc") == [(1, 3)]
+    assert cache.get("lamina", "abc") is None
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 2, "hitRate": 1 / 3.0}
+
+
+def test_leastRecentlyUsedIsDropped():
+    cache = topologyCache.TopologyCache(maxSize=2)
+    cache.put("ngons", "a", [])
+    cache.put("ngons", "b", [])
+    cache.get("ngons", "a")
+    cache.put("ngons", "c", [])
+
+    assert ("ngons", "a") in cache
+    assert ("ngons", "b") not in cache
+    assert len(cache) == 2
+
+
+def test_resultsSurviveOnDisk(tmp_path):
+    cache = topologyCache.TopologyCache(directory=str(tmp_path))
+    cache.put("ngons", "old", [[0, 0]], asset="|hero|body")
+    cache.put("ngons", "new", [[2, 5]], asset="|hero|body")
+
+    path = cache.assetPath("|hero|body")
+    assert path.startswith(str(tmp_path))
+    # Only the latest result of a kind is kept and no temp file is left behind.
+    with open(path) as assetFile:
+        assert json.load(assetFile) == {"ngons": {"new": [[2, 5]]}}
+    assert not (tmp_path / "hero_body.json.tmp").exists()
+
+    fresh = topologyCache.TopologyCache(directory=str(tmp_path))
+    assert fresh.get("ngons", "new", asset="|hero|body") == [[2, 5]]
+    assert fresh.get("ngons", "old", asset="|hero|body") is None
+
+
+def test_brokenFileIsAMiss(tmp_path):
+    cache = topologyCache.TopologyCache(directory=str(tmp_path))
+    with open(cache.assetPath("hero"), "w") as assetFile:
+        assetFile.write("{not json")
+
+    assert cache.get("ngons", "abc", asset="hero") is None
+    cache.put("ngons", "abc", [], asset="hero")
+    assert topologyCache.TopologyCache(directory=str(tmp_path)).get("ngons", "abc", asset="hero") == []
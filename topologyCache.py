@@ -0,0 +1,148 @@
+import json
+import os
+import re
+from collections import OrderedDict
+
+"""
+Result cache keyed by mesh topology hash (see meshTopology.topologyHash()).
+
+Results are kept in memory in a least recently used cache of a fixed size, and
+can also be stored on disk with one JSON file per asset so they survive between
+sessions. Since the key is the topology hash, a changed mesh simply misses the
+cache and gets scanned again.
+"""
+
+
+class TopologyCache(object):
+    """
+    LRU cache of results keyed by (kind, topology hash), e.g. ('ngons', '9f3c...').
+    """
+    def __init__(self, maxSize=128, directory=None):
+        """
+        :param maxSize: most results to keep in memory.
+        :param directory: folder to store results in per asset, None to only
+                          cache in memory.
+        """
+        self.maxSize = maxSize
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        # Assets already read from disk.
+        self._loadedAssets = set()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, kind, topologyHash, asset=None):
+        """
+        Looks up a result, counting the hit or miss.
+        :param kind: name of the result, e.g. 'ngons'.
+        :param topologyHash: hash of the mesh topology.
+        :param asset: asset name to look for stored results under.
+        :return: the cached result, or None if there isn't one.
+        """
+        key = (kind, topologyHash)
+        if key not in self._entries and asset is not None:
+            self._load(asset)
+
+        if key in self._entries:
+            self._entries[key] = self._entries.pop(key)
+            self.hits += 1
+            return self._entries[key]
+
+        self.misses += 1
+        return None
+
+    def put(self, kind, topologyHash, result, asset=None):
+        """
+        Stores a result, dropping the least recently used one if the cache is full.
+        :param kind: name of the result, e.g. 'ngons'.
+        :param topologyHash: hash of the mesh topology.
+        :param result: JSON friendly result to store.
+        :param asset: asset name to also store the result on disk under.
+        :return: N/A
+        """
+        key = (kind, topologyHash)
+        self._entries.pop(key, None)
+        self._entries[key] = result
+        while len(self._entries) > self.maxSize:
+            self._entries.popitem(last=False)
+
+        if asset is not None and self.directory:
+            self._save(asset, kind, topologyHash, result)
+
+    def clear(self):
+        """
+        Empties the in memory cache and resets the counters. Stored files are kept.
+        """
+        self._entries.clear()
+        self._loadedAssets.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        """
+        :return: dictionary of size, hits, misses and hit rate.
+        """
+        lookups = self.hits + self.misses
+        return {"size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": float(self.hits) / lookups if lookups else 0.0}
+
+    ####################
+    # Storage          #
+    ####################
+
+    def assetPath(self, asset):
+        """
+        :return: path of the JSON file results for an asset are stored in.
+        """
+        fileName = re.sub(r"[^\w.-]", "_", asset.strip("|")) or "_"
+        return os.path.join(self.directory, fileName + ".json")
+
+    def _readAsset(self, asset):
+        path = self.assetPath(asset)
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path) as assetFile:
+                return json.load(assetFile)
+        except ValueError:
+            # A broken file is no worse than an empty cache.
+            return {}
+
+    def _load(self, asset):
+        if not self.directory or asset in self._loadedAssets:
+            return
+        self._loadedAssets.add(asset)
+
+        stored = OrderedDict()
+        for kind, results in self._readAsset(asset).items():
+            for topologyHash, result in results.items():
+                stored[(kind, topologyHash)] = result
+        # Stored results count as the least recently used.
+        stored.update(self._entries)
+        self._entries = stored
+
+        while len(self._entries) > self.maxSize:
+            self._entries.popitem(last=False)
+
+    def _save(self, asset, kind, topologyHash, result):
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+
+        # Only the latest result of each kind is stored, older topology is of
+        # no use once the asset has changed.
+        stored = self._readAsset(asset)
+        stored[kind] = {topologyHash: result}
+
+        # Write to a temp file first so a crash can't leave half a file behind.
+        path = self.assetPath(asset)
+        with open(path + ".tmp", "w") as assetFile:
+            json.dump(stored, assetFile)
+        os.replace(path + ".tmp", path)